@@ -4,12 +4,12 @@ Benchmarking wrappers
 
 import functools
 import time
-from typing import Any, Callable
+from typing import Any, Callable, NamedTuple, Optional
 
 
 # Time benchmarking
 def timeit(func: Callable[..., Any]) -> Callable[..., Any]:
-    @functools.wraps
+    @functools.wraps(func)
     def timed_function(*args, **kwargs) -> Any:
         start_s: float = time.perf_counter()
         # actual function call
@@ -18,4 +18,105 @@ def timeit(func: Callable[..., Any]) -> Callable[..., Any]:
         print(f"function: {func.__name__} took {end_s - start_s} s")
         return results
 
-    return timed_function()
+    return timed_function
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    params: dict[str, Any]
+    items_per_run: int  # Records handled by one run
+    runs: int
+    us_per_run: float  # Best of the repeats
+    items_per_s: float
+    # Why the case could not run, e.g. a missing dependency
+    skipped: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        """
+        Identifies the case across result files, name plus its params
+        """
+        params: str = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.name}[{params}]" if params else self.name
+
+    def to_json(self) -> dict[str, Any]:
+        return {"key": self.key, **self._asdict()}
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "BenchmarkResult":
+        return cls(**{field: data[field] for field in cls._fields if field in data})
+
+
+def measure(
+    name: str,
+    run: Callable[[], Any],
+    items_per_run: int,
+    params: Optional[dict[str, Any]] = None,
+    min_duration_s: float = 1.0,
+    repeats: int = 3,
+) -> BenchmarkResult:
+    """
+    Times run() in repeats rounds of at least min_duration_s each after a warm up call, and keeps
+    the fastest round: slower rounds are noise from the rest of the machine, not the code
+    """
+    run()  # warm up
+    best_s_per_run: float = float("inf")
+    total_runs: int = 0
+    for _ in range(repeats):
+        runs: int = 0
+        start_s: float = time.perf_counter()
+        while (elapsed_s := time.perf_counter() - start_s) < min_duration_s or not runs:
+            run()
+            runs += 1
+        total_runs += runs
+        best_s_per_run = min(best_s_per_run, elapsed_s / runs)
+    return BenchmarkResult(
+        name=name,
+        params=params or {},
+        items_per_run=items_per_run,
+        runs=total_runs,
+        us_per_run=best_s_per_run * 1e6,
+        items_per_s=items_per_run / best_s_per_run,
+    )
+
+
+def skipped(
+    name: str, reason: str, params: Optional[dict[str, Any]] = None
+) -> BenchmarkResult:
+    return BenchmarkResult(name, params or {}, 0, 0, 0.0, 0.0, skipped=reason)
+
+
+class Regression(NamedTuple):
+    key: str
+    baseline_items_per_s: float
+    items_per_s: float
+
+    @property
+    def change(self) -> float:
+        """
+        Relative throughput change, -0.25 is 25% slower than the baseline
+        """
+        return self.items_per_s / self.baseline_items_per_s - 1
+
+
+def compare_results(
+    baseline: list[BenchmarkResult],
+    current: list[BenchmarkResult],
+    threshold: float = 0.1,
+) -> list[Regression]:
+    """
+    Cases whose throughput dropped by more than threshold, cases skipped or missing on either
+    side are not compared
+    """
+    baseline_by_key: dict[str, BenchmarkResult] = {
+        result.key: result for result in baseline if result.skipped is None
+    }
+    regressions: list[Regression] = []
+    for result in current:
+        before: Optional[BenchmarkResult] = baseline_by_key.get(result.key)
+        if result.skipped is not None or before is None or not before.items_per_s:
+            continue
+        regression = Regression(result.key, before.items_per_s, result.items_per_s)
+        if regression.change < -threshold:
+            regressions.append(regression)
+    return regressions
@@ -0,0 +1,123 @@
+"""
+Recorded exchange payloads and synthetic markets built from them, shared by the unit tests and
+the benchmarks
+"""
+
+import json
+from typing import Any
+
+# Recorded from Binance !miniTicker@arr
+BINANCE_RECORDED_TICKERS: list[dict[str, Any]] = [
+    {
+        "e": "24hrMiniTicker",
+        "E": 1743147448467,
+        "s": "BTCUSDT",
+        "c": "85439.99000000",
+        "o": "87304.35000000",
+        "h": "87728.27000000",
+        "l": "85300.01000000",
+        "v": "20230.79019000",
+        "q": "1754434346.25694750",
+    },
+    {
+        "e": "24hrMiniTicker",
+        "E": 1743147448251,
+        "s": "ETHUSDT",
+        "c": "1916.44000000",
+        "o": "2024.24000000",
+        "h": "2035.92000000",
+        "l": "1900.00000000",
+        "v": "518500.55270000",
+        "q": "1028765226.27080600",
+    },
+]
+
+# Recorded from Kucoin /market/ticker:all
+KUCOIN_RECORDED_TICKERS: list[dict[str, Any]] = [
+    {"id": "zmlD9FsJJw", "type": "welcome"},
+    {"id": "1", "type": "ack"},
+    {
+        "topic": "/market/ticker:all",
+        "type": "message",
+        "subject": "CRO-USDT",
+        "data": {
+            "bestAsk": "0.10605",
+            "bestAskSize": "2522.2",
+            "bestBid": "0.10596",
+            "bestBidSize": "2160",
+            "price": "0.10604",
+            "sequence": "915875484",
+            "size": "159.3256",
+            "time": 1743147198992,
+        },
+    },
+    {
+        "topic": "/market/ticker:all",
+        "type": "message",
+        "subject": "ADA-USDC",
+        "data": {
+            "bestAsk": "0.741",
+            "bestAskSize": "459",
+            "bestBid": "0.7406",
+            "bestBidSize": "229.5",
+            "price": "0.7413",
+            "sequence": "1163816212",
+            "size": "55.71",
+            "time": 1743064848551,
+        },
+    },
+]
+
+
+def binance_tickers(market_size: int) -> list[dict[str, Any]]:
+    """
+    market_size distinct tickers, cycling through the recorded tickers
+    """
+    tickers: list[dict[str, Any]] = []
+    for i in range(market_size):
+        ticker: dict[str, Any] = dict(
+            BINANCE_RECORDED_TICKERS[i % len(BINANCE_RECORDED_TICKERS)]
+        )
+        ticker["s"] = f"SYM{i}{ticker['s'][-4:]}"
+        tickers.append(ticker)
+    return tickers
+
+
+def binance_frame(market_size: int) -> str:
+    """
+    One !miniTicker@arr frame with market_size tickers
+    """
+    return json.dumps(binance_tickers(market_size))
+
+
+def kucoin_tickers(count: int) -> list[dict[str, Any]]:
+    """
+    count ticker messages (no welcome / ack), as the raw consumer hands them to the transformer
+    """
+    messages: list[dict[str, Any]] = [
+        message for message in KUCOIN_RECORDED_TICKERS if "subject" in message
+    ]
+    tickers: list[dict[str, Any]] = []
+    for i in range(count):
+        ticker: dict[str, Any] = dict(messages[i % len(messages)])
+        ticker["subject"] = f"SYM{i}-{ticker['subject'].split('-')[1]}"
+        tickers.append(ticker)
+    return tickers
+
+
+def kucoin_frames(count: int) -> list[str]:
+    """
+    count Kucoin frames replaying the recorded messages, including the welcome and ack messages
+    """
+    return [
+        json.dumps(KUCOIN_RECORDED_TICKERS[i % len(KUCOIN_RECORDED_TICKERS)])
+        for i in range(count)
+    ]
+
+
+def kucoin_market_frames(market_size: int) -> list[str]:
+    """
+    One /market/ticker:all update per symbol of a market_size market, ticker:all pushes every
+    symbol in its own frame
+    """
+    return [json.dumps(ticker) for ticker in kucoin_tickers(market_size)]
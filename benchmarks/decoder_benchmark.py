@@ -0,0 +1,58 @@
+"""
+Frames/sec of the extractor frame decoders on recorded payloads.
+
+Run from the repository root:
+    python -m benchmarks.decoder_benchmark
+"""
+
+import time
+from typing import Any, Type
+
+from benchmarks.benchmark_utils.payloads import binance_frame, kucoin_frames
+from src.common.decoders import DecodeMode, build_decoder
+from src.models.binance_model import BinanceRawData
+from src.models.kucoin_model import KucoinRawData
+
+MODES: tuple[DecodeMode, ...] = ("validate", "trusted")
+
+
+def frames_per_second(
+    model: Type[Any],
+    mode: DecodeMode,
+    frames: list[str],
+    is_array: bool,
+    required_keys: tuple[str, ...] = (),
+    min_duration_s: float = 1.0,
+) -> float:
+    decoder = build_decoder(model, mode, is_array=is_array, required_keys=required_keys)
+    decoded: int = 0
+    start_s: float = time.perf_counter()
+    while (elapsed_s := time.perf_counter() - start_s) < min_duration_s:
+        for frame in frames:
+            decoder.decode(frame)
+        decoded += len(frames)
+    return decoded / elapsed_s
+
+
+def main() -> None:
+    print(f"{'feed':<28}{'mode':<10}{'frames/s':>14}")
+    for market_size in (100, 2000):
+        frames: list[str] = [binance_frame(market_size)]
+        for mode in MODES:
+            fps: float = frames_per_second(BinanceRawData, mode, frames, is_array=True)
+            print(f"{f'binance ({market_size} tickers)':<28}{mode:<10}{fps:>14,.1f}")
+
+    kucoin: list[str] = kucoin_frames(1000)
+    for mode in MODES:
+        fps = frames_per_second(
+            KucoinRawData,
+            mode,
+            kucoin,
+            is_array=False,
+            required_keys=("subject", "data"),
+        )
+        print(f"{'kucoin':<28}{mode:<10}{fps:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
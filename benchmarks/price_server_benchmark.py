@@ -0,0 +1,118 @@
+"""
+Latency of the latest price store and load test of its HTTP API.
+
+Run from the repository root:
+    python -m benchmarks.price_server_benchmark
+1. in-process: µs per store operation with a full market of symbols loaded
+2. HTTP: requests/s and p50 / p99 latency per endpoint, concurrent clients against a local server.
+   Client and server share one event loop here, so these are lower bounds for a dedicated server.
+"""
+
+import asyncio
+import random
+import statistics
+import time
+from typing import Any, Callable
+
+import aiohttp
+from aiohttp import web
+
+from src.services.serving.latest_price_store import LatestPriceStore
+from src.services.serving.price_server import build_app
+
+SYMBOL_COUNT: int = 2000
+CONCURRENCY: int = 32
+LOAD_DURATION_S: float = 3.0
+
+
+def populated_store(symbol_count: int = SYMBOL_COUNT) -> LatestPriceStore:
+    store: LatestPriceStore = LatestPriceStore()
+    for index in range(symbol_count):
+        for source in ("kucoin", "binance"):
+            store.update(f"SYM{index}USDT", 1.0 + index, 1743147448467, source)
+    return store
+
+
+def us_per_call(call: Callable[[], Any], min_duration_s: float = 0.5) -> float:
+    call()  # warm up
+    runs: int = 0
+    start_s: float = time.perf_counter()
+    while (elapsed_s := time.perf_counter() - start_s) < min_duration_s:
+        call()
+        runs += 1
+    return elapsed_s / runs * 1_000_000
+
+
+def bench_store() -> None:
+    store: LatestPriceStore = populated_store()
+    symbols: list[str] = [f"SYM{index}USDT" for index in range(20)]
+    ticks: list[int] = [0]
+
+    def update() -> None:
+        ticks[0] += 1
+        store.update("SYM1USDT", 2.0, 1743147448467 + ticks[0], "binance")
+
+    def snapshot_uncached() -> None:
+        update()
+        store.snapshot_json()
+
+    print(f"{'store operation':<32}{'µs':>10}")
+    for name, call in (
+        ("update", update),
+        ("get", lambda: store.get("SYM1USDT")),
+        ("get_many (20 symbols)", lambda: store.get_many(symbols)),
+        ("snapshot_json (cached)", store.snapshot_json),
+        ("update + snapshot_json", snapshot_uncached),
+    ):
+        print(f"{name:<32}{us_per_call(call):>10.2f}")
+
+
+async def load(session: aiohttp.ClientSession, url: str) -> list[float]:
+    deadline: float = time.perf_counter() + LOAD_DURATION_S
+    latencies: list[float] = []
+    while (started := time.perf_counter()) < deadline:
+        async with session.get(url) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def bench_http() -> None:
+    runner: web.AppRunner = web.AppRunner(build_app(populated_store()), access_log=None)
+    await runner.setup()
+    site: web.TCPSite = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port: int = runner.addresses[0][1]
+    base_url: str = f"http://127.0.0.1:{port}"
+    symbols: str = ",".join(
+        f"SYM{index}USDT" for index in random.sample(range(SYMBOL_COUNT), 20)
+    )
+    print(f"\n{'endpoint':<32}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    connector: aiohttp.TCPConnector = aiohttp.TCPConnector(limit=CONCURRENCY)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for name, path in (
+            ("single symbol", "/prices/SYM1USDT"),
+            ("20 symbols", f"/prices?symbols={symbols}"),
+            (f"full market ({SYMBOL_COUNT})", "/prices"),
+        ):
+            results: list[list[float]] = await asyncio.gather(
+                *(load(session, base_url + path) for _ in range(CONCURRENCY))
+            )
+            latencies: list[float] = sorted(
+                latency for result in results for latency in result
+            )
+            p99: float = latencies[int(len(latencies) * 0.99)]
+            print(
+                f"{name:<32}{len(latencies) / LOAD_DURATION_S:>10.0f}"
+                f"{statistics.median(latencies) * 1000:>10.2f}{p99 * 1000:>10.2f}"
+            )
+    await runner.cleanup()
+
+
+def main() -> None:
+    bench_store()
+    asyncio.run(bench_http())
+
+
+if __name__ == "__main__":
+    main()
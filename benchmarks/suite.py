@@ -0,0 +1,356 @@
+"""
+Benchmark suite over the ingest and transform hot paths, on synthetic Binance !miniTicker@arr
+and Kucoin /market/ticker:all payloads at several market sizes.
+
+Run from the repository root:
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+With --compare, cases slower than the baseline by more than --threshold are listed and the
+suite exits with 1, so it can gate a change.
+
+Groups, every case reports records/s:
+1. decode: extractor frame decoders, validate and trusted
+2. batcher: GenericBatcher, a Binance frame extended at once, Kucoin tickers appended one by one
+3. serialize: producer payloads, JSON and columnar
+4. deserialize: consumer payloads back into models, validate and batch
+5. transform: pandas and spark engines
+6. archive: S3 archive formats
+
+Cases whose dependency is missing (pyspark or a JVM, zstandard, pyarrow) are recorded as skipped
+instead of failing the run.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator, NamedTuple, Optional, Type
+
+from pydantic import BaseModel
+
+from benchmarks.benchmark_utils.benchmark import (
+    BenchmarkResult,
+    Regression,
+    compare_results,
+    measure,
+    skipped,
+)
+from benchmarks.benchmark_utils.payloads import (
+    binance_frame,
+    binance_tickers,
+    kucoin_market_frames,
+    kucoin_tickers,
+)
+from src.common.decoders import DecodeMode, build_decoder
+from src.kafka.deserializers import DeserializeMode, deserialize_payload
+from src.kafka.producers import AbstractProducer
+from src.kafka.wire_format import encode_columnar, latest_schema
+from src.models.binance_model import BinanceRawData
+from src.models.kucoin_model import KucoinRawData
+from src.services.batcher.generic_batcher import GenericBatcher
+from src.services.loaders.s3.archive_writer import (
+    ARCHIVE_WRITERS,
+    ArchiveWriter,
+    get_archive_writer,
+)
+from src.services.transformers.transformer_factory import (
+    Transformer,
+    TransformerEngine,
+    build_transformer,
+)
+
+MARKET_SIZES: tuple[int, ...] = (100, 2000)
+DECODE_MODES: tuple[DecodeMode, ...] = ("validate", "trusted")
+DESERIALIZE_MODES: tuple[DeserializeMode, ...] = ("validate", "batch")
+ENGINES: tuple[TransformerEngine, ...] = ("pandas", "spark")
+BATCH_SIZE: int = 500
+
+
+class Case(NamedTuple):
+    name: str
+    params: dict[str, Any]
+    run: Optional[Callable[[], Any]]
+    items_per_run: int
+    skipped: Optional[str] = None
+
+
+def decode_cases(market_size: int) -> Iterator[Case]:
+    binance: str = binance_frame(market_size)
+    kucoin: list[str] = kucoin_market_frames(market_size)
+    for mode in DECODE_MODES:
+        binance_decoder = build_decoder(BinanceRawData, mode, is_array=True)
+        kucoin_decoder = build_decoder(
+            KucoinRawData, mode, is_array=False, required_keys=("subject", "data")
+        )
+        yield Case(
+            "decode",
+            {"feed": "binance", "mode": mode, "market_size": market_size},
+            lambda decoder=binance_decoder: decoder.decode(binance),
+            market_size,
+        )
+        yield Case(
+            "decode",
+            {"feed": "kucoin", "mode": mode, "market_size": market_size},
+            lambda decoder=kucoin_decoder: [decoder.decode(f) for f in kucoin],
+            market_size,
+        )
+
+
+def batcher_cases(market_size: int) -> Iterator[Case]:
+    binance: list[BinanceRawData] = [
+        BinanceRawData(**ticker) for ticker in binance_tickers(market_size)
+    ]
+    kucoin: list[KucoinRawData] = [
+        KucoinRawData(**ticker) for ticker in kucoin_tickers(market_size)
+    ]
+    batcher: GenericBatcher[Any] = GenericBatcher(BATCH_SIZE, batch_timeout_s=60)
+
+    def extend_frame() -> None:
+        batcher.extend(binance)
+        if batcher.batch_ready():
+            batcher.take_batch()
+
+    def append_tickers() -> None:
+        for ticker in kucoin:
+            batcher.append(ticker)
+            if batcher.batch_ready():
+                batcher.take_batch()
+
+    params: dict[str, Any] = {"batch_size": BATCH_SIZE, "market_size": market_size}
+    yield Case("batcher", {"feed": "binance", **params}, extend_frame, market_size)
+    yield Case("batcher", {"feed": "kucoin", **params}, append_tickers, market_size)
+
+
+def produced_batches(market_size: int) -> Iterator[tuple[str, list[BaseModel]]]:
+    yield "binance_raw", [
+        BinanceRawData(**ticker) for ticker in binance_tickers(market_size)
+    ]
+    yield "kucoin_raw", [
+        KucoinRawData(**ticker) for ticker in kucoin_tickers(market_size)
+    ]
+    yield "binance_transformed", list(
+        build_transformer("pandas").transform_binance(binance_tickers(market_size))
+    )
+
+
+def serialize_cases(market_size: int) -> Iterator[Case]:
+    for feed, batch in produced_batches(market_size):
+        schema = latest_schema(type(batch[0]))
+        params: dict[str, Any] = {"feed": feed, "market_size": market_size}
+        yield Case(
+            "serialize",
+            {"format": "json", **params},
+            lambda batch=batch: AbstractProducer.serialize(batch).encode("utf-8"),
+            market_size,
+        )
+        yield Case(
+            "serialize",
+            {"format": "columnar", **params},
+            lambda batch=batch, schema=schema: encode_columnar(schema, batch),
+            market_size,
+        )
+
+
+def deserialize_cases(market_size: int) -> Iterator[Case]:
+    for feed, batch in produced_batches(market_size):
+        model: Type[BaseModel] = type(batch[0])
+        schema = latest_schema(model)
+        payloads: list[tuple[str, bytes, Optional[str]]] = [
+            ("json", AbstractProducer.serialize(batch).encode("utf-8"), None),
+            ("columnar", encode_columnar(schema, batch), schema.schema_id),
+        ]
+        for wire_format, payload, schema_id in payloads:
+            for mode in DESERIALIZE_MODES:
+                yield Case(
+                    "deserialize",
+                    {
+                        "feed": feed,
+                        "format": wire_format,
+                        "mode": mode,
+                        "market_size": market_size,
+                    },
+                    lambda model=model, mode=mode, payload=payload, schema_id=schema_id: (
+                        deserialize_payload(model, mode, payload, schema_id)
+                    ),
+                    market_size,
+                )
+
+
+# Engines are built once for the whole run, a SparkSession takes seconds to start
+_transformers: dict[TransformerEngine, Transformer | Exception] = {}
+
+
+def _transformer(engine: TransformerEngine) -> Transformer | Exception:
+    if engine not in _transformers:
+        try:
+            _transformers[engine] = build_transformer(engine)
+        except Exception as e:
+            _transformers[engine] = e
+    return _transformers[engine]
+
+
+def transform_cases(market_size: int) -> Iterator[Case]:
+    binance: list[dict[str, Any]] = binance_tickers(market_size)
+    kucoin: list[dict[str, Any]] = kucoin_tickers(market_size)
+    for engine in ENGINES:
+        transformer: Transformer | Exception = _transformer(engine)
+        for feed in ("binance", "kucoin"):
+            params: dict[str, Any] = {
+                "engine": engine,
+                "feed": feed,
+                "market_size": market_size,
+            }
+            if isinstance(transformer, Exception):
+                yield Case("transform", params, None, 0, skipped=repr(transformer))
+            elif feed == "binance":
+                yield Case(
+                    "transform",
+                    params,
+                    lambda t=transformer: t.transform_binance(binance),
+                    market_size,
+                )
+            else:
+                yield Case(
+                    "transform",
+                    params,
+                    lambda t=transformer: t.transform_kucoin(kucoin),
+                    market_size,
+                )
+
+
+def archive_cases(market_size: int) -> Iterator[Case]:
+    # The raw consumer hands the S3 loader plain dicts, not models
+    records: list[dict[str, Any]] = binance_tickers(market_size)
+    for archive_format in ARCHIVE_WRITERS:
+        params: dict[str, Any] = {"format": archive_format, "market_size": market_size}
+        try:
+            writer: ArchiveWriter = get_archive_writer(archive_format)
+        except ImportError as e:
+            yield Case("archive", params, None, 0, skipped=str(e))
+            continue
+        yield Case("archive", params, lambda w=writer: w.encode(records), market_size)
+
+
+GROUPS: dict[str, Callable[[int], Iterator[Case]]] = {
+    "decode": decode_cases,
+    "batcher": batcher_cases,
+    "serialize": serialize_cases,
+    "deserialize": deserialize_cases,
+    "transform": transform_cases,
+    "archive": archive_cases,
+}
+
+
+def run_suite(
+    groups: list[str],
+    market_sizes: list[int],
+    min_duration_s: float = 0.5,
+    repeats: int = 3,
+) -> list[BenchmarkResult]:
+    results: list[BenchmarkResult] = []
+    for group in groups:
+        for market_size in market_sizes:
+            for case in GROUPS[group](market_size):
+                if case.run is None:
+                    result: BenchmarkResult = skipped(
+                        case.name, case.skipped or "", case.params
+                    )
+                else:
+                    result = measure(
+                        case.name,
+                        case.run,
+                        case.items_per_run,
+                        case.params,
+                        min_duration_s=min_duration_s,
+                        repeats=repeats,
+                    )
+                print_result(result)
+                results.append(result)
+    return results
+
+
+def print_result(result: BenchmarkResult) -> None:
+    if result.skipped is not None:
+        print(f"{result.key:<80}skipped: {result.skipped}")
+    else:
+        print(
+            f"{result.key:<80}{result.items_per_s:>16,.0f} rec/s"
+            f"{result.us_per_run:>14,.1f} µs/run"
+        )
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, results: list[BenchmarkResult]) -> None:
+    report: dict[str, Any] = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [result.to_json() for result in results],
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {path}")
+
+
+def read_results(path: str) -> list[BenchmarkResult]:
+    with open(path) as f:
+        report: dict[str, Any] = json.load(f)
+    return [BenchmarkResult.from_json(result) for result in report["results"]]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--market-sizes", type=int, nargs="+", default=list(MARKET_SIZES)
+    )
+    parser.add_argument(
+        "--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS)
+    )
+    parser.add_argument("--min-duration-s", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--compare", help="JSON results of a baseline run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative throughput drop reported as a regression",
+    )
+    args = parser.parse_args()
+
+    results: list[BenchmarkResult] = run_suite(
+        args.groups, args.market_sizes, args.min_duration_s, args.repeats
+    )
+    if args.output:
+        write_results(args.output, results)
+    if not args.compare:
+        return 0
+    regressions: list[Regression] = compare_results(
+        read_results(args.compare), results, args.threshold
+    )
+    for regression in regressions:
+        print(
+            f"REGRESSION {regression.key}: {regression.baseline_items_per_s:,.0f} -> "
+            f"{regression.items_per_s:,.0f} rec/s ({regression.change:+.1%})"
+        )
+    if not regressions:
+        print(f"No regression beyond {args.threshold:.0%} against {args.compare}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
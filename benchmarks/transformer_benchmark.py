@@ -0,0 +1,57 @@
+"""
+Per-batch latency of the transform engines across batch sizes.
+
+Run from the repository root:
+    python -m benchmarks.transformer_benchmark
+The spark engine is skipped when pyspark (or a JVM) is not available.
+"""
+
+import time
+from typing import Any, Callable
+
+from benchmarks.benchmark_utils.payloads import binance_tickers, kucoin_tickers
+from src.services.transformers.transformer_factory import (
+    Transformer,
+    TransformerEngine,
+    build_transformer,
+)
+
+BATCH_SIZES: tuple[int, ...] = (10, 50, 500, 5000)
+ENGINES: tuple[TransformerEngine, ...] = ("pandas", "spark")
+
+
+def ms_per_batch(
+    transform: Callable[[list[dict[str, Any]]], list[Any]],
+    batch: list[dict[str, Any]],
+    min_duration_s: float = 1.0,
+) -> float:
+    transform(batch)  # warm up
+    runs: int = 0
+    start_s: float = time.perf_counter()
+    while (elapsed_s := time.perf_counter() - start_s) < min_duration_s:
+        transform(batch)
+        runs += 1
+    return elapsed_s / runs * 1000
+
+
+def main() -> None:
+    print(f"{'engine':<10}{'feed':<10}{'batch':>8}{'ms/batch':>12}")
+    for engine in ENGINES:
+        try:
+            transformer: Transformer = build_transformer(engine)
+        except Exception as e:
+            print(f"{engine:<10}skipped: {e}")
+            continue
+        for batch_size in BATCH_SIZES:
+            kucoin_ms: float = ms_per_batch(
+                transformer.transform_kucoin, kucoin_tickers(batch_size)
+            )
+            binance_ms: float = ms_per_batch(
+                transformer.transform_binance, binance_tickers(batch_size)
+            )
+            print(f"{engine:<10}{'kucoin':<10}{batch_size:>8}{kucoin_ms:>12.3f}")
+            print(f"{engine:<10}{'binance':<10}{batch_size:>8}{binance_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
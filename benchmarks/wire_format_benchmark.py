@@ -0,0 +1,102 @@
+"""
+Payload size and encode / decode throughput of the JSON and columnar Kafka wire formats.
+
+Run from the repository root:
+    python -m benchmarks.wire_format_benchmark
+"""
+
+import functools
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Type
+
+from pydantic import BaseModel
+
+from benchmarks.benchmark_utils.payloads import binance_tickers, kucoin_tickers
+from src.common.decoders import json_loads
+from src.kafka.producers import AbstractProducer
+from src.kafka.wire_format import decode_columnar, encode_columnar, latest_schema
+from src.models.binance_model import BinanceRawData, BinanceTransformedData
+from src.models.kucoin_model import KucoinRawData
+
+BATCH_SIZE: int = 1000
+
+
+def records_per_second(
+    run: Callable[[], Any], records: int, min_duration_s: float = 1.0
+) -> float:
+    run()  # warm up
+    runs: int = 0
+    start_s: float = time.perf_counter()
+    while (elapsed_s := time.perf_counter() - start_s) < min_duration_s:
+        run()
+        runs += 1
+    return runs * records / elapsed_s
+
+
+def transformed_batch(size: int) -> list[BinanceTransformedData]:
+    start: datetime = datetime(2025, 3, 28, 7, 37, 28)
+    return [
+        BinanceTransformedData(
+            symbol=f"SYM{index % 400}USDT",
+            price=1000 + index * 0.01,
+            time=start + timedelta(milliseconds=index),
+            source="binance",
+            created_at=start,
+        )
+        for index in range(size)
+    ]
+
+
+def encode_json(batch: list[BaseModel]) -> bytes:
+    return AbstractProducer.serialize(batch).encode("utf-8")
+
+
+def validate_rows(model: Type[BaseModel], decode: Callable[[], Any]) -> list[BaseModel]:
+    return [model.model_validate(row) for row in decode()]
+
+
+def main() -> None:
+    feeds: list[tuple[str, list[BaseModel]]] = [
+        ("binance raw", [BinanceRawData(**t) for t in binance_tickers(BATCH_SIZE)]),
+        ("kucoin raw", [KucoinRawData(**t) for t in kucoin_tickers(BATCH_SIZE)]),
+        ("transformed", list(transformed_batch(BATCH_SIZE))),
+    ]
+    print(f"{BATCH_SIZE} records per message")
+    print(
+        f"{'feed':<14}{'format':<10}{'bytes':>10}{'encode rec/s':>16}"
+        f"{'decode rec/s':>16}{'validate rec/s':>16}"
+    )
+    for feed, batch in feeds:
+        model: Type[BaseModel] = type(batch[0])
+        schema = latest_schema(model)
+        json_payload: bytes = AbstractProducer.serialize(batch).encode("utf-8")
+        columnar_payload: bytes = encode_columnar(schema, batch)
+        formats: list[tuple[str, bytes, Callable[[], Any], Callable[[], Any]]] = [
+            (
+                "json",
+                json_payload,
+                functools.partial(encode_json, batch),
+                functools.partial(json_loads, json_payload),
+            ),
+            (
+                "columnar",
+                columnar_payload,
+                functools.partial(encode_columnar, schema, batch),
+                functools.partial(decode_columnar, schema, columnar_payload),
+            ),
+        ]
+        for wire_format, payload, encode, decode in formats:
+            encode_rate: float = records_per_second(encode, len(batch))
+            decode_rate: float = records_per_second(decode, len(batch))
+            validate_rate: float = records_per_second(
+                functools.partial(validate_rows, model, decode), len(batch)
+            )
+            print(
+                f"{feed:<14}{wire_format:<10}{len(payload):>10,}{encode_rate:>16,.0f}"
+                f"{decode_rate:>16,.0f}{validate_rate:>16,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ from sqlalchemy import pool
 
 from alembic import context
 
-from database.tables import metadata
+from database.tables import metadata, PRICE_HISTORY_PARTITION_PREFIX
 
 
 load_dotenv()
@@ -27,6 +27,20 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata = metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """
+    Daily price_history partitions are managed at runtime, keep autogenerate from dropping them
+    """
+    if (
+        type_ == "table"
+        and reflected
+        and name.startswith(PRICE_HISTORY_PARTITION_PREFIX)
+    ):
+        return False
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -49,6 +63,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -71,7 +86,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -1,4 +1,4 @@
-from sqlalchemy import MetaData, TEXT, Table, Column, FLOAT, DateTime
+from sqlalchemy import MetaData, TEXT, Table, Column, FLOAT, DateTime, Index, INTEGER
 
 metadata: MetaData = MetaData()
 
@@ -15,7 +15,7 @@ kucoin_table: Table = Table(
 
 
 binance_table: Table = Table(
-    "kucoin_result",
+    "binance_result",
     metadata,
     Column("symbol", TEXT, primary_key=True),
     Column("price", FLOAT, nullable=False),
@@ -23,3 +23,39 @@ binance_table: Table = Table(
     Column("source", TEXT, nullable=False),
     Column("created_at", DateTime, nullable=False),
 )
+
+
+# Full tick history for both exchanges, range partitioned by day on time.
+# Partitions (price_history_pYYYYMMDD) are created and dropped by PricePartitionManager, not by migrations.
+PRICE_HISTORY_PARTITION_PREFIX: str = "price_history_p"
+
+price_history_table: Table = Table(
+    "price_history",
+    metadata,
+    Column("symbol", TEXT, nullable=False),
+    Column("price", FLOAT, nullable=False),
+    Column("time", DateTime, nullable=False),
+    Column("source", TEXT, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_price_history_symbol_time", "symbol", "time"),
+    Index("ix_price_history_time", "time"),
+    postgresql_partition_by="RANGE (time)",
+)
+
+
+# Closed OHLC bars from the candle aggregator, one row per source, symbol, interval and bar
+candles_table: Table = Table(
+    "candles",
+    metadata,
+    Column("source", TEXT, primary_key=True),
+    Column("symbol", TEXT, primary_key=True),
+    Column("interval", TEXT, primary_key=True),
+    Column("open_time", DateTime, primary_key=True),
+    Column("close_time", DateTime, nullable=False),
+    Column("open", FLOAT, nullable=False),
+    Column("high", FLOAT, nullable=False),
+    Column("low", FLOAT, nullable=False),
+    Column("close", FLOAT, nullable=False),
+    Column("tick_count", INTEGER, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+)
@@ -0,0 +1,39 @@
+"""create kucoin_result and binance_result
+
+Revision ID: 1b7d0e4a2c58
+Revises:
+Create Date: 2026-10-17 08:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "1b7d0e4a2c58"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Latest price per symbol, the primary key is the conflict target of PostgresLoader's upsert
+    for table_name in ("kucoin_result", "binance_result"):
+        op.create_table(
+            table_name,
+            sa.Column("symbol", sa.TEXT(), nullable=False),
+            sa.Column("price", sa.FLOAT(), nullable=False),
+            sa.Column("time", sa.DateTime(), nullable=False),
+            sa.Column("source", sa.TEXT(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint("symbol"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("binance_result")
+    op.drop_table("kucoin_result")
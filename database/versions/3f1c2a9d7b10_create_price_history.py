@@ -0,0 +1,42 @@
+"""create daily partitioned price_history
+
+Revision ID: 3f1c2a9d7b10
+Revises: 1b7d0e4a2c58
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1c2a9d7b10"
+down_revision: Union[str, None] = "1b7d0e4a2c58"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "price_history",
+        sa.Column("symbol", sa.TEXT(), nullable=False),
+        sa.Column("price", sa.FLOAT(), nullable=False),
+        sa.Column("time", sa.DateTime(), nullable=False),
+        sa.Column("source", sa.TEXT(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        postgresql_partition_by="RANGE (time)",
+    )
+    # Indexes on the parent are created on every partition, existing and future
+    op.create_index("ix_price_history_symbol_time", "price_history", ["symbol", "time"])
+    op.create_index("ix_price_history_time", "price_history", ["time"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_price_history_time", table_name="price_history")
+    op.drop_index("ix_price_history_symbol_time", table_name="price_history")
+    # Dropping the parent drops every partition with it
+    op.drop_table("price_history")
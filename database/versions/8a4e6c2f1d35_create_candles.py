@@ -0,0 +1,43 @@
+"""create candles
+
+Revision ID: 8a4e6c2f1d35
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "8a4e6c2f1d35"
+down_revision: Union[str, None] = "3f1c2a9d7b10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The primary key doubles as the index for "bars of a symbol over a time range" queries
+    op.create_table(
+        "candles",
+        sa.Column("source", sa.TEXT(), nullable=False),
+        sa.Column("symbol", sa.TEXT(), nullable=False),
+        sa.Column("interval", sa.TEXT(), nullable=False),
+        sa.Column("open_time", sa.DateTime(), nullable=False),
+        sa.Column("close_time", sa.DateTime(), nullable=False),
+        sa.Column("open", sa.FLOAT(), nullable=False),
+        sa.Column("high", sa.FLOAT(), nullable=False),
+        sa.Column("low", sa.FLOAT(), nullable=False),
+        sa.Column("close", sa.FLOAT(), nullable=False),
+        sa.Column("tick_count", sa.INTEGER(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("source", "symbol", "interval", "open_time"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("candles")
@@ -0,0 +1,122 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+import toml
+from dotenv import load_dotenv
+
+from src.kafka.consumers import BinanceTransformedConsumer, KucoinTransformedConsumer
+from src.kafka.producers import AsyncCandleProducer
+from src.services.candles.candle_aggregator import CandleAggregator
+from src.services.loaders.postgres.candle_loader import CandleLoader
+from src.services.transformers.transform_pipeline import TransformPipeline
+from src.utils.generic_logger import logger_setup
+from src.utils.metrics import ProcessMetrics
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+
+class CandleProcess:
+    """
+    High level orchestrator for OHLC bars:
+    1. Consume from kucoin_transformed_data and binance_transformed_data topics
+    2. Fold every tick into its open bars in the shared CandleAggregator, windowed on event time
+    3. Produce the bars closed by the watermark to candles, and upsert them into Postgres when enabled
+    4. Commit the transformed offsets once the bars are acknowledged and written, never past the
+       oldest tick still feeding an open bar: a restart replays those ticks and rebuilds the bar
+
+    Open bars live in memory, so this runs as a single instance per consumer group.
+    The longest interval bounds the replay, up to an hour of ticks with 1h bars, and bars closed
+    before the restart may be produced again from part of their ticks.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self._metrics: ProcessMetrics = ProcessMetrics.from_config(config, "candles")
+        kafka_config: dict[str, Any] = config["kafka"]
+        candles_config: dict[str, Any] = dict(config.get("candles", {}))
+        write_postgres: bool = candles_config.pop("write_postgres", False)
+        if "intervals" in candles_config:
+            candles_config["intervals"] = tuple(candles_config["intervals"])
+        self._aggregator = CandleAggregator(**candles_config)
+        self._loader: Optional[CandleLoader] = None
+        if write_postgres:
+            self._loader = CandleLoader(
+                os.getenv("ASYNC_POSTGRES_URL", config["postgres"]["connection_string"])
+            )
+        self._kucoin_consumer = KucoinTransformedConsumer(
+            self._format_kafka_config(kafka_config["consumer"]["kucoin_candles"])
+        )
+        self._binance_consumer = BinanceTransformedConsumer(
+            self._format_kafka_config(kafka_config["consumer"]["binance_candles"])
+        )
+        self._producer = AsyncCandleProducer(
+            producer_config=self._format_kafka_config(
+                kafka_config["producer"]["candles"]
+            )
+        )
+        # Both pipelines update the same aggregator, a single thread serializes them without locks
+        self._aggregator_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="candle-aggregator"
+        )
+        self._kucoin_pipeline = TransformPipeline(
+            name="kucoin-candles",
+            trace_stage="candles",
+            consumer=self._kucoin_consumer,
+            producer=self._producer,
+            transform=functools.partial(self._aggregator.apply, stream="kucoin"),
+            transform_executor=self._aggregator_executor,
+            sink=self._loader.write if self._loader is not None else None,
+            held_since=functools.partial(self._aggregator.oldest_held_batch, "kucoin"),
+        )
+        self._binance_pipeline = TransformPipeline(
+            name="binance-candles",
+            trace_stage="candles",
+            consumer=self._binance_consumer,
+            producer=self._producer,
+            transform=functools.partial(self._aggregator.apply, stream="binance"),
+            transform_executor=self._aggregator_executor,
+            sink=self._loader.write if self._loader is not None else None,
+            held_since=functools.partial(self._aggregator.oldest_held_batch, "binance"),
+        )
+
+    @staticmethod
+    def _format_kafka_config(kafka_config: dict[str, Any]) -> dict[str, Any]:
+        return {key.replace("_", "."): value for key, value in kafka_config.items()}
+
+    def stop(self) -> None:
+        self._kucoin_pipeline.stop()
+        self._binance_pipeline.stop()
+
+    async def start(self) -> None:
+        print("Candle Process Started")
+        self._metrics.start()
+        try:
+            if self._loader is not None:
+                await self._loader.start()
+            await asyncio.gather(
+                self._kucoin_pipeline.run(),
+                self._binance_pipeline.run(),
+            )
+        finally:
+            await self._producer.close()
+            if self._loader is not None:
+                await self._loader.close()
+            self._kucoin_consumer.close()
+            self._binance_consumer.close()
+            self._aggregator_executor.shutdown(wait=True)
+            await self._metrics.stop()
+            print(f"Candle Process Stopped, {self._aggregator.late_ticks} late tick(s)")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    try:
+        config: dict[str, Any] = toml.load("src/config/config.toml")
+        candle_process: CandleProcess = CandleProcess(config=config)
+        asyncio.run(candle_process.start())
+    except KeyboardInterrupt:
+        print("Keyboard interrupted")
@@ -0,0 +1,180 @@
+"""
+Frame decoders turn a raw websocket / Kafka payload into validated models.
+
+1. validate: json.loads then model_validate on every item, reports exactly which item is bad
+2. trusted: one validation call per frame through a pydantic TypeAdapter, parsing straight from the raw
+   str / bytes in pydantic-core without building intermediate dicts
+
+An optional symbol filter is applied before validation, so dropped pairs never get validated.
+"""
+
+import json
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Generic, Literal, Optional, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    # Optional faster JSON backend, falls back to the stdlib when not installed
+    import orjson
+except ImportError:
+    orjson = None
+
+DecodeMode = Literal["validate", "trusted"]
+DecodedModel = TypeVar("DecodedModel", bound=BaseModel)
+
+
+def json_loads(raw: str | bytes) -> Any:
+    """
+    Deserializes JSON with orjson when available, else the stdlib json module
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serializes to UTF-8 JSON bytes with orjson when available, else the stdlib json module
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+class FrameDecoder(ABC, Generic[DecodedModel]):
+    """
+    Decodes a single frame into a list of models.
+    - is_array: frame is a JSON array of items (Binance), else a single JSON object (Kucoin)
+    - required_keys: object frames missing any of these keys (welcome / ack messages) decode to []
+    - symbol_key / symbol_filter: items whose symbol_key value is rejected by symbol_filter are dropped
+    """
+
+    def __init__(
+        self,
+        model: Type[DecodedModel],
+        is_array: bool,
+        required_keys: tuple[str, ...] = (),
+        symbol_key: Optional[str] = None,
+        symbol_filter: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        self._model: Type[DecodedModel] = model
+        self._is_array: bool = is_array
+        self._required_keys: tuple[str, ...] = required_keys
+        self._symbol_key: Optional[str] = symbol_key
+        self._symbol_filter: Optional[Callable[[str], bool]] = (
+            symbol_filter if symbol_key is not None else None
+        )
+
+    @abstractmethod
+    def decode(self, raw: str | bytes) -> list[DecodedModel]:
+        raise NotImplementedError()
+
+    def _keep(self, item: Any) -> bool:
+        """
+        Items without a string symbol are kept, validation rejects them rather than the filter
+        """
+        if self._symbol_filter is None:
+            return True
+        assert self._symbol_key is not None
+        symbol: Any = item.get(self._symbol_key) if isinstance(item, dict) else None
+        return not isinstance(symbol, str) or self._symbol_filter(symbol)
+
+
+class ValidatingFrameDecoder(FrameDecoder[DecodedModel]):
+    """
+    Original behaviour of the extractors, one model_validate per item
+    """
+
+    def decode(self, raw: str | bytes) -> list[DecodedModel]:
+        payload: Any = json_loads(raw)
+        if not self._is_array:
+            if not all(key in payload for key in self._required_keys):
+                return []
+            if not self._keep(payload):
+                return []
+            return [self._model.model_validate(payload)]
+        return [
+            self._model.model_validate(item) for item in payload if self._keep(item)
+        ]
+
+
+class TrustedFrameDecoder(FrameDecoder[DecodedModel]):
+    """
+    For feeds whose schema we trust. The whole frame is validated in a single call and an error
+    rejects the frame rather than pinpointing the item.
+    Array frames only take the validate_json path without a symbol filter: with one, the frame is
+    parsed first so rejected items are dropped before validation.
+    """
+
+    def __init__(
+        self,
+        model: Type[DecodedModel],
+        is_array: bool,
+        required_keys: tuple[str, ...] = (),
+        symbol_key: Optional[str] = None,
+        symbol_filter: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        super().__init__(
+            model=model,
+            is_array=is_array,
+            required_keys=required_keys,
+            symbol_key=symbol_key,
+            symbol_filter=symbol_filter,
+        )
+        self._list_adapter: TypeAdapter[list[DecodedModel]] = TypeAdapter(list[model])  # type: ignore[valid-type]
+        self._item_adapter: TypeAdapter[DecodedModel] = TypeAdapter(model)
+        # Cheap substring check so control frames never reach the validator
+        self._required_markers: tuple[str, ...] = tuple(
+            f'"{key}"' for key in required_keys
+        )
+        # Object frames carry a single symbol, read it with a regex rather than parsing the frame
+        self._symbol_pattern: Optional[re.Pattern[str]] = (
+            re.compile(rf'"{re.escape(symbol_key)}"\s*:\s*"([^"]*)"')
+            if symbol_key is not None
+            else None
+        )
+
+    def decode(self, raw: str | bytes) -> list[DecodedModel]:
+        if self._is_array:
+            if self._symbol_filter is None:
+                return self._list_adapter.validate_json(raw)
+            items: list[dict[str, Any]] = json_loads(raw)
+            return self._list_adapter.validate_python(
+                [item for item in items if self._keep(item)]
+            )
+        text: str = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+        if not all(marker in text for marker in self._required_markers):
+            return []
+        if self._symbol_filter is not None and self._symbol_pattern is not None:
+            match: Optional[re.Match[str]] = self._symbol_pattern.search(text)
+            if match is None or not self._symbol_filter(match.group(1)):
+                return []
+        return [self._item_adapter.validate_json(raw)]
+
+
+def build_decoder(
+    model: Type[DecodedModel],
+    mode: DecodeMode,
+    is_array: bool,
+    required_keys: tuple[str, ...] = (),
+    symbol_key: Optional[str] = None,
+    symbol_filter: Optional[Callable[[str], bool]] = None,
+) -> FrameDecoder[DecodedModel]:
+    """
+    Factory used by the extractors to pick a decoder from ExtractorParams.decode_mode
+    """
+    decoder_cls: Optional[Type[FrameDecoder[DecodedModel]]] = {
+        "validate": ValidatingFrameDecoder,
+        "trusted": TrustedFrameDecoder,
+    }.get(mode)
+    if decoder_cls is None:
+        raise ValueError(f"Unknown decode mode: {mode}")
+    return decoder_cls(
+        model=model,
+        is_array=is_array,
+        required_keys=required_keys,
+        symbol_key=symbol_key,
+        symbol_filter=symbol_filter,
+    )
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import toml
+from dotenv import load_dotenv
+
+from src.kafka.consumers import BinanceRawConsumer, KucoinRawConsumer
+from src.kafka.producers import AsyncConsolidatedProducer
+from src.services.consolidation.consolidated_book import ConsolidatedBook
+from src.services.transformers.transform_pipeline import TransformPipeline
+from src.utils.generic_logger import logger_setup
+from src.utils.metrics import ProcessMetrics
+from src.utils.symbol_mapper import SymbolMapper, SymbolMapperConfig
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+
+class ConsolidationProcess:
+    """
+    High level orchestrator for the cross-exchange view:
+    1. Consume from kucoin_raw_data and binance_raw_data topics, Kucoin tickers carry best bid / ask
+    2. Map every symbol onto its canonical pair and update the shared ConsolidatedBook
+    3. Produce the pairs whose best bid / ask / last changed to consolidated_prices
+    4. Commit the raw offsets once the consolidated batch is acknowledged
+
+    Both feeds must meet in one book, so this runs as a single instance per consumer group.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self._metrics: ProcessMetrics = ProcessMetrics.from_config(
+            config, "consolidation"
+        )
+        kafka_config: dict[str, Any] = config["kafka"]
+        consolidation_config: dict[str, Any] = dict(config.get("consolidation", {}))
+        mapper_config: SymbolMapperConfig = SymbolMapperConfig(
+            **consolidation_config.pop("symbol_mapper", {})
+        )
+        self._book = ConsolidatedBook(
+            mapper=SymbolMapper(mapper_config), **consolidation_config
+        )
+        self._kucoin_consumer = KucoinRawConsumer(
+            self._format_kafka_config(kafka_config["consumer"]["kucoin_consolidation"])
+        )
+        self._binance_consumer = BinanceRawConsumer(
+            self._format_kafka_config(kafka_config["consumer"]["binance_consolidation"])
+        )
+        self._producer = AsyncConsolidatedProducer(
+            producer_config=self._format_kafka_config(
+                kafka_config["producer"]["consolidated"]
+            )
+        )
+        # Both pipelines update the same book, a single thread serializes them without locks
+        self._book_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="consolidated-book"
+        )
+        self._kucoin_pipeline = TransformPipeline(
+            name="kucoin-consolidation",
+            trace_stage="consolidate",
+            consumer=self._kucoin_consumer,
+            producer=self._producer,
+            transform=self._book.apply_kucoin,
+            transform_executor=self._book_executor,
+        )
+        self._binance_pipeline = TransformPipeline(
+            name="binance-consolidation",
+            trace_stage="consolidate",
+            consumer=self._binance_consumer,
+            producer=self._producer,
+            transform=self._book.apply_binance,
+            transform_executor=self._book_executor,
+        )
+
+    @staticmethod
+    def _format_kafka_config(kafka_config: dict[str, Any]) -> dict[str, Any]:
+        return {key.replace("_", "."): value for key, value in kafka_config.items()}
+
+    def stop(self) -> None:
+        self._kucoin_pipeline.stop()
+        self._binance_pipeline.stop()
+
+    async def start(self) -> None:
+        print("Consolidation Process Started")
+        self._metrics.start()
+        try:
+            await asyncio.gather(
+                self._kucoin_pipeline.run(),
+                self._binance_pipeline.run(),
+            )
+        finally:
+            await self._producer.close()
+            self._kucoin_consumer.close()
+            self._binance_consumer.close()
+            self._book_executor.shutdown(wait=True)
+            await self._metrics.stop()
+            print("Consolidation Process Stopped")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    try:
+        config: dict[str, Any] = toml.load("src/config/config.toml")
+        consolidation_process: ConsolidationProcess = ConsolidationProcess(
+            config=config
+        )
+        asyncio.run(consolidation_process.start())
+    except KeyboardInterrupt:
+        print("Keyboard interrupted")
@@ -1,29 +1,64 @@
 import asyncio
+import functools
 import logging
 from datetime import datetime
-from queue import Queue
-from typing import Any
+from typing import Any, Callable, Optional
 import toml
 from dotenv import load_dotenv
 
-from src.kafka.producers import RawKucoinProducer, RawBinanceProducer
+from src.kafka.producers import AsyncRawKucoinProducer, AsyncRawBinanceProducer
 from src.models.kucoin_model import KucoinRawData
-from src.services.batcher.generic_batcher import GenericBatcher
+from src.services.batcher.async_batcher import AsyncBatcher
 from src.services.extractors.binance_extractor import (
     BinanceExtractor,
     BinanceExtractorParams,
 )
+from src.services.extractors.delta_encoder import (
+    BinanceDeltaEncoder,
+    DeltaEncoderParams,
+    EncodedFrame,
+)
 from src.services.extractors.kucoin_extractor import (
     KucoinExtractor,
     KucoinExtractorParams,
 )
 from src.services.loaders.s3.s3_explorer import S3Explorer
-from src.services.loaders.s3.s3_explorer_thread import S3ExplorerThread
+from src.services.loaders.s3.s3_uploader_pool import S3UploaderPool
 from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import LatencyTrace
+from src.utils.metrics import REGISTRY, ProcessMetrics
 
 logger: logging.Logger = logging.Logger(__name__)
 logger_setup(logger)
 
+EXTRACTOR_DELIVERY_FAILURES = REGISTRY.counter(
+    "extractor_delivery_failures_total",
+    "Produced batches the broker did not acknowledge",
+    ("source",),
+)
+
+
+def track_delivery(
+    delivery: "asyncio.Future[Any]",
+    source: str,
+    on_delivered: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Logs and counts a failed delivery, runs on_delivered once the broker acknowledged the batch
+    """
+
+    def on_done(future: "asyncio.Future[Any]") -> None:
+        if future.cancelled():
+            return
+        err: Optional[BaseException] = future.exception()
+        if err is not None:
+            EXTRACTOR_DELIVERY_FAILURES.labels(source).inc()
+            print(f"[{source}] ERROR: batch was not delivered: {err}")
+        elif on_delivered is not None:
+            on_delivered()
+
+    delivery.add_done_callback(on_done)
+
 
 class RawExtractorProcess:
     """
@@ -32,14 +67,19 @@ class RawExtractorProcess:
     2. Calling extract on kucoin
     3. Batcher that batches kucoin
     4. Producing by RawKucoinProducer
-    5. Producing by RawBinanceProducer
-    6. Spinning up S3Uploader as background thread
+    5. Producing by RawBinanceProducer, only the tickers that changed plus periodic keyframes
+    6. Spinning up S3UploaderPool to archive both feeds in the background
+
+    Every produced batch starts its latency trace, see src.utils.latency_trace
     """
 
     def __init__(
         self,
         producer_config: dict[str, Any],
     ) -> None:
+        self._metrics: ProcessMetrics = ProcessMetrics.from_config(
+            producer_config, "extractor"
+        )
         kucoin_kafka_config = producer_config["kafka"]["producer"]["kucoin_raw"]
         binance_kafka_config = producer_config["kafka"]["producer"]["binance_raw"]
         kucoin_formatted_producer_config: dict[str, Any] = {
@@ -48,43 +88,79 @@ class RawExtractorProcess:
         binance_formatted_producer_config: dict[str, Any] = {
             key.replace("_", "."): value for key, value in binance_kafka_config.items()
         }
-        self._kucoin_batcher = GenericBatcher[KucoinRawData](
-            batch_size=50, batch_timeout_s=1
+        self._kucoin_batcher = AsyncBatcher[KucoinRawData](
+            batch_size=50,
+            batch_timeout_s=1,
+            on_flush=self._flush_kucoin_batch,
+            name="kucoin",
         )
-        self._kucoin_producer = RawKucoinProducer(
+        self._kucoin_producer = AsyncRawKucoinProducer(
             producer_config=kucoin_formatted_producer_config
         )
-        self._binance_producer = RawBinanceProducer(
+        self._binance_producer = AsyncRawBinanceProducer(
             producer_config=binance_formatted_producer_config
         )
+        extractor_config: dict[str, Any] = producer_config.get("extractor", {})
+        self._kucoin_params = KucoinExtractorParams(
+            **extractor_config.get("kucoin", {})
+        )
+        binance_config: dict[str, Any] = dict(extractor_config.get("binance", {}))
+        delta_params: DeltaEncoderParams = DeltaEncoderParams(
+            **binance_config.pop("delta", {})
+        )
+        self._binance_params = BinanceExtractorParams(**binance_config)
+        self._binance_delta_encoder: Optional[BinanceDeltaEncoder] = (
+            BinanceDeltaEncoder(delta_params) if delta_params.enabled else None
+        )
         self._kucoin_extractor = KucoinExtractor()
+        # Trace of the batch the batcher is filling, merged over every extracted chunk
+        self._kucoin_trace: Optional[LatencyTrace] = None
         self._binance_extractor = BinanceExtractor()
-        self._s3_queue = Queue()
-        self._s3_uploader_thread = S3ExplorerThread(
-            queue=self._s3_queue,
+        self._s3_uploader = S3UploaderPool(
             uploader=S3Explorer(),
             batch_size=99999999,
             batch_timeout_s=60,
+            max_workers=4,
+        )
+
+    async def _flush_kucoin_batch(self, batch: list[KucoinRawData]) -> None:
+        """
+        Called by the batcher on size or deadline, the batch list is ours to keep
+        """
+        trace, self._kucoin_trace = self._kucoin_trace, None
+        delivery = await self._kucoin_producer.produce(
+            batch, headers=trace.stamp("produce").headers if trace else None
+        )
+        # Archived once the broker has it, a failed batch is only logged and counted
+        track_delivery(
+            delivery,
+            "kucoin",
+            functools.partial(
+                self._s3_uploader.submit,
+                "kucoin",
+                [record.model_dump() for record in batch],
+                datetime.utcnow(),
+            ),
         )
 
     async def _run_kucoin_ws(self) -> None:
         try:
-            async for record in self._kucoin_extractor.extract_async(
-                KucoinExtractorParams()
+            async for records in self._kucoin_extractor.extract_async(
+                self._kucoin_params
             ):
                 try:
-                    self._kucoin_batcher.append(record)
-                    if self._kucoin_batcher.batch_ready():
-                        batch: list[KucoinRawData] = self._kucoin_batcher.get_batch()
-                        self._kucoin_producer.produce(batch)
-                        self._s3_queue.put(
-                            (
-                                [record.model_dump() for record in batch],
-                                datetime.utcnow(),
+                    # Before put_many, which may flush the batch these records land in
+                    self._kucoin_trace = LatencyTrace.merge(
+                        (
+                            self._kucoin_trace,
+                            LatencyTrace.start(
                                 "kucoin",
-                            )
+                                min(record.data.time for record in records),
+                                self._kucoin_extractor.received_at_ms,
+                            ),
                         )
-                        self._kucoin_batcher.reset_batch()
+                    )
+                    await self._kucoin_batcher.put_many(records)
                 except Exception as e:
                     print(f"[Kucoin] ERROR (inner): {e}")
             print("[Kucoin] extraction loop exited.")
@@ -93,20 +169,59 @@ class RawExtractorProcess:
 
     async def _run_binance_ws(self) -> None:
         async for records in self._binance_extractor.extract_async(
-            BinanceExtractorParams()
+            self._binance_params
         ):
-            self._binance_producer.produce(records)
+            # Event time of the received frame
+            trace: Optional[LatencyTrace] = (
+                LatencyTrace.start(
+                    "binance",
+                    min(record.E for record in records),
+                    self._binance_extractor.received_at_ms,
+                )
+                if records
+                else None
+            )
+            headers: Optional[list[tuple[str, bytes]]] = None
+            if self._binance_delta_encoder is not None:
+                frame: Optional[EncodedFrame] = self._binance_delta_encoder.encode(
+                    records
+                )
+                if frame is None:
+                    continue
+                if frame.carried:
+                    # Ahead of the keyframe, only snapshot consumers read it
+                    track_delivery(
+                        await self._binance_producer.produce(
+                            list(frame.carried), headers=frame.carried_headers
+                        ),
+                        "binance",
+                    )
+                records, headers = frame.records, frame.headers
+                if not records:
+                    continue
+            if trace is not None:
+                headers = (headers or []) + trace.stamp("produce").headers
+            delivery = await self._binance_producer.produce(records, headers=headers)
 
-            # Enqueue batch for S3 Upload
+            # Enqueue batch for S3 Upload once the broker acknowledged it
             batch = [record.model_dump() for record in records]
-            self._s3_queue.put((batch, datetime.utcnow(), "binance"))
+            track_delivery(
+                delivery,
+                "binance",
+                functools.partial(
+                    self._s3_uploader.submit, "binance", batch, datetime.utcnow()
+                ),
+            )
 
     async def start(self) -> None:
         """
         Starts the Kucoin + Binance extraction pipelines concurrently.
         """
         print("Extractor Process Started")
-        self._s3_uploader_thread.start()
+        self._metrics.start()
+        self._s3_uploader.start()
+        await self._kucoin_producer.start()
+        await self._binance_producer.start()
         try:
             # Start Extraction
             await asyncio.gather(
@@ -114,9 +229,19 @@ class RawExtractorProcess:
                 self._run_binance_ws(),
             )
         finally:
-            self._s3_uploader_thread.stop()
-            self._s3_uploader_thread.join()
-            print("Extractor Process Stopped and S3UploaderThread joined.")
+            # Deliveries are only flushed here, never on the hot path
+            await self._kucoin_batcher.close()
+            await self._kucoin_producer.close()
+            await self._binance_producer.close()
+            self._s3_uploader.stop()
+            self._s3_uploader.join()
+            if self._binance_delta_encoder is not None:
+                print(
+                    f"[Binance] delta encoding forwarded {self._binance_delta_encoder.records_out}"
+                    f" of {self._binance_delta_encoder.records_in} tickers"
+                )
+            await self._metrics.stop()
+            print("Extractor Process Stopped and S3UploaderPool joined.")
 
 
 if __name__ == "__main__":
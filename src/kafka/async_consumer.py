@@ -0,0 +1,177 @@
+"""
+Async iterator over a GenericConsumer for asyncio services.
+
+1. fetch and decode run on a dedicated consumer thread, never on the event loop
+2. batches are prefetched into a bounded queue while the loop processes the previous one,
+   capped both in batches and in payload bytes
+3. nothing is committed implicitly, the caller commits a batch once it is fully processed.
+   Commits go through the consumer thread too, so the consumer is only ever touched from one thread
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Generic, Literal, NamedTuple, Optional
+
+from confluent_kafka import Message
+
+from src.kafka.consumers import ConsumerRecord, GenericConsumer
+
+DecodeTarget = Literal["models", "records"]
+
+
+class ConsumedBatch(NamedTuple):
+    messages: list[Message]
+    records: list[Any]  # Models, or dicts with decode="records"
+    size_bytes: int
+
+
+class AsyncPrefetchingConsumer(Generic[ConsumerRecord]):
+    """
+    - num_messages / poll_timeout_s: passed on to poll_batch, empty polls are never yielded
+    - max_prefetch_batches: decoded batches allowed to wait in the queue
+    - max_prefetch_bytes: payload bytes allowed to wait in the queue, a single larger batch still goes through
+    - decode: "models" goes through deserialize_batch, "records" through decode_records
+
+    Usage:
+        async with AsyncPrefetchingConsumer(consumer) as batches:
+            async for batch in batches:
+                await process(batch.records)
+                await batches.commit(batch)
+
+    After stop(), iteration ends and batches still in the queue are dropped uncommitted.
+    """
+
+    def __init__(
+        self,
+        consumer: GenericConsumer[ConsumerRecord],
+        num_messages: int = 500,
+        poll_timeout_s: float = 0.5,
+        max_prefetch_batches: int = 2,
+        max_prefetch_bytes: int = 32 * 1024 * 1024,
+        decode: DecodeTarget = "models",
+        name: str = "consumer",
+    ) -> None:
+        if decode not in ("models", "records"):
+            raise ValueError(f"Unknown decode target: {decode}")
+        self._consumer: GenericConsumer[ConsumerRecord] = consumer
+        self._num_messages: int = num_messages
+        self._poll_timeout_s: float = poll_timeout_s
+        self._max_prefetch_batches: int = max_prefetch_batches
+        self._max_prefetch_bytes: int = max_prefetch_bytes
+        self._decode: DecodeTarget = decode
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{name}-prefetch"
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[ConsumedBatch | BaseException | None]] = (
+            None
+        )
+        self._capacity_released: Optional[asyncio.Event] = None
+        self._prefetch_task: Optional[asyncio.Task[None]] = None
+        self._buffered_bytes: int = 0
+        self._stopping: bool = False
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._buffered_bytes
+
+    def _start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self._max_prefetch_batches)
+        self._capacity_released = asyncio.Event()
+        self._prefetch_task = asyncio.create_task(self._prefetch_forever())
+
+    def _fetch(self) -> Optional[ConsumedBatch]:
+        """
+        Runs on the consumer thread
+        """
+        messages: list[Message] = self._consumer.poll_batch(
+            num_messages=self._num_messages, timeout=self._poll_timeout_s
+        )
+        if not messages:
+            return None
+        records: list[Any] = (
+            self._consumer.deserialize_batch(messages)
+            if self._decode == "models"
+            else self._consumer.decode_records(messages)
+        )
+        size_bytes: int = sum(len(message.value() or b"") for message in messages)
+        return ConsumedBatch(messages, records, size_bytes)
+
+    async def _prefetch_forever(self) -> None:
+        assert self._loop is not None
+        assert self._queue is not None and self._capacity_released is not None
+        try:
+            while not self._stopping:
+                while (
+                    self._buffered_bytes >= self._max_prefetch_bytes
+                    and not self._stopping
+                ):
+                    self._capacity_released.clear()
+                    await self._capacity_released.wait()
+                if self._stopping:
+                    break
+                batch: Optional[ConsumedBatch] = await self._loop.run_in_executor(
+                    self._executor, self._fetch
+                )
+                if batch is None:
+                    continue
+                self._buffered_bytes += batch.size_bytes
+                await self._queue.put(batch)
+        except Exception as err:
+            # Surfaced by the next __anext__
+            await self._queue.put(err)
+            return
+        await self._queue.put(None)
+
+    def __aiter__(self) -> "AsyncPrefetchingConsumer[ConsumerRecord]":
+        return self
+
+    async def __anext__(self) -> ConsumedBatch:
+        if self._prefetch_task is None:
+            self._start()
+        assert self._queue is not None and self._capacity_released is not None
+        if self._stopping:
+            raise StopAsyncIteration
+        item: ConsumedBatch | BaseException | None = await self._queue.get()
+        if item is None or self._stopping:
+            raise StopAsyncIteration
+        if isinstance(item, BaseException):
+            raise item
+        self._buffered_bytes -= item.size_bytes
+        self._capacity_released.set()
+        return item
+
+    async def commit(self, batch: ConsumedBatch) -> None:
+        """
+        Commits the offsets after the batch, call once its records are fully processed
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self._executor, self._consumer.commit_messages, batch.messages
+        )
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._capacity_released is not None:
+            self._capacity_released.set()
+
+    async def close(self) -> None:
+        """
+        Stops prefetching and waits for the in-flight fetch, the consumer itself is left open
+        """
+        self.stop()
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
+
+    async def __aenter__(self) -> "AsyncPrefetchingConsumer[ConsumerRecord]":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
@@ -4,30 +4,179 @@ Consumer class which serves 2 usages
 2. Spark consumer class which consumes
 """
 
-import json
-from json import JSONDecodeError
-from typing import TypeVar, Generic, Any, Type, Optional
+import functools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypeVar, Generic, Any, Type, Optional, Iterable, Iterator
 
-from confluent_kafka import Consumer, Message
+from confluent_kafka import OFFSET_END, Consumer, Message, TopicPartition
 from pydantic import BaseModel
 
+from src.common.decoders import json_loads
+from src.kafka.dead_letter import DeadLetterProducer
+from src.kafka.deserializers import (
+    BadRecord,
+    DeserializeMode,
+    DeserializedMessage,
+    deserialize_payload,
+)
+from src.kafka.wire_format import (
+    WireFormatError,
+    WireSchema,
+    columnar_schema_of,
+    decode_columnar,
+)
+from src.services.extractors.delta_encoder import is_carryover
+from src.utils.metrics import REGISTRY, Counter, Histogram
+
 from src.models.binance_model import BinanceRawData, BinanceTransformedData
 from src.models.kucoin_model import KucoinRawData, KucoinTransformedData
 
 ConsumerRecord = TypeVar("ConsumerRecord", bound=BaseModel)
 
+CONSUMED_MESSAGES = REGISTRY.counter(
+    "kafka_consumed_messages_total", "Messages fetched from the broker", ("topic",)
+)
+CONSUMED_BYTES = REGISTRY.counter(
+    "kafka_consumed_bytes_total", "Payload bytes fetched from the broker", ("topic",)
+)
+CONSUME_ERRORS = REGISTRY.counter(
+    "kafka_consume_errors_total", "Fetched messages carrying a broker error", ("topic",)
+)
+BAD_RECORDS = REGISTRY.counter(
+    "kafka_bad_records_total", "Records that failed to deserialize", ("topic",)
+)
+DESERIALIZE_LATENCY = REGISTRY.histogram(
+    "kafka_deserialize_seconds",
+    "Decoding and validating one fetched batch into models",
+    ("topic",),
+)
+
+
+class DeserializationError(Exception):
+    pass
+
+
+def decode_message(
+    message_bytes: bytes, headers: Optional[list[tuple[str, bytes]]]
+) -> list[dict[str, Any]]:
+    """
+    The records of one JSON array or columnar message, raises when it does not decode
+    """
+    schema: Optional[WireSchema] = columnar_schema_of(headers)
+    if schema is not None:
+        return decode_columnar(schema, message_bytes)
+    items: Any = json_loads(message_bytes)
+    if not isinstance(items, list):
+        raise DeserializationError("Expected an array of records")
+    return items
+
 
 class GenericConsumer(Generic[ConsumerRecord]):
+    """
+    Besides the librdkafka settings, consumer_config takes a few keys of its own, removed before
+    the config reaches librdkafka (underscores in config.toml):
+    - deserialize.mode: "validate" (default) or "batch", see src.kafka.deserializers
+    - dead.letter.topic: records that fail to deserialize are sent there instead of failing the batch
+    - decode.workers: > 0 fans deserialize_batch out to a process pool of that size
+    - assign.latest: true reads every partition from its end with assign() instead of joining the
+      consumer group, for readers that never commit. Nothing is left behind on the broker
+    """
+
     def __init__(
         self,
         consumer_config: dict[str, Any],
         topic_name: str,
         model: Type[ConsumerRecord],
     ) -> None:
+        consumer_config = dict(consumer_config)
+        self._deserialize_mode: DeserializeMode = consumer_config.pop(
+            "deserialize.mode", "validate"
+        )
+        if self._deserialize_mode not in ("validate", "batch"):
+            raise ValueError(f"Unknown deserialize mode: {self._deserialize_mode}")
+        dead_letter_topic: Optional[str] = consumer_config.pop(
+            "dead.letter.topic", None
+        )
+        decode_workers: int = consumer_config.pop("decode.workers", 0)
+        assign_latest: bool = consumer_config.pop("assign.latest", False)
+        self._dead_letter: Optional[DeadLetterProducer] = None
+        if dead_letter_topic:
+            self._dead_letter = DeadLetterProducer(
+                {
+                    "bootstrap.servers": consumer_config["bootstrap.servers"],
+                    "client.id": f"{consumer_config.get('client.id', topic_name)}-dead-letter",
+                },
+                dead_letter_topic,
+            )
+        self._decode_workers: int = decode_workers
+        self._decode_pool: Optional[ProcessPoolExecutor] = None
+        if decode_workers > 0:
+            # spawn, forking a process that runs librdkafka threads is not safe
+            self._decode_pool = ProcessPoolExecutor(
+                max_workers=decode_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
         self._consumer: Consumer = Consumer(consumer_config)
         self._topic_name: str = topic_name
-        self._consumer.subscribe([self._topic_name])
+        # Partitions currently owned, kept up to date by the rebalance callbacks unless assign.latest
+        self._assigned: set[tuple[str, int]] = set()
+        if assign_latest:
+            self._assign_latest()
+        else:
+            self._consumer.subscribe(
+                [self._topic_name],
+                on_assign=self._on_assign,
+                on_revoke=self._on_revoke,
+                on_lost=self._on_revoke,
+            )
         self._model: Type[ConsumerRecord] = model
+        self._consumed_messages: Counter = CONSUMED_MESSAGES.labels(topic_name)
+        self._consumed_bytes: Counter = CONSUMED_BYTES.labels(topic_name)
+        self._consume_errors: Counter = CONSUME_ERRORS.labels(topic_name)
+        self._bad_records: Counter = BAD_RECORDS.labels(topic_name)
+        self._deserialize_latency: Histogram = DESERIALIZE_LATENCY.labels(topic_name)
+
+    @property
+    def assigned_partitions(self) -> list[int]:
+        return sorted(partition for _, partition in self._assigned)
+
+    def _on_assign(self, consumer: Consumer, partitions: list[TopicPartition]) -> None:
+        """
+        Works for both eager and cooperative-sticky assignors: eager hands over the full set,
+        cooperative only the delta, the client applies the assignment itself after this returns
+        """
+        self._assigned.update((tp.topic, tp.partition) for tp in partitions)
+        print(
+            f"{self._topic_name}: assigned {[tp.partition for tp in partitions]}, owning {self.assigned_partitions}"
+        )
+
+    def _assign_latest(self, timeout_s: float = 10.0) -> None:
+        """
+        Takes every partition of the topic starting from the end, no group membership and no rebalances
+        """
+        partitions: list[int] = sorted(
+            self._consumer.list_topics(self._topic_name, timeout=timeout_s)
+            .topics[self._topic_name]
+            .partitions
+        )
+        if not partitions:
+            raise RuntimeError(f"{self._topic_name}: no partitions to assign")
+        self._consumer.assign(
+            [
+                TopicPartition(self._topic_name, partition, OFFSET_END)
+                for partition in partitions
+            ]
+        )
+        self._assigned.update((self._topic_name, partition) for partition in partitions)
+        print(f"{self._topic_name}: assigned {partitions} from the end")
+
+    def _on_revoke(self, consumer: Consumer, partitions: list[TopicPartition]) -> None:
+        self._assigned.difference_update((tp.topic, tp.partition) for tp in partitions)
+        print(
+            f"{self._topic_name}: revoked {[tp.partition for tp in partitions]}, owning {self.assigned_partitions}"
+        )
 
     def consume(
         self, num_messages: int = 1, timeout: float = 1.0
@@ -36,44 +185,174 @@ class GenericConsumer(Generic[ConsumerRecord]):
         Consumes a single Kafka message from topic, expecting JSON array
         """
         messages: list[Message] = self._consumer.consume(
-            num_messages=num_messages, timout=timeout
+            num_messages=num_messages, timeout=timeout
         )
+        self._count_consumed(messages)
         return self.deserialize_batch(messages)
 
+    def _count_consumed(self, messages: list[Message]) -> None:
+        if not messages:
+            return
+        self._consumed_messages.inc(len(messages))
+        self._consumed_bytes.inc(
+            sum(len(message.value() or b"") for message in messages)
+        )
+
     def deserialize_batch(self, messages: list[Message]) -> list[ConsumerRecord]:
-        batch_messages: list[ConsumerRecord] = []
-        for raw_message in messages:
+        """
+        Deserializes every message according to deserialize.mode, JSON or columnar alike.
+        Bad records go to the dead-letter topic when one is configured, else the batch fails.
+        A message whose headers name an unknown codec or schema is one bad record.
+        Keyframe carryover messages are skipped, see src.services.extractors.delta_encoder.
+        """
+        started: float = time.perf_counter()
+        payloads: list[bytes] = []
+        schema_ids: list[Optional[str]] = []
+        # Messages settled on their headers alone, by position in messages, never reach the decoder
+        settled: dict[int, DeserializedMessage] = {}
+        for index, raw_message in enumerate(messages):
             message_bytes: Optional[str | bytes] = raw_message.value()
             if not isinstance(message_bytes, bytes):
                 raise Exception(
                     f"Message is not in bytes: {message_bytes} (returned type: {type(message_bytes)})"
                 )
-
-            message_str: str = message_bytes.decode("utf-8")
+            if is_carryover(raw_message.headers()):
+                settled[index] = DeserializedMessage([], [])
+                continue
             try:
-                raw_message_list: list[dict[str, Any]] = json.loads(message_str)
-            except JSONDecodeError as err:
-                print(
-                    f"Encountered error : {err} when decoding message on Generic Consumer"
+                schema: Optional[WireSchema] = columnar_schema_of(raw_message.headers())
+            except WireFormatError as err:
+                settled[index] = DeserializedMessage(
+                    [], [BadRecord(message_bytes, f"Undecodable message: {err}")]
                 )
-                raise err
-            message_list: list[ConsumerRecord] = []
-            for single_message_dict in raw_message_list:
-                try:
-                    single_record: ConsumerRecord = self._model.model_validate(
-                        single_message_dict
-                    )
-                    message_list.append(single_record)
-                except Exception as e:
-                    print(f"Exception: {e} raised at messages: {single_message_dict}")
-                    raise
-            batch_messages.extend(message_list)
+                continue
+            payloads.append(message_bytes)
+            schema_ids.append(schema.schema_id if schema is not None else None)
+
+        deserialize = functools.partial(
+            deserialize_payload, self._model, self._deserialize_mode
+        )
+        results: Iterable[DeserializedMessage]
+        # Shipping a handful of messages to the pool costs more than decoding them here
+        if self._decode_pool is not None and len(messages) >= 2 * self._decode_workers:
+            results = self._decode_pool.map(
+                deserialize,
+                payloads,
+                schema_ids,
+                chunksize=max(1, len(messages) // (4 * self._decode_workers)),
+            )
+        else:
+            results = map(deserialize, payloads, schema_ids)
+
+        decoded: Iterator[DeserializedMessage] = iter(results)
+        batch_messages: list[ConsumerRecord] = []
+        for index, raw_message in enumerate(messages):
+            records, bad_records = settled[index] if index in settled else next(decoded)
+            batch_messages.extend(records)
+            if bad_records:
+                self._quarantine(raw_message, bad_records)
+        self._deserialize_latency.observe(time.perf_counter() - started)
         return batch_messages
 
+    def poll_batch(
+        self, num_messages: int = 500, timeout: float = 1.0
+    ) -> list[Message]:
+        """
+        Fetches up to num_messages raw Kafka messages without deserializing them.
+        Messages carrying a broker / partition error are logged and dropped.
+        """
+        messages: list[Message] = self._consumer.consume(
+            num_messages=num_messages, timeout=timeout
+        )
+        valid_messages: list[Message] = []
+        for message in messages:
+            if message.error() is not None:
+                self._consume_errors.inc()
+                print(f"Consumer error on {self._topic_name}: {message.error()}")
+                continue
+            valid_messages.append(message)
+        self._count_consumed(valid_messages)
+        return valid_messages
+
+    def _quarantine(self, raw_message: Message, bad_records: list[BadRecord]) -> None:
+        """
+        Sends the bad records of raw_message to the dead-letter topic, raises DeserializationError
+        when none is configured
+        """
+        self._bad_records.inc(len(bad_records))
+        if self._dead_letter is None:
+            payload, error = bad_records[0]
+            print(f"Exception: {error} raised at messages: {payload[:500]!r}")
+            raise DeserializationError(
+                f"{len(bad_records)} bad record(s) on {self._topic_name} "
+                f"[{raw_message.partition()}] at offset {raw_message.offset()}"
+            )
+        for payload, error in bad_records:
+            self._dead_letter.produce(raw_message, payload, error)
+        print(
+            f"{self._topic_name}: {len(bad_records)} bad record(s) at offset {raw_message.offset()} "
+            f"sent to {self._dead_letter.topic_name}"
+        )
+
+    def decode_records(self, messages: list[Message]) -> list[dict[str, Any]]:
+        """
+        Flattens the JSON array or columnar batch in every message into one list[dict], skipping
+        model validation for callers that transform the raw dicts directly.
+        Columnar batches hand datetimes over as datetime objects rather than ISO strings.
+        Keyframe carryover messages are skipped, their records were already forwarded once.
+        A message that does not decode is quarantined like a bad record in deserialize_batch,
+        so committing the batch moves past it.
+        """
+        records: list[dict[str, Any]] = []
+        for message in messages:
+            message_bytes: Optional[str | bytes] = message.value()
+            if message_bytes is None or is_carryover(message.headers()):
+                continue
+            try:
+                records.extend(decode_message(message_bytes, message.headers()))  # type: ignore[arg-type]
+            except Exception as err:
+                self._quarantine(
+                    message,
+                    [BadRecord(message_bytes, f"Undecodable message: {err}")],  # type: ignore[arg-type]
+                )
+        return records
+
     def commit(self) -> None:
         # manually commit the offsets
         self._consumer.commit()
 
+    def commit_messages(self, messages: list[Message]) -> None:
+        """
+        Commits the offset right after the last message of each partition in messages,
+        so only what the caller has fully processed is marked as consumed.
+        Partitions revoked since the messages were fetched are skipped, their new owner replays them.
+        Dead letters are flushed first: when one was not delivered nothing is committed.
+        """
+        if self._dead_letter is not None:
+            self._dead_letter.flush()
+        next_offsets: dict[tuple[str, int], int] = {}
+        for message in messages:
+            key: tuple[str, int] = (message.topic(), message.partition())
+            if key not in self._assigned:
+                continue
+            next_offsets[key] = max(next_offsets.get(key, 0), message.offset() + 1)
+        if not next_offsets:
+            return
+        self._consumer.commit(
+            offsets=[
+                TopicPartition(topic, partition, offset)
+                for (topic, partition), offset in next_offsets.items()
+            ],
+            asynchronous=True,
+        )
+
+    def close(self) -> None:
+        self._consumer.close()
+        if self._dead_letter is not None:
+            self._dead_letter.close()
+        if self._decode_pool is not None:
+            self._decode_pool.shutdown(wait=True)
+
 
 class KucoinRawConsumer(GenericConsumer[KucoinRawData]):
     def __init__(self, consumer_config: dict[str, Any]) -> None:
@@ -0,0 +1,77 @@
+"""
+Dead-letter topic for records a consumer could not deserialize.
+Every quarantined record keeps where it came from in its Kafka headers, so it can be inspected
+and replayed once the producer or the model is fixed.
+"""
+
+from typing import Any, Optional
+
+from confluent_kafka import KafkaError, Message, Producer
+
+
+class DeadLetterError(Exception):
+    pass
+
+
+class DeadLetterProducer:
+    """
+    produce() only enqueues into librdkafka and serves pending delivery callbacks, it never blocks
+    the consumer loop. flush() waits for the acknowledgements and must run before the source offsets
+    are committed, else a lost dead letter would take its record with it.
+    """
+
+    def __init__(self, producer_config: dict[str, Any], topic_name: str) -> None:
+        self._producer: Producer = Producer(producer_config)
+        self._topic_name: str = topic_name
+        self.quarantined: int = 0
+        # Dead letters produced but not acknowledged yet, and deliveries failed since the last flush
+        self._pending: int = 0
+        self._failed: int = 0
+
+    @property
+    def topic_name(self) -> str:
+        return self._topic_name
+
+    def produce(self, source: Message, payload: bytes, error: str) -> None:
+        self._producer.produce(
+            topic=self._topic_name,
+            value=payload,
+            headers=[
+                ("dlq.source.topic", str(source.topic()).encode("utf-8")),
+                ("dlq.source.partition", str(source.partition()).encode("ascii")),
+                ("dlq.source.offset", str(source.offset()).encode("ascii")),
+                # Kafka headers are meant to stay small
+                ("dlq.error", error[:1000].encode("utf-8")),
+            ],
+            on_delivery=self._on_delivery,
+        )
+        self._pending += 1
+        self._producer.poll(0)
+        self.quarantined += 1
+
+    def _on_delivery(self, err: Optional[KafkaError], msg: Message) -> None:
+        self._pending -= 1
+        if err is not None:
+            self._failed += 1
+            print(f"Delivery failed for dead letter on {self._topic_name}: {err}")
+
+    def flush(self, timeout_s: float = 10.0) -> None:
+        """
+        Waits until every dead letter produced so far is acknowledged,
+        raises DeadLetterError when one failed or is still pending after timeout_s
+        """
+        if self._pending == 0 and self._failed == 0:
+            return
+        remaining: int = self._producer.flush(timeout_s)
+        failed, self._failed = self._failed, 0
+        if remaining > 0 or failed > 0:
+            raise DeadLetterError(
+                f"{self._topic_name}: {failed} dead letter(s) failed and {remaining} still pending"
+            )
+
+    def close(self, timeout_s: float = 10.0) -> None:
+        remaining: int = self._producer.flush(timeout_s)
+        if remaining > 0:
+            print(
+                f"WARNING: {remaining} dead letter(s) for {self._topic_name} were not delivered before close"
+            )
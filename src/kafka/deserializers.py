@@ -0,0 +1,97 @@
+"""
+Batch deserialization of Kafka messages into models, one message at a time so the work can be fanned
+out to a process pool.
+
+1. validate: parse, then model_validate every record, the original behaviour
+2. batch: the whole array is validated in one TypeAdapter call, parsed straight from the bytes
+   in pydantic-core. Only when that call fails are the records validated one by one to single out
+   the bad ones
+
+There is deliberately no mode skipping validation: model_construct runs in Python and measures
+2-3x slower than validate_json in pydantic-core, it would also leave JSON datetimes as strings.
+Trusted producers are best served by batch.
+
+Bad records are returned alongside the good ones instead of raising, the caller decides whether
+they are quarantined or fatal.
+"""
+
+import functools
+from typing import Any, Literal, NamedTuple, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.common.decoders import json_dumps, json_loads
+from src.kafka.wire_format import decode_columnar, schema_by_id
+
+DeserializeMode = Literal["validate", "batch"]
+
+
+class BadRecord(NamedTuple):
+    payload: bytes  # The offending record as JSON, or the whole message when it did not parse
+    error: str
+
+
+class DeserializedMessage(NamedTuple):
+    records: list[Any]
+    bad_records: list[BadRecord]
+
+
+@functools.lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter[list[Any]]:
+    return TypeAdapter(list[model])  # type: ignore[valid-type]
+
+
+def _record_bytes(item: Any) -> bytes:
+    try:
+        return json_dumps(item)
+    except TypeError:
+        # Columnar records carry datetimes the stdlib encoder rejects
+        return repr(item).encode("utf-8")
+
+
+def _validate_each(model: Type[BaseModel], items: list[Any]) -> DeserializedMessage:
+    records: list[Any] = []
+    bad_records: list[BadRecord] = []
+    for item in items:
+        try:
+            records.append(model.model_validate(item))
+        except ValidationError as err:
+            bad_records.append(BadRecord(_record_bytes(item), str(err)))
+    return DeserializedMessage(records, bad_records)
+
+
+def deserialize_payload(
+    model: Type[BaseModel],
+    mode: DeserializeMode,
+    payload: bytes,
+    schema_id: Optional[str] = None,
+) -> DeserializedMessage:
+    """
+    schema_id: the columnar wire schema from the message headers, None for JSON payloads
+    """
+    if mode == "batch" and schema_id is None:
+        try:
+            return DeserializedMessage(_list_adapter(model).validate_json(payload), [])
+        except ValidationError:
+            # Either malformed JSON or a bad record, parse on its own to tell them apart
+            pass
+    try:
+        items: Any = (
+            decode_columnar(schema_by_id(schema_id), payload)
+            if schema_id is not None
+            else json_loads(payload)
+        )
+    except Exception as err:
+        return DeserializedMessage(
+            [], [BadRecord(payload, f"Undecodable message: {err}")]
+        )
+    if not isinstance(items, list):
+        return DeserializedMessage(
+            [], [BadRecord(payload, "Expected an array of records")]
+        )
+    if mode == "batch" and schema_id is not None:
+        try:
+            return DeserializedMessage(_list_adapter(model).validate_python(items), [])
+        except ValidationError:
+            pass
+    return _validate_each(model, items)
@@ -1,15 +1,27 @@
 import asyncio
+import functools
 import json
-from typing import Generic, TypeVar, Optional, Any
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from typing import Callable, ClassVar, Generic, Literal, TypeVar, Optional, Any
 
-from confluent_kafka import Producer, KafkaError, Message
+from confluent_kafka import Producer, KafkaError, KafkaException, Message
 from pydantic import BaseModel
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_fixed
 
+from src.kafka.wire_format import (
+    WireFormat,
+    columnar_headers,
+    encode_columnar,
+    latest_schema,
+)
 from src.services.extractors.binance_extractor import (
     BinanceExtractor,
     BinanceExtractorParams,
 )
+from src.utils.metrics import REGISTRY, Counter, Gauge, Histogram
 
 
 class FailedToProduceError(Exception):
@@ -17,12 +29,74 @@ class FailedToProduceError(Exception):
 
 
 ProduceMessage = TypeVar("ProduceMessage", bound=BaseModel)
+Partitioning = Literal["none", "keyed"]
+
+PRODUCED_MESSAGES = REGISTRY.counter(
+    "kafka_produced_messages_total", "Messages handed to librdkafka", ("topic",)
+)
+PRODUCED_RECORDS = REGISTRY.counter(
+    "kafka_produced_records_total", "Records across the produced messages", ("topic",)
+)
+PRODUCED_BYTES = REGISTRY.counter(
+    "kafka_produced_bytes_total", "Encoded payload bytes produced", ("topic",)
+)
+DELIVERY_ERRORS = REGISTRY.counter(
+    "kafka_delivery_errors_total", "Messages the broker did not acknowledge", ("topic",)
+)
+PRODUCE_LATENCY = REGISTRY.histogram(
+    "kafka_produce_latency_seconds",
+    "From enqueue to the delivery report, async producers only",
+    ("topic",),
+)
+FLUSH_LATENCY = REGISTRY.histogram(
+    "kafka_flush_seconds", "Time spent in producer flush()", ("topic",)
+)
+IN_FLIGHT_MESSAGES = REGISTRY.gauge(
+    "kafka_in_flight_messages", "Messages awaiting their delivery report", ("topic",)
+)
+IN_FLIGHT_BYTES = REGISTRY.gauge(
+    "kafka_in_flight_bytes", "Payload bytes awaiting their delivery report", ("topic",)
+)
+
+
+def symbol_partition(symbol: str, partition_count: int) -> int:
+    """
+    Stable across processes and restarts, unlike hash() which is salted per interpreter
+    """
+    return zlib.crc32(symbol.encode("utf-8")) % partition_count
 
 
 class AbstractProducer(Generic[ProduceMessage]):
+    """
+    Two keys of producer_config are ours and not passed on to librdkafka (underscores in config.toml):
+    - wire.format: payload encoding, "json" (default) or "columnar", see src.kafka.wire_format
+    - partitioning: "none" (default) sends every batch as one unkeyed message,
+      "keyed" splits it by symbol hash into one message per partition keyed by the partition's symbol
+      group, so every symbol always lands on the same partition and keeps its order
+    """
+
+    # Model field holding the exchange symbol, the raw models name it differently
+    symbol_field: ClassVar[str] = "symbol"
+
     def __init__(self, producer_config: dict[str, str], topic_name: str) -> None:
+        producer_config = dict(producer_config)
+        self._wire_format: WireFormat = producer_config.pop("wire.format", "json")  # type: ignore[assignment]
+        if self._wire_format not in ("json", "columnar"):
+            raise ValueError(f"Unknown wire format: {self._wire_format}")
+        self._partitioning: Partitioning = producer_config.pop("partitioning", "none")  # type: ignore[assignment]
+        if self._partitioning not in ("none", "keyed"):
+            raise ValueError(f"Unknown partitioning: {self._partitioning}")
         self._producer: Producer = Producer(producer_config)
         self._topic_name: str = topic_name
+        self._symbol_of: Callable[[Any], str] = attrgetter(self.symbol_field)
+        self._partition_count: Optional[int] = None
+        # Symbol -> partition, memoized so the steady state cost per record is a dict lookup
+        self._partition_of: dict[str, int] = {}
+        self._produced_messages: Counter = PRODUCED_MESSAGES.labels(topic_name)
+        self._produced_records: Counter = PRODUCED_RECORDS.labels(topic_name)
+        self._produced_bytes: Counter = PRODUCED_BYTES.labels(topic_name)
+        self._delivery_errors: Counter = DELIVERY_ERRORS.labels(topic_name)
+        self._flush_latency: Histogram = FLUSH_LATENCY.labels(topic_name)
 
     @retry(
         retry=retry_if_exception_type(FailedToProduceError),
@@ -36,16 +110,122 @@ class AbstractProducer(Generic[ProduceMessage]):
         """
         if not isinstance(batch, list):
             raise ValueError("Expected a list of BaseModels")
-        # all messages to be produced must be serialized
-        # model.dumps(list[dataclass] -> list[dict])
-        # json.dumps (list[dict] -> str), each str json array is a type list[dict]
-        serialized_batch: str = json.dumps(
-            [single_item.model_dump() for single_item in batch]
-        )
-        self._producer.produce(
-            topic=self._topic_name, value=serialized_batch, on_delivery=self.log_message
+        if self._partitioning == "keyed":
+            if self._partition_count is None:
+                self.set_partition_count(self.fetch_partition_count())
+            sub_batches: list[tuple[Optional[int], list[ProduceMessage]]] = list(
+                self.split_by_partition(batch).items()
+            )
+        else:
+            sub_batches = [(None, batch)]
+        for partition, sub_batch in sub_batches:
+            payload, headers = self.encode(sub_batch)
+            self._producer.produce(
+                topic=self._topic_name,
+                value=payload,
+                on_delivery=self._log_delivery,
+                **self._routing(partition, headers),
+            )
+            self._count_produced(len(sub_batch), len(payload))
+        with self._flush_latency.time():
+            self._producer.flush()
+
+    def fetch_partition_count(self, timeout_s: float = 10.0) -> int:
+        """
+        Blocking metadata request to the broker
+        """
+        metadata = self._producer.list_topics(self._topic_name, timeout=timeout_s)
+        topic_metadata = metadata.topics.get(self._topic_name)
+        if (
+            topic_metadata is None
+            or topic_metadata.error is not None
+            or not topic_metadata.partitions
+        ):
+            raise FailedToProduceError(
+                f"No partition metadata for {self._topic_name}: "
+                f"{topic_metadata.error if topic_metadata is not None else 'unknown topic'}"
+            )
+        return len(topic_metadata.partitions)
+
+    def set_partition_count(self, partition_count: int) -> None:
+        if partition_count != self._partition_count:
+            self._partition_count = partition_count
+            self._partition_of = {}
+
+    def split_by_partition(
+        self, batch: list[ProduceMessage]
+    ) -> dict[int, list[ProduceMessage]]:
+        """
+        Sub-batches per partition, records keep their relative order within each
+        """
+        assert self._partition_count is not None
+        partition_count: int = self._partition_count
+        partition_of: dict[str, int] = self._partition_of
+        symbol_of: Callable[[Any], str] = self._symbol_of
+        sub_batches: dict[int, list[ProduceMessage]] = {}
+        for record in batch:
+            symbol: str = symbol_of(record)
+            partition: Optional[int] = partition_of.get(symbol)
+            if partition is None:
+                partition = partition_of[symbol] = symbol_partition(
+                    symbol, partition_count
+                )
+            sub_batch: Optional[list[ProduceMessage]] = sub_batches.get(partition)
+            if sub_batch is None:
+                sub_batches[partition] = [record]
+            else:
+                sub_batch.append(record)
+        return sub_batches
+
+    @staticmethod
+    def _routing(
+        partition: Optional[int], headers: Optional[list[tuple[str, bytes]]]
+    ) -> dict[str, Any]:
+        """
+        Extra produce() arguments, only the ones that are set so unkeyed messages stay as they were
+        """
+        routing: dict[str, Any] = {}
+        if partition is not None:
+            # The key names the symbol group, the partition is set explicitly so it never depends
+            # on the client's partitioner
+            routing["partition"] = partition
+            routing["key"] = str(partition).encode("ascii")
+        if headers:
+            routing["headers"] = headers
+        return routing
+
+    def encode(
+        self, batch: list[ProduceMessage]
+    ) -> tuple[bytes, Optional[list[tuple[str, bytes]]]]:
+        """
+        Payload and the Kafka headers describing it, JSON payloads carry no headers
+        """
+        if self._wire_format == "columnar" and batch:
+            schema = latest_schema(type(batch[0]))
+            return encode_columnar(schema, batch), columnar_headers(schema)
+        return self.serialize(batch).encode("utf-8"), None
+
+    @staticmethod
+    def serialize(batch: list[ProduceMessage]) -> str:
+        """
+        All messages to be produced must be serialized
+        model.dumps(list[dataclass] -> list[dict])
+        json.dumps (list[dict] -> str), each str json array is a type list[dict]
+        mode="json" renders datetimes of the transformed models as ISO strings
+        """
+        return json.dumps(
+            [single_item.model_dump(mode="json") for single_item in batch]
         )
-        self._producer.flush()
+
+    def _count_produced(self, record_count: int, payload_size: int) -> None:
+        self._produced_messages.inc()
+        self._produced_records.inc(record_count)
+        self._produced_bytes.inc(payload_size)
+
+    def _log_delivery(self, err: Optional[KafkaError], msg: Message) -> None:
+        if err is not None:
+            self._delivery_errors.inc()
+        self.log_message(err, msg)
 
     @staticmethod
     def log_message(err: Optional[KafkaError], msg: Message) -> None:
@@ -58,12 +238,237 @@ class AbstractProducer(Generic[ProduceMessage]):
             )
 
 
+class AsyncAbstractProducer(AbstractProducer[ProduceMessage]):
+    """
+    Non-blocking producer to be used from within the event loop.
+
+    1. produce() enqueues into librdkafka and returns a delivery future instead of flushing
+    2. A background task polls the producer on a dedicated thread so delivery callbacks keep firing
+    3. In-flight messages and bytes are capped, produce() awaits until deliveries free up capacity
+    4. flush() only happens in close(), on shutdown
+    """
+
+    def __init__(
+        self,
+        producer_config: dict[str, str],
+        topic_name: str,
+        max_in_flight_messages: int = 10_000,
+        max_in_flight_bytes: int = 64 * 1024 * 1024,
+        poll_timeout_s: float = 0.1,
+    ) -> None:
+        super().__init__(producer_config=producer_config, topic_name=topic_name)
+        self._max_in_flight_messages: int = max_in_flight_messages
+        self._max_in_flight_bytes: int = max_in_flight_bytes
+        self._poll_timeout_s: float = poll_timeout_s
+        self._in_flight_messages: int = 0
+        self._in_flight_bytes: int = 0
+        # librdkafka's poll() blocks, so it gets its own thread rather than the default executor
+        self._poll_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{topic_name}-poll"
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._capacity_released: Optional[asyncio.Event] = None
+        self._poll_task: Optional[asyncio.Task[None]] = None
+        self._closing: bool = False
+        self._produce_latency: Histogram = PRODUCE_LATENCY.labels(topic_name)
+        # Claimed on start() and released on close(), one started producer per topic and process
+        self._in_flight_messages_gauge: Optional[Gauge] = None
+        self._in_flight_bytes_gauge: Optional[Gauge] = None
+
+    @property
+    def in_flight_messages(self) -> int:
+        return self._in_flight_messages
+
+    @property
+    def in_flight_bytes(self) -> int:
+        return self._in_flight_bytes
+
+    async def start(self) -> None:
+        """
+        Binds the producer to the running loop and spins up the background poll task
+        """
+        if self._poll_task is not None:
+            return
+        self._in_flight_messages_gauge = IN_FLIGHT_MESSAGES.claim(self._topic_name)
+        self._in_flight_bytes_gauge = IN_FLIGHT_BYTES.claim(self._topic_name)
+        self._loop = asyncio.get_running_loop()
+        self._capacity_released = asyncio.Event()
+        self._poll_task = asyncio.create_task(self._poll_forever())
+
+    async def _poll_forever(self) -> None:
+        assert self._loop is not None
+        while not self._closing:
+            await self._loop.run_in_executor(
+                self._poll_executor, self._producer.poll, self._poll_timeout_s
+            )
+
+    async def produce(  # type: ignore[override]
+        self,
+        batch: list[ProduceMessage],
+        headers: Optional[list[tuple[str, bytes]]] = None,
+    ) -> asyncio.Future[Any]:
+        """
+        Takes in a list[dataclass], serialize it and enqueue it without waiting for the broker.
+        Returns a future that resolves with the delivered Message, or raises KafkaException.
+        With keyed partitioning it resolves with the list of Messages, one per partition.
+        """
+        if not isinstance(batch, list):
+            raise ValueError("Expected a list of BaseModels")
+        if self._closing:
+            raise FailedToProduceError(f"Producer for {self._topic_name} is closed")
+        await self.start()
+        assert self._loop is not None
+
+        if self._partitioning == "none":
+            return await self._enqueue(batch, headers, None)
+        if self._partition_count is None:
+            # Metadata is fetched once, off the loop
+            self.set_partition_count(
+                await self._loop.run_in_executor(None, self.fetch_partition_count)
+            )
+        deliveries: list[asyncio.Future[Message]] = [
+            await self._enqueue(sub_batch, headers, partition)
+            for partition, sub_batch in self.split_by_partition(batch).items()
+        ]
+        return asyncio.gather(*deliveries)
+
+    async def _enqueue(
+        self,
+        batch: list[ProduceMessage],
+        headers: Optional[list[tuple[str, bytes]]],
+        partition: Optional[int],
+    ) -> asyncio.Future[Message]:
+        assert self._loop is not None
+        payload, wire_headers = self.encode(batch)
+        if wire_headers:
+            headers = wire_headers + (headers or [])
+        payload_size: int = len(payload)
+        await self._acquire_capacity(payload_size)
+
+        delivery: asyncio.Future[Message] = self._loop.create_future()
+        on_delivery = functools.partial(
+            self._on_delivery, delivery, payload_size, time.perf_counter()
+        )
+        routing: dict[str, Any] = self._routing(partition, headers)
+        while True:
+            try:
+                self._producer.produce(
+                    topic=self._topic_name,
+                    value=payload,
+                    on_delivery=on_delivery,
+                    **routing,
+                )
+                self._count_produced(len(batch), payload_size)
+                return delivery
+            except BufferError:
+                # librdkafka's local queue is full, give the poll thread a chance to drain it
+                await asyncio.sleep(self._poll_timeout_s)
+            except Exception:
+                self._release_capacity(payload_size)
+                raise
+
+    async def _acquire_capacity(self, payload_size: int) -> None:
+        """
+        Waits until there is room for one more message of payload_size bytes.
+        A single message larger than the byte cap is still let through once nothing else is in flight.
+        """
+        assert self._capacity_released is not None
+        while self._in_flight_messages >= self._max_in_flight_messages or (
+            self._in_flight_bytes > 0
+            and self._in_flight_bytes + payload_size > self._max_in_flight_bytes
+        ):
+            self._capacity_released.clear()
+            await self._capacity_released.wait()
+        self._in_flight_messages += 1
+        self._in_flight_bytes += payload_size
+        self._update_in_flight_gauges()
+
+    def _release_capacity(self, payload_size: int) -> None:
+        self._in_flight_messages -= 1
+        self._in_flight_bytes -= payload_size
+        self._update_in_flight_gauges()
+        assert self._capacity_released is not None
+        self._capacity_released.set()
+
+    def _update_in_flight_gauges(self) -> None:
+        if (
+            self._in_flight_messages_gauge is None
+            or self._in_flight_bytes_gauge is None
+        ):
+            return  # Released by close()
+        self._in_flight_messages_gauge.set(self._in_flight_messages)
+        self._in_flight_bytes_gauge.set(self._in_flight_bytes)
+
+    def _on_delivery(
+        self,
+        delivery: asyncio.Future[Message],
+        payload_size: int,
+        enqueued_at: float,
+        err: Optional[KafkaError],
+        msg: Message,
+    ) -> None:
+        """
+        Runs on the poll thread, hands the result back to the event loop
+        """
+        assert self._loop is not None
+        self._produce_latency.observe(time.perf_counter() - enqueued_at)
+        self._loop.call_soon_threadsafe(
+            self._resolve_delivery, delivery, payload_size, err, msg
+        )
+
+    def _resolve_delivery(
+        self,
+        delivery: asyncio.Future[Message],
+        payload_size: int,
+        err: Optional[KafkaError],
+        msg: Message,
+    ) -> None:
+        self._release_capacity(payload_size)
+        if delivery.done():
+            return
+        if err is not None:
+            self._delivery_errors.inc()
+            print(f"Delivery failed for message on {self._topic_name}: {err}")
+            delivery.set_exception(KafkaException(err))
+        else:
+            delivery.set_result(msg)
+
+    async def close(self, timeout_s: float = 30.0) -> None:
+        """
+        Stops the poll task and flushes whatever is still queued, only called on shutdown
+        """
+        self._closing = True
+        if self._poll_task is not None:
+            await self._poll_task
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        started: float = time.perf_counter()
+        remaining: int = await loop.run_in_executor(
+            self._poll_executor, self._producer.flush, timeout_s
+        )
+        self._flush_latency.observe(time.perf_counter() - started)
+        if remaining > 0:
+            print(
+                f"WARNING: {remaining} message(s) for {self._topic_name} were not delivered before close"
+            )
+        # Let the delivery callbacks scheduled by flush() resolve their futures
+        await asyncio.sleep(0)
+        self._poll_executor.shutdown(wait=True)
+        if self._in_flight_messages_gauge is not None:
+            IN_FLIGHT_MESSAGES.release(self._topic_name)
+            IN_FLIGHT_BYTES.release(self._topic_name)
+            self._in_flight_messages_gauge = self._in_flight_bytes_gauge = None
+
+
 class RawBinanceProducer(AbstractProducer["BinanceRawData"]):
+    symbol_field = "s"
+
     def __init__(self, producer_config: dict[str, str]) -> None:
         super().__init__(producer_config=producer_config, topic_name="binance_raw_data")
 
 
 class RawKucoinProducer(AbstractProducer["KucoinRawData"]):
+    symbol_field = "subject"
+
     def __init__(self, producer_config: dict[str, str]) -> None:
         super().__init__(producer_config=producer_config, topic_name="kucoin_raw_data")
 
@@ -82,6 +487,60 @@ class TransformedKucoinProducer(AbstractProducer["KucoinTransformedData"]):
         )
 
 
+class AsyncRawBinanceProducer(AsyncAbstractProducer["BinanceRawData"]):
+    symbol_field = "s"
+
+    def __init__(self, producer_config: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(
+            producer_config=producer_config, topic_name="binance_raw_data", **kwargs
+        )
+
+
+class AsyncRawKucoinProducer(AsyncAbstractProducer["KucoinRawData"]):
+    symbol_field = "subject"
+
+    def __init__(self, producer_config: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(
+            producer_config=producer_config, topic_name="kucoin_raw_data", **kwargs
+        )
+
+
+class AsyncTransformedBinanceProducer(AsyncAbstractProducer["BinanceTransformedData"]):
+    def __init__(self, producer_config: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(
+            producer_config=producer_config,
+            topic_name="binance_transformed_data",
+            **kwargs,
+        )
+
+
+class AsyncTransformedKucoinProducer(AsyncAbstractProducer["KucoinTransformedData"]):
+    def __init__(self, producer_config: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(
+            producer_config=producer_config,
+            topic_name="kucoin_transformed_data",
+            **kwargs,
+        )
+
+
+class AsyncConsolidatedProducer(AsyncAbstractProducer["ConsolidatedPriceData"]):
+    def __init__(self, producer_config: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(
+            producer_config=producer_config,
+            topic_name="consolidated_prices",
+            **kwargs,
+        )
+
+
+class AsyncCandleProducer(AsyncAbstractProducer["CandleData"]):
+    def __init__(self, producer_config: dict[str, str], **kwargs: Any) -> None:
+        super().__init__(
+            producer_config=producer_config,
+            topic_name="candles",
+            **kwargs,
+        )
+
+
 # Test run for Binance extractor and producer
 async def main() -> None:
     extractor: BinanceExtractor = BinanceExtractor()
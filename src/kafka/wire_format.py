@@ -0,0 +1,351 @@
+"""
+Columnar binary wire format for Kafka batches, an alternative to JSON arrays of model dumps.
+
+A batch of models is written column by column, every column in one contiguous buffer:
+1. int / float / bool: a packed array, datetime: int64 microseconds since the epoch (UTC)
+2. str: dictionary encoded, the distinct values once then one uint32 index per row,
+   symbols and constant fields like source cost 4 bytes a row
+3. Optional fields: a presence byte per row ahead of the values
+4. nested models are flattened into dotted columns and rebuilt on decode
+
+The layout is not self-describing. Producers put the codec and the schema id e.g. BinanceRawData.v1
+in the Kafka headers, consumers look the schema up in the registry. A message without a codec header
+is JSON, so JSON and columnar producers can share a topic during a rollout.
+
+A schema is frozen once registered, and every registered version is pinned to a fingerprint of its
+layout: importing this module fails when a model no longer matches its pin. When a model changes,
+pin its new layout under the next version and keep the previous one registered, spelled out as an
+explicit WireSchema, so in-flight messages still decode.
+"""
+
+import hashlib
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from types import NoneType, UnionType
+from typing import Any, Literal, NamedTuple, Optional, Type, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from src.models.binance_model import BinanceRawData, BinanceTransformedData
+from src.models.candle_model import CandleData
+from src.models.consolidated_model import ConsolidatedPriceData
+from src.models.kucoin_model import KucoinRawData, KucoinTransformedData
+
+WireFormat = Literal["json", "columnar"]
+ColumnKind = Literal["int", "float", "bool", "datetime", "str"]
+
+CODEC_HEADER: str = "codec"
+SCHEMA_HEADER: str = "schema"
+COLUMNAR_CODEC: bytes = b"columnar"
+
+_ARRAY_TYPECODES: dict[ColumnKind, str] = {
+    "int": "q",
+    "float": "d",
+    "bool": "b",
+    "datetime": "q",
+    "str": "I",
+}
+_SCALAR_KINDS: dict[Any, ColumnKind] = {
+    int: "int",
+    float: "float",
+    bool: "bool",
+    datetime: "datetime",
+    str: "str",
+}
+_EPOCH: datetime = datetime(1970, 1, 1)
+_LENGTH: struct.Struct = struct.Struct("<I")
+# The payload is little-endian whatever the host
+_SWAP: bool = sys.byteorder != "little"
+
+
+class WireFormatError(Exception):
+    pass
+
+
+class Column(NamedTuple):
+    path: tuple[str, ...]  # ("data", "price") for KucoinRawData.data.price
+    kind: ColumnKind
+    nullable: bool
+
+
+class WireSchema(NamedTuple):
+    name: str
+    version: int
+    columns: tuple[Column, ...]
+
+    @property
+    def schema_id(self) -> str:
+        return f"{self.name}.v{self.version}"
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Digest of the column layout, changes whenever a column is added, removed, moved or retyped
+        """
+        layout: str = ";".join(
+            f"{'.'.join(column.path)}:{column.kind}:{int(column.nullable)}"
+            for column in self.columns
+        )
+        return hashlib.sha256(layout.encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def from_model(cls, model: Type[BaseModel], version: int) -> "WireSchema":
+        return cls(model.__name__, version, tuple(_model_columns(model, ())))
+
+
+def _model_columns(model: Type[BaseModel], prefix: tuple[str, ...]) -> list[Column]:
+    columns: list[Column] = []
+    for field_name, field in model.model_fields.items():
+        annotation: Any = field.annotation
+        nullable: bool = False
+        if get_origin(annotation) in (Union, UnionType):
+            members: tuple[Any, ...] = tuple(
+                arg for arg in get_args(annotation) if arg is not NoneType
+            )
+            if len(members) != 1:
+                raise WireFormatError(
+                    f"{model.__name__}.{field_name}: unsupported union"
+                )
+            annotation, nullable = members[0], True
+        path: tuple[str, ...] = prefix + (field_name,)
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            if nullable:
+                raise WireFormatError(
+                    f"{model.__name__}.{field_name}: optional nested models are not supported"
+                )
+            columns.extend(_model_columns(annotation, path))
+            continue
+        kind: Optional[ColumnKind] = _SCALAR_KINDS.get(annotation)
+        if kind is None:
+            raise WireFormatError(
+                f"{model.__name__}.{field_name}: unsupported type {annotation}"
+            )
+        columns.append(Column(path, kind, nullable))
+    return columns
+
+
+_SCHEMAS: dict[str, WireSchema] = {}
+_LATEST: dict[str, WireSchema] = {}
+
+
+def register_schema(schema: WireSchema) -> WireSchema:
+    registered: Optional[WireSchema] = _SCHEMAS.get(schema.schema_id)
+    if registered is not None and registered != schema:
+        raise WireFormatError(f"{schema.schema_id} is already registered differently")
+    _SCHEMAS[schema.schema_id] = schema
+    latest: Optional[WireSchema] = _LATEST.get(schema.name)
+    if latest is None or schema.version > latest.version:
+        _LATEST[schema.name] = schema
+    return schema
+
+
+def pin_schema(model: Type[BaseModel], version: int, fingerprint: str) -> WireSchema:
+    """
+    Registers the model's current layout as the given version, provided it still matches the pinned
+    fingerprint
+    """
+    schema: WireSchema = WireSchema.from_model(model, version)
+    if schema.fingerprint != fingerprint:
+        raise WireFormatError(
+            f"{schema.schema_id}: {model.__name__} no longer matches its pinned layout "
+            f"{fingerprint} (now {schema.fingerprint}), pin the new layout under the next version"
+        )
+    return register_schema(schema)
+
+
+def schema_by_id(schema_id: str) -> WireSchema:
+    try:
+        return _SCHEMAS[schema_id]
+    except KeyError:
+        raise WireFormatError(f"Unknown wire schema {schema_id}") from None
+
+
+def latest_schema(model: Type[BaseModel]) -> WireSchema:
+    try:
+        return _LATEST[model.__name__]
+    except KeyError:
+        raise WireFormatError(
+            f"No wire schema registered for {model.__name__}"
+        ) from None
+
+
+pin_schema(BinanceRawData, 1, "efbd674a555eaba8")
+pin_schema(BinanceTransformedData, 1, "50918b4d3d23ff92")
+pin_schema(KucoinRawData, 1, "2de3ebc6ef28c01a")
+pin_schema(KucoinTransformedData, 1, "50918b4d3d23ff92")
+pin_schema(ConsolidatedPriceData, 1, "c79bd00b3e4b721a")
+pin_schema(CandleData, 1, "c3d2b7e220fb50d7")
+
+
+def _to_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def _pack_array(typecode: str, values: list[Any]) -> bytes:
+    packed: array[Any] = array(typecode, values)
+    if _SWAP:
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _unpack_array(typecode: str, buffer: memoryview) -> "array[Any]":
+    unpacked: array[Any] = array(typecode)
+    unpacked.frombytes(buffer)
+    if _SWAP:
+        unpacked.byteswap()
+    return unpacked
+
+
+def _encode_column(column: Column, values: list[Any]) -> list[bytes]:
+    parts: list[bytes] = []
+    if column.nullable:
+        parts.append(bytes(value is not None for value in values))
+    if column.kind == "str":
+        distinct: dict[str, int] = {}
+        indices: list[int] = [
+            distinct.setdefault(value if value is not None else "", len(distinct))
+            for value in values
+        ]
+        encoded: list[bytes] = [value.encode("utf-8") for value in distinct]
+        parts.append(_LENGTH.pack(len(encoded)))
+        parts.append(_pack_array("I", [len(value) for value in encoded]))
+        parts.append(b"".join(encoded))
+        parts.append(_pack_array("I", indices))
+        return parts
+    if column.kind == "datetime":
+        values = [_to_micros(value) if value is not None else 0 for value in values]
+    elif column.nullable:
+        values = [value if value is not None else 0 for value in values]
+    parts.append(_pack_array(_ARRAY_TYPECODES[column.kind], values))
+    return parts
+
+
+def encode_columnar(schema: WireSchema, batch: list[BaseModel]) -> bytes:
+    """
+    Layout: row count, then per column its byte length followed by its buffers
+    """
+    chunks: list[bytes] = [_LENGTH.pack(len(batch))]
+    for column in schema.columns:
+        # Read straight off the models, a model_dump() per record would cost more than the encoding
+        values: list[Any] = list(map(attrgetter(".".join(column.path)), batch))
+        parts: list[bytes] = _encode_column(column, values)
+        chunks.append(_LENGTH.pack(sum(len(part) for part in parts)))
+        chunks.extend(parts)
+    return b"".join(chunks)
+
+
+def _decode_column(column: Column, buffer: memoryview, row_count: int) -> list[Any]:
+    present: Optional[memoryview] = None
+    if column.nullable:
+        present, buffer = buffer[:row_count], buffer[row_count:]
+    values: list[Any]
+    if column.kind == "str":
+        (distinct_count,) = _LENGTH.unpack_from(buffer)
+        offset: int = _LENGTH.size
+        lengths: "array[int]" = _unpack_array(
+            "I", buffer[offset : offset + 4 * distinct_count]
+        )
+        offset += 4 * distinct_count
+        distinct: list[str] = []
+        for length in lengths:
+            distinct.append(str(buffer[offset : offset + length], "utf-8"))
+            offset += length
+        values = [distinct[index] for index in _unpack_array("I", buffer[offset:])]
+    else:
+        values = _unpack_array(_ARRAY_TYPECODES[column.kind], buffer).tolist()
+        if column.kind == "datetime":
+            # Exact below 2**53 microseconds (year 2255): the float is within 0.25us of the value
+            # and utcfromtimestamp rounds to the nearest microsecond, 3x faster than a timedelta
+            values = [datetime.utcfromtimestamp(value / 1e6) for value in values]
+        elif column.kind == "bool":
+            values = [value != 0 for value in values]
+    if present is not None:
+        values = [value if flag else None for value, flag in zip(values, present)]
+    return values
+
+
+def _assemble(
+    paths: list[tuple[str, ...]], columns: list[list[Any]], row_count: int
+) -> list[dict[str, Any]]:
+    """
+    Zips the columns back into row dicts, nested models first assembled into their own column
+    """
+    keys: list[str] = []
+    values: list[list[Any]] = []
+    position: int = 0
+    while position < len(paths):
+        key: str = paths[position][0]
+        end: int = position
+        while end < len(paths) and paths[end][0] == key:
+            end += 1
+        keys.append(key)
+        if len(paths[position]) == 1:
+            values.append(columns[position])
+        else:
+            values.append(
+                _assemble(
+                    [path[1:] for path in paths[position:end]],
+                    columns[position:end],
+                    row_count,
+                )
+            )
+        position = end
+    if not keys:
+        return [{} for _ in range(row_count)]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def decode_columnar(schema: WireSchema, payload: bytes) -> list[dict[str, Any]]:
+    """
+    Rebuilds the list of dicts model_dump() would have produced, datetimes as naive UTC datetimes
+    """
+    view: memoryview = memoryview(payload)
+    (row_count,) = _LENGTH.unpack_from(view)
+    offset: int = _LENGTH.size
+    columns: list[list[Any]] = []
+    for column in schema.columns:
+        (size,) = _LENGTH.unpack_from(view, offset)
+        offset += _LENGTH.size
+        columns.append(_decode_column(column, view[offset : offset + size], row_count))
+        offset += size
+    if offset != len(payload):
+        raise WireFormatError(
+            f"{schema.schema_id}: {len(payload) - offset} trailing byte(s) in payload"
+        )
+    return _assemble([column.path for column in schema.columns], columns, row_count)
+
+
+def columnar_headers(schema: WireSchema) -> list[tuple[str, bytes]]:
+    return [
+        (CODEC_HEADER, COLUMNAR_CODEC),
+        (SCHEMA_HEADER, schema.schema_id.encode("ascii")),
+    ]
+
+
+def columnar_schema_of(
+    headers: Optional[list[tuple[str, bytes]]],
+) -> Optional[WireSchema]:
+    """
+    The schema of a columnar message from its Kafka headers, None for JSON messages
+    """
+    if not headers:
+        return None
+    codec: Optional[bytes] = None
+    schema_id: Optional[bytes] = None
+    for name, value in headers:
+        if name == CODEC_HEADER:
+            codec = value
+        elif name == SCHEMA_HEADER:
+            schema_id = value
+    if codec is None:
+        return None
+    if codec != COLUMNAR_CODEC:
+        raise WireFormatError(f"Unknown codec {codec!r}")
+    if schema_id is None:
+        raise WireFormatError("Columnar message without a schema header")
+    return schema_by_id(schema_id.decode("ascii"))
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+from typing import Any, Optional
+
+import toml
+from dotenv import load_dotenv
+
+from database.tables import binance_table, kucoin_table
+from src.kafka.async_consumer import AsyncPrefetchingConsumer
+from src.kafka.consumers import BinanceTransformedConsumer, KucoinTransformedConsumer
+from src.services.loaders.postgres.partition_manager import PricePartitionManager
+from src.services.loaders.postgres.postgres_loader import PostgresLoader
+from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import LatencyTrace, batch_trace
+from src.utils.metrics import ProcessMetrics
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+
+class PostgresLoaderProcess:
+    """
+    High level orchestrator for loading transformed data into Postgres:
+    1. Consume from kucoin_transformed_data and binance_transformed_data topics
+    2. Upsert the latest price per symbol into kucoin_result and binance_result, one statement per batch
+    3. Append every tick to the daily partitioned price_history table when history is enabled
+    4. Commit the offsets once the batch is written
+
+    The next batch is fetched while the current one is being written.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self._metrics: ProcessMetrics = ProcessMetrics.from_config(config, "loader")
+        kafka_consumer_config: dict[str, Any] = config["kafka"]["consumer"]
+        postgres_config: dict[str, Any] = config["postgres"]
+        loader_config: dict[str, Any] = dict(postgres_config.get("loader", {}))
+        self._max_batch_messages: int = loader_config.pop("max_batch_messages", 500)
+        self._poll_timeout_s: float = loader_config.pop("poll_timeout_s", 0.5)
+        history_config: dict[str, Any] = dict(postgres_config.get("history", {}))
+        self._partition_manager: Optional[PricePartitionManager] = None
+        self._maintenance_interval_s: float = history_config.pop(
+            "maintenance_interval_s", 3600
+        )
+        if history_config.pop("enabled", False):
+            # Shared by both loaders, they write to the same history table
+            self._partition_manager = PricePartitionManager(**history_config)
+        connection_string: str = os.getenv(
+            "ASYNC_POSTGRES_URL", postgres_config["connection_string"]
+        )
+
+        self._kucoin_consumer = KucoinTransformedConsumer(
+            self._format_kafka_config(kafka_consumer_config["kucoin_transformed"])
+        )
+        self._binance_consumer = BinanceTransformedConsumer(
+            self._format_kafka_config(kafka_consumer_config["binance_transformed"])
+        )
+        self._kucoin_loader = PostgresLoader(
+            connection_string=connection_string,
+            table=kucoin_table,
+            history=self._partition_manager,
+            **loader_config,
+        )
+        self._binance_loader = PostgresLoader(
+            connection_string=connection_string,
+            table=binance_table,
+            history=self._partition_manager,
+            **loader_config,
+        )
+        self._kucoin_batches: AsyncPrefetchingConsumer[Any] = AsyncPrefetchingConsumer(
+            self._kucoin_consumer,
+            num_messages=self._max_batch_messages,
+            poll_timeout_s=self._poll_timeout_s,
+            name="kucoin-loader",
+        )
+        self._binance_batches: AsyncPrefetchingConsumer[Any] = AsyncPrefetchingConsumer(
+            self._binance_consumer,
+            num_messages=self._max_batch_messages,
+            poll_timeout_s=self._poll_timeout_s,
+            name="binance-loader",
+        )
+        self._batches: tuple[AsyncPrefetchingConsumer[Any], ...] = (
+            self._kucoin_batches,
+            self._binance_batches,
+        )
+
+    @staticmethod
+    def _format_kafka_config(kafka_config: dict[str, Any]) -> dict[str, Any]:
+        return {key.replace("_", "."): value for key, value in kafka_config.items()}
+
+    def stop(self) -> None:
+        for batches in self._batches:
+            batches.stop()
+
+    async def _run_source(
+        self, batches: AsyncPrefetchingConsumer[Any], loader: PostgresLoader
+    ) -> None:
+        """
+        The next batch is fetched and validated on the consumer thread while this one is written.
+        Batches still prefetched on stop are left uncommitted for the next run
+        """
+        async with batches:
+            async for batch in batches:
+                await loader.write_batch(batch.records)
+                trace: Optional[LatencyTrace] = batch_trace(batch.messages)
+                if trace is not None:
+                    trace.stamp("load")
+                await batches.commit(batch)
+
+    async def _maintain_partitions_forever(self) -> None:
+        while True:
+            try:
+                await self._kucoin_loader.maintain_partitions()
+            except Exception as e:
+                print(f"Partition maintenance failed: {e}")
+            await asyncio.sleep(self._maintenance_interval_s)
+
+    async def start(self) -> None:
+        print("Postgres Loader Process Started")
+        self._metrics.start()
+        await self._kucoin_loader.start()
+        await self._binance_loader.start()
+        maintenance: Optional[asyncio.Task[None]] = None
+        if self._partition_manager is not None:
+            # First pass runs before any write so today's partitions exist
+            await self._kucoin_loader.maintain_partitions()
+            maintenance = asyncio.create_task(self._maintain_partitions_forever())
+        try:
+            await asyncio.gather(
+                self._run_source(self._kucoin_batches, self._kucoin_loader),
+                self._run_source(self._binance_batches, self._binance_loader),
+            )
+        finally:
+            if maintenance is not None:
+                maintenance.cancel()
+            await self._kucoin_loader.close()
+            await self._binance_loader.close()
+            self._kucoin_consumer.close()
+            self._binance_consumer.close()
+            await self._metrics.stop()
+            print("Postgres Loader Process Stopped")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    try:
+        config: dict[str, Any] = toml.load("src/config/config.toml")
+        loader_process: PostgresLoaderProcess = PostgresLoaderProcess(config=config)
+        asyncio.run(loader_process.start())
+    except KeyboardInterrupt:
+        print("Keyboard interrupted")
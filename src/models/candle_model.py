@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class CandleData(BaseModel):
+    symbol: str
+    source: str
+    interval: str  # 1s, 1m, 5m or 1h
+    open_time: datetime  # Inclusive start of the bar, event time
+    close_time: datetime  # Exclusive end of the bar
+    open: float
+    high: float
+    low: float
+    close: float
+    # The transformed feeds carry no traded size, so this is a tick count rather than a volume
+    tick_count: int
+    created_at: datetime
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ConsolidatedPriceData(BaseModel):
+    symbol: str  # Canonical symbol e.g. BTCUSDT, same format as the transformed topics
+    base: str
+    quote: str
+    best_bid: float  # Highest bid across sources with a book
+    best_bid_source: str
+    best_ask: float  # Lowest ask across sources with a book
+    best_ask_source: str
+    last: float  # Most recent trade price across sources
+    last_source: str
+    spread: float  # best_ask - best_bid, negative when the books are crossed
+    spread_bps: float
+    # Buy on best_ask_source and sell on best_bid_source, set only when the books are crossed
+    arbitrage_bps: Optional[float] = None
+    sources: int  # Sources with a fresh quote for this pair
+    time: datetime  # Exchange time of the update that produced this record
+    created_at: datetime
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class S3ManifestEntry(BaseModel):
+    key: str
+    source: str
+    key_time: datetime  # UTC ingestion timestamp encoded in the key
+    size_bytes: int
+    etag: Optional[str] = None
+    row_count: Optional[int] = None
+    min_event_time: Optional[datetime] = None
+    max_event_time: Optional[datetime] = None
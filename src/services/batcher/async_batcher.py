@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Generic, Optional
+
+from src.services.batcher.generic_batcher import GenericBatcher, SingleMessage
+from src.utils.metrics import REGISTRY, Counter, Gauge, Histogram
+
+FlushCallback = Callable[[list[SingleMessage]], Awaitable[None]]
+
+BATCHER_FLUSHES = REGISTRY.counter(
+    "batcher_flushes_total", "Batches handed to on_flush", ("batcher",)
+)
+BATCHER_RECORDS = REGISTRY.counter(
+    "batcher_flushed_records_total", "Messages across the flushed batches", ("batcher",)
+)
+BATCHER_FLUSH_LATENCY = REGISTRY.histogram(
+    "batcher_flush_seconds", "Time spent in on_flush per batch", ("batcher",)
+)
+BATCHER_PENDING = REGISTRY.gauge(
+    "batcher_pending_messages", "Messages in the batch being filled", ("batcher",)
+)
+
+
+class AsyncBatcher(Generic[SingleMessage]):
+    """
+    asyncio-native batcher on top of GenericBatcher.
+
+    GenericBatcher only notices a timeout when the next message is appended, so a quiet stream
+    leaves a partial batch sitting forever. AsyncBatcher arms a deadline timer when a batch starts,
+    so a batch is flushed on whichever comes first:
+    1. batch_size messages
+    2. max_batch_bytes bytes, when a size_of function is given
+    3. batch_timeout_s since the first message, even if nothing else arrives
+
+    The batch list is handed to the awaitable on_flush callback as is, no copy is made. Flushes are
+    serialized so batches reach on_flush in order. A put() only waits when it triggers a flush
+    itself, queued behind any flush already running; otherwise its messages go into the next batch
+    while a deadline flush is in progress.
+    name labels the batcher's metrics, it has to be unique among the open batchers of a process.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        batch_timeout_s: float,
+        on_flush: FlushCallback[SingleMessage],
+        max_batch_bytes: Optional[int] = None,
+        size_of: Optional[Callable[[SingleMessage], int]] = None,
+        name: str = "batcher",
+    ) -> None:
+        if max_batch_bytes is not None and size_of is None:
+            raise ValueError("size_of is required when max_batch_bytes is set")
+        self._batcher: GenericBatcher[SingleMessage] = GenericBatcher(
+            batch_size=batch_size, batch_timeout_s=batch_timeout_s  # type: ignore[arg-type]
+        )
+        self._batch_size: int = batch_size
+        self._batch_timeout_s: float = batch_timeout_s
+        self._on_flush: FlushCallback[SingleMessage] = on_flush
+        self._max_batch_bytes: Optional[int] = max_batch_bytes
+        self._size_of: Optional[Callable[[SingleMessage], int]] = size_of
+        self._batch_bytes: int = 0
+        self._flush_lock: asyncio.Lock = asyncio.Lock()
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self._deadline_flushes: set[asyncio.Task[None]] = set()
+        self._flushes: Counter = BATCHER_FLUSHES.labels(name)
+        self._flushed_records: Counter = BATCHER_RECORDS.labels(name)
+        self._flush_latency: Histogram = BATCHER_FLUSH_LATENCY.labels(name)
+        self._name: str = name
+        # Released by close()
+        self._pending: Gauge = BATCHER_PENDING.claim(name)
+        self._closed: bool = False
+
+    async def put(self, message: SingleMessage) -> None:
+        await self.put_many([message])
+
+    async def put_many(self, messages: list[SingleMessage]) -> None:
+        """
+        Adds messages to the current batch, flushing each time the count or byte trigger is hit.
+        Input larger than the room left is split at the boundary and the remainder carried over,
+        so no batch handed to on_flush exceeds batch_size.
+        """
+        start: int = 0
+        while start < len(messages):
+            if len(self._batcher) == 0:
+                self._arm_deadline()
+            end: int = min(len(messages), start + self._batch_size - len(self._batcher))
+            if self._size_of is not None:
+                for index in range(start, end):
+                    self._batch_bytes += self._size_of(messages[index])
+                    if self._hit_bytes():
+                        end = index + 1
+                        break
+            self._batcher.extend(messages[start:end])
+            self._pending.set(len(self._batcher))
+            start = end
+            if self._batcher.batch_ready() or self._hit_bytes():
+                await self.flush()
+
+    def _hit_bytes(self) -> bool:
+        return (
+            self._max_batch_bytes is not None
+            and self._batch_bytes >= self._max_batch_bytes
+        )
+
+    def _arm_deadline(self) -> None:
+        self._cancel_deadline()
+        self._deadline = asyncio.get_running_loop().call_later(
+            self._batch_timeout_s, self._on_deadline
+        )
+
+    def _cancel_deadline(self) -> None:
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
+
+    def _on_deadline(self) -> None:
+        self._deadline = None
+        task: asyncio.Task[None] = asyncio.create_task(self._deadline_flush())
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._deadline_flushes.add(task)
+        task.add_done_callback(self._deadline_flushes.discard)
+
+    async def _deadline_flush(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"[AsyncBatcher] Error during deadline flush: {e}")
+
+    async def flush(self) -> None:
+        """
+        Hands the current batch to on_flush, no-op if the batch is empty
+        """
+        async with self._flush_lock:
+            if len(self._batcher) == 0:
+                return
+            self._cancel_deadline()
+            batch: list[SingleMessage] = self._batcher.take_batch()
+            self._batch_bytes = 0
+            self._pending.set(0)
+            started: float = time.perf_counter()
+            await self._on_flush(batch)
+            self._flush_latency.observe(time.perf_counter() - started)
+            self._flushes.inc()
+            self._flushed_records.inc(len(batch))
+
+    async def close(self) -> None:
+        """
+        Flushes whatever is left, to be called on shutdown. Closing twice is a no-op
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._cancel_deadline()
+        if self._deadline_flushes:
+            await asyncio.gather(*self._deadline_flushes, return_exceptions=True)
+        try:
+            await self.flush()
+        finally:
+            BATCHER_PENDING.release(self._name)
@@ -24,6 +24,16 @@ class GenericBatcher(Generic[SingleMessage]):
             self._batch_start = time.perf_counter()
         self._batch.append(message)
 
+    def extend(self, messages: list[SingleMessage]) -> None:
+        """
+        Appends a list of messages in one go, starting the timer if the batch is new
+        """
+        if not messages:
+            return
+        if not self._batch:
+            self._batch_start = time.perf_counter()
+        self._batch.extend(messages)
+
     def batch_ready(self) -> bool:
         """
         Check if the batch is ready to be flush and produced
@@ -40,10 +50,23 @@ class GenericBatcher(Generic[SingleMessage]):
 
     def reset_batch(self) -> None:
         """
-        Clears the batch and resets the timer
+        Starts a new batch and resets the timer.
+        A fresh list is swapped in rather than clearing in place, so a list returned by get_batch()
+        stays intact for whoever still holds it.
         """
-        self._batch.clear()
+        self._batch = []
         self._batch_start = -1
 
     def get_batch(self) -> list[SingleMessage]:
         return self._batch
+
+    def take_batch(self) -> list[SingleMessage]:
+        """
+        Hands the current batch over without copying and starts a new one
+        """
+        batch: list[SingleMessage] = self._batch
+        self.reset_batch()
+        return batch
+
+    def __len__(self) -> int:
+        return len(self._batch)
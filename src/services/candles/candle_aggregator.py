@@ -0,0 +1,232 @@
+"""
+Incremental OHLC bars per symbol from the transformed ticks, windowed on event time.
+
+1. every tick updates its bar in each interval in O(1): bars live in a small ring buffer per
+   (source, symbol, interval), indexed by bar number modulo the ring size
+2. each source has a watermark of (latest event time seen - allowed_lateness_ms), a bar is closed
+   and emitted once its end is at or behind the watermark
+3. ticks older than the watermark whose bar was already emitted are dropped and counted as late
+4. open bars are tracked in a heap per (source, interval) by end time, so closing never scans symbols
+
+Bars are sparse, an interval without ticks produces no bar.
+
+Open bars only live in memory. When apply() is given a stream, every open bar remembers the batch of
+that stream which opened it, and oldest_held_batch() tells the pipeline not to commit past it:
+after a restart the uncommitted ticks are replayed and the open bars rebuilt whole.
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from src.models.candle_model import CandleData
+from src.utils.extract_event_datetime import epoch_ms
+
+INTERVALS_MS: dict[str, int] = {
+    "1s": 1_000,
+    "1m": 60_000,
+    "5m": 300_000,
+    "1h": 3_600_000,
+}
+
+# Bar slot layout, a list rather than an object so updates stay plain index assignments
+OPEN_TIME, OPEN, HIGH, LOW, CLOSE, TICKS, FIRST_MS, LAST_MS, OPENED_BY = range(9)
+
+BarKey = tuple[str, str, str]  # (source, symbol, interval)
+BatchRef = tuple[str, int]  # (stream, batch number within the stream)
+
+
+class CandleAggregator:
+    """
+    - intervals: subset of INTERVALS_MS to build
+    - allowed_lateness_ms: how far behind the newest tick of a source a tick may arrive and still count
+    """
+
+    def __init__(
+        self,
+        intervals: tuple[str, ...] = tuple(INTERVALS_MS),
+        allowed_lateness_ms: int = 2_000,
+    ) -> None:
+        unknown: set[str] = set(intervals) - set(INTERVALS_MS)
+        if unknown:
+            raise ValueError(f"Unknown candle intervals: {sorted(unknown)}")
+        self._intervals: list[tuple[str, int, int]] = [
+            # A bar stays open for its own length plus the lateness, the ring holds every bar that can be open
+            (
+                interval,
+                INTERVALS_MS[interval],
+                allowed_lateness_ms // INTERVALS_MS[interval] + 2,
+            )
+            for interval in intervals
+        ]
+        self._allowed_lateness_ms: int = allowed_lateness_ms
+        self._rings: dict[BarKey, list[Optional[list[Any]]]] = {}
+        self._open_bars: dict[tuple[str, str], list[tuple[int, str, int]]] = {}
+        self._max_event_ms: dict[str, int] = {}
+        # Closed bars pushed out of their ring slot before close_bars() ran
+        self._evicted: list[CandleData] = []
+        # Batches applied per stream, and per stream the open bars each batch opened
+        self._batches: dict[str, int] = {}
+        self._held: dict[str, dict[int, int]] = {}
+        self.late_ticks: int = 0
+
+    def watermark(self, source: str) -> Optional[int]:
+        max_event_ms: Optional[int] = self._max_event_ms.get(source)
+        if max_event_ms is None:
+            return None
+        return max_event_ms - self._allowed_lateness_ms
+
+    def oldest_held_batch(self, stream: str) -> Optional[int]:
+        """
+        Number of the oldest batch of stream that opened a bar still open, None when none is
+        """
+        return min(self._held.get(stream, ()), default=None)
+
+    def _release(self, opened_by: Optional[BatchRef]) -> None:
+        if opened_by is None:
+            return
+        stream, batch = opened_by
+        held: dict[int, int] = self._held[stream]
+        held[batch] -= 1
+        if not held[batch]:
+            del held[batch]
+
+    def add(
+        self,
+        source: str,
+        symbol: str,
+        price: float,
+        time_ms: int,
+        opened_by: Optional[BatchRef] = None,
+    ) -> None:
+        watermark: Optional[int] = self.watermark(source)
+        for interval, interval_ms, ring_size in self._intervals:
+            open_time: int = time_ms - time_ms % interval_ms
+            if watermark is not None and open_time + interval_ms <= watermark:
+                # Its bar has been closed already
+                self.late_ticks += 1
+                continue
+            key: BarKey = (source, symbol, interval)
+            ring: Optional[list[Optional[list[Any]]]] = self._rings.get(key)
+            if ring is None:
+                ring = self._rings[key] = [None] * ring_size
+            slot: int = (open_time // interval_ms) % ring_size
+            bar: Optional[list[Any]] = ring[slot]
+            if bar is None or bar[OPEN_TIME] != open_time:
+                if bar is not None:
+                    # The ring is sized so a bar still in the slot is already behind the watermark
+                    self._release(bar[OPENED_BY])
+                    self._evicted.append(
+                        self._to_model(
+                            source,
+                            symbol,
+                            interval,
+                            bar[OPEN_TIME] + interval_ms,
+                            bar,
+                            datetime.utcnow(),
+                        )
+                    )
+                ring[slot] = [
+                    open_time,
+                    price,
+                    price,
+                    price,
+                    price,
+                    1,
+                    time_ms,
+                    time_ms,
+                    opened_by,
+                ]
+                if opened_by is not None:
+                    held: dict[int, int] = self._held.setdefault(opened_by[0], {})
+                    held[opened_by[1]] = held.get(opened_by[1], 0) + 1
+                heapq.heappush(
+                    self._open_bars.setdefault((source, interval), []),
+                    (open_time + interval_ms, symbol, slot),
+                )
+                continue
+            if price > bar[HIGH]:
+                bar[HIGH] = price
+            if price < bar[LOW]:
+                bar[LOW] = price
+            # Ticks may arrive out of order within the lateness, open / close follow event time
+            if time_ms < bar[FIRST_MS]:
+                bar[OPEN], bar[FIRST_MS] = price, time_ms
+            if time_ms >= bar[LAST_MS]:
+                bar[CLOSE], bar[LAST_MS] = price, time_ms
+            bar[TICKS] += 1
+        if time_ms > self._max_event_ms.get(source, -1):
+            self._max_event_ms[source] = time_ms
+
+    def close_bars(self) -> list[CandleData]:
+        """
+        Pops every bar whose end is at or behind its source's watermark, oldest first
+        """
+        closed: list[CandleData] = self._evicted
+        self._evicted = []
+        created_at: datetime = datetime.utcnow()
+        for (source, interval), heap in self._open_bars.items():
+            watermark: Optional[int] = self.watermark(source)
+            if watermark is None:
+                continue
+            interval_ms: int = INTERVALS_MS[interval]
+            while heap and heap[0][0] <= watermark:
+                close_ms, symbol, slot = heapq.heappop(heap)
+                ring: list[Optional[list[Any]]] = self._rings[
+                    (source, symbol, interval)
+                ]
+                bar: Optional[list[Any]] = ring[slot]
+                if bar is None or bar[OPEN_TIME] != close_ms - interval_ms:
+                    # Evicted and emitted already
+                    continue
+                ring[slot] = None
+                self._release(bar[OPENED_BY])
+                closed.append(
+                    self._to_model(source, symbol, interval, close_ms, bar, created_at)
+                )
+        return closed
+
+    @staticmethod
+    def _to_model(
+        source: str,
+        symbol: str,
+        interval: str,
+        close_ms: int,
+        bar: list[Any],
+        created_at: datetime,
+    ) -> CandleData:
+        epoch: datetime = datetime(1970, 1, 1)
+        return CandleData(
+            symbol=symbol,
+            source=source,
+            interval=interval,
+            open_time=epoch + timedelta(milliseconds=bar[OPEN_TIME]),
+            close_time=epoch + timedelta(milliseconds=close_ms),
+            open=bar[OPEN],
+            high=bar[HIGH],
+            low=bar[LOW],
+            close=bar[CLOSE],
+            tick_count=bar[TICKS],
+            created_at=created_at,
+        )
+
+    def apply(
+        self, transformed_records: list[dict[str, Any]], stream: Optional[str] = None
+    ) -> list[CandleData]:
+        """
+        Takes transformed records as dicts (symbol, price, time, source), returns the bars they closed.
+        stream: the pipeline the records come from, its batches are numbered from 0 in call order
+        """
+        opened_by: Optional[BatchRef] = None
+        if stream is not None:
+            opened_by = (stream, self._batches.get(stream, 0))
+            self._batches[stream] = opened_by[1] + 1
+        for record in transformed_records:
+            self.add(
+                record["source"],
+                record["symbol"],
+                record["price"],
+                epoch_ms(record["time"]),
+                opened_by,
+            )
+        return self.close_bars()
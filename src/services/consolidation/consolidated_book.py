@@ -0,0 +1,185 @@
+"""
+Cross-exchange book of the best quote per canonical pair.
+
+Each tick only touches its own pair: the source's quote is replaced, then best bid / ask / last are
+recomputed over the handful of sources quoting that pair, never by rescanning the market.
+A pair is emitted only when its consolidated view changed, and at most once per applied batch.
+
+Kucoin tickers carry a best bid / ask. Binance 24hr tickers only carry the last price, so a Binance
+quote has no book: it counts towards the sources and can set last, but never the best bid / ask or
+an arbitrage.
+"""
+
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+
+from src.models.consolidated_model import ConsolidatedPriceData
+from src.utils.symbol_mapper import CanonicalSymbol, SymbolMapper
+
+
+class SourceQuote(NamedTuple):
+    bid: Optional[float]  # None when the source has no book
+    ask: Optional[float]
+    last: float
+    time_ms: int
+
+
+class BestQuote(NamedTuple):
+    best_bid: float
+    best_bid_source: str
+    best_ask: float
+    best_ask_source: str
+    last: float
+    last_source: str
+    sources: int
+    time_ms: int
+
+
+class ConsolidatedBook:
+    """
+    - min_sources: pairs quoted by fewer fresh sources are not emitted
+    - max_quote_age_ms: a source quote older than this, relative to the incoming tick, is ignored
+
+    A pair is only emitted once at least one fresh source quotes a book.
+    """
+
+    def __init__(
+        self,
+        mapper: SymbolMapper,
+        min_sources: int = 2,
+        max_quote_age_ms: int = 60_000,
+    ) -> None:
+        self._mapper: SymbolMapper = mapper
+        self._min_sources: int = min_sources
+        self._max_quote_age_ms: int = max_quote_age_ms
+        self._quotes: dict[CanonicalSymbol, dict[str, SourceQuote]] = {}
+        self._best: dict[CanonicalSymbol, BestQuote] = {}
+
+    def best(self, pair: CanonicalSymbol) -> Optional[BestQuote]:
+        return self._best.get(pair)
+
+    def update(
+        self,
+        source: str,
+        exchange_symbol: str,
+        bid: Optional[float],
+        ask: Optional[float],
+        last: float,
+        time_ms: int,
+    ) -> Optional[CanonicalSymbol]:
+        """
+        Applies one tick, returns the pair when its consolidated view changed.
+        bid / ask are None for a source that only reports its last price
+        """
+        pair: Optional[CanonicalSymbol] = self._mapper(exchange_symbol)
+        if pair is None:
+            return None
+        quotes: Optional[dict[str, SourceQuote]] = self._quotes.get(pair)
+        if quotes is None:
+            quotes = self._quotes[pair] = {}
+        quotes[source] = SourceQuote(bid, ask, last, time_ms)
+
+        oldest_ms: int = time_ms - self._max_quote_age_ms
+        fresh: list[tuple[str, SourceQuote]] = [
+            (quote_source, quote)
+            for quote_source, quote in quotes.items()
+            if quote.time_ms >= oldest_ms
+        ]
+        if len(fresh) < self._min_sources:
+            return None
+        booked: list[tuple[str, float, float]] = [
+            (quote_source, quote.bid, quote.ask)
+            for quote_source, quote in fresh
+            if quote.bid is not None and quote.ask is not None
+        ]
+        if not booked:
+            return None
+        bid_source, bid, _ = max(booked, key=lambda item: item[1])
+        ask_source, _, ask = min(booked, key=lambda item: item[2])
+        last_source, last_quote = max(fresh, key=lambda item: item[1].time_ms)
+        best: BestQuote = BestQuote(
+            bid,
+            bid_source,
+            ask,
+            ask_source,
+            last_quote.last,
+            last_source,
+            len(fresh),
+            time_ms,
+        )
+        previous: Optional[BestQuote] = self._best.get(pair)
+        self._best[pair] = best
+        # Only the time moved, nothing worth publishing
+        if previous is not None and previous[:7] == best[:7]:
+            return None
+        return pair
+
+    def to_model(
+        self, pair: CanonicalSymbol, created_at: datetime
+    ) -> ConsolidatedPriceData:
+        best: BestQuote = self._best[pair]
+        spread: float = best.best_ask - best.best_bid
+        mid: float = (best.best_ask + best.best_bid) / 2
+        arbitrage_bps: Optional[float] = None
+        if spread < 0 and best.best_bid_source != best.best_ask_source:
+            arbitrage_bps = -spread / best.best_ask * 10_000
+        return ConsolidatedPriceData(
+            symbol=pair.symbol,
+            base=pair.base,
+            quote=pair.quote,
+            best_bid=best.best_bid,
+            best_bid_source=best.best_bid_source,
+            best_ask=best.best_ask,
+            best_ask_source=best.best_ask_source,
+            last=best.last,
+            last_source=best.last_source,
+            spread=spread,
+            spread_bps=spread / mid * 10_000 if mid else 0.0,
+            arbitrage_bps=arbitrage_bps,
+            sources=best.sources,
+            time=datetime.utcfromtimestamp(best.time_ms / 1000),
+            created_at=created_at,
+        )
+
+    def _emit(
+        self, changed: dict[CanonicalSymbol, None]
+    ) -> list[ConsolidatedPriceData]:
+        created_at: datetime = datetime.utcnow()
+        return [self.to_model(pair, created_at) for pair in changed]
+
+    def apply_kucoin(
+        self, kucoin_records: list[dict[str, Any]]
+    ) -> list[ConsolidatedPriceData]:
+        """
+        Takes raw Kucoin tickers as dicts, returns one record per pair whose view changed in the batch
+        """
+        # dict keeps first-seen order and dedupes pairs updated several times in the batch
+        changed: dict[CanonicalSymbol, None] = {}
+        for record in kucoin_records:
+            data: dict[str, Any] = record["data"]
+            pair: Optional[CanonicalSymbol] = self.update(
+                "kucoin",
+                record["subject"],
+                float(data["bestBid"]),
+                float(data["bestAsk"]),
+                float(data["price"]),
+                data["time"],
+            )
+            if pair is not None:
+                changed[pair] = None
+        return self._emit(changed)
+
+    def apply_binance(
+        self, binance_records: list[dict[str, Any]]
+    ) -> list[ConsolidatedPriceData]:
+        """
+        Takes raw Binance 24hr tickers as dicts, returns one record per pair whose view changed in the batch
+        """
+        changed: dict[CanonicalSymbol, None] = {}
+        for record in binance_records:
+            pair: Optional[CanonicalSymbol] = self.update(
+                "binance", record["s"], None, None, float(record["c"]), record["E"]
+            )
+            if pair is not None:
+                changed[pair] = None
+        return self._emit(changed)
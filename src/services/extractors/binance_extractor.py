@@ -1,8 +1,8 @@
-import json
 import logging
 import os
 import threading
-from typing import AsyncGenerator, Any
+import time
+from typing import AsyncGenerator
 
 import aiohttp
 import asyncio
@@ -11,16 +11,36 @@ from dotenv import load_dotenv
 from pydantic import BaseModel
 from tenacity import retry, wait_fixed, stop_after_attempt
 
+from src.common.decoders import DecodeMode, FrameDecoder, build_decoder
 from src.common.generic_extractor import AsyncExtractor
 from src.models.binance_model import BinanceRawData
 from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import now_ms
+from src.utils.metrics import REGISTRY, Counter, Histogram
+from src.utils.symbol_filter import SymbolFilter, SymbolFilterConfig
 
 logger: logging.Logger = logging.Logger(__name__)
 logger_setup(logger)
 
+EXTRACTED_FRAMES = REGISTRY.counter(
+    "extractor_frames_total", "Websocket frames received", ("source",)
+)
+EXTRACTED_RECORDS = REGISTRY.counter(
+    "extractor_records_total", "Tickers decoded from the frames", ("source",)
+)
+EXTRACTOR_ERRORS = REGISTRY.counter(
+    "extractor_errors_total", "Websocket sessions ended by an error", ("source",)
+)
+DECODE_LATENCY = REGISTRY.histogram(
+    "extractor_decode_seconds", "Parsing and validating one frame", ("source",)
+)
+
 
 class BinanceExtractorParams(BaseModel):
-    pass
+    # "trusted" validates the whole !miniTicker@arr frame in one call instead of per ticker
+    decode_mode: DecodeMode = "validate"
+    # Applied on the raw symbol before validation
+    symbol_filter: SymbolFilterConfig = SymbolFilterConfig()
 
 
 class BinanceExtractor(AsyncExtractor[BinanceExtractorParams, BinanceRawData]):
@@ -28,6 +48,12 @@ class BinanceExtractor(AsyncExtractor[BinanceExtractorParams, BinanceRawData]):
         # 1. threading.Event() because we want external threads to trigger stop, not from within the async loop
         # 2. To allow the thread to stop gracefully, finishing thoroughly and cleaning up all resources before stopping
         self.stop_event: threading.Event = threading.Event()
+        self._frames: Counter = EXTRACTED_FRAMES.labels("binance")
+        self._records: Counter = EXTRACTED_RECORDS.labels("binance")
+        self._errors: Counter = EXTRACTOR_ERRORS.labels("binance")
+        self._decode_latency: Histogram = DECODE_LATENCY.labels("binance")
+        # Wall clock ms the frame of the last yielded batch was read off the socket
+        self.received_at_ms: int = 0
 
     # External callable for tests to stop the session
     def request_stop(self):
@@ -43,6 +69,16 @@ class BinanceExtractor(AsyncExtractor[BinanceExtractorParams, BinanceRawData]):
         binance_extractor_params: BinanceExtractorParams,
     ) -> AsyncGenerator[list[BinanceRawData], None]:
         connection_string: str = os.getenv("BINANCE_CONNECTION")
+        symbol_filter: SymbolFilter = SymbolFilter(
+            binance_extractor_params.symbol_filter
+        )
+        decoder: FrameDecoder[BinanceRawData] = build_decoder(
+            BinanceRawData,
+            binance_extractor_params.decode_mode,
+            is_array=True,
+            symbol_key="s",
+            symbol_filter=None if symbol_filter.is_noop else symbol_filter,
+        )
         while not self.stop_event.is_set():
             try:
                 async with aiohttp.ClientSession() as session:
@@ -55,13 +91,17 @@ class BinanceExtractor(AsyncExtractor[BinanceExtractorParams, BinanceRawData]):
                             msg: WSMessage
                             if msg.type == aiohttp.WSMsgType.TEXT:
                                 msg_string: str = msg.data
-                                # Deserialize from json to list[dict]
-                                msg_dict: list[dict[str, Any]] = json.loads(msg_string)
-                                # Deserialize from list[dict] into list[BinanceRawData], Validation step
-                                binance_ticker_list = [
-                                    BinanceRawData.model_validate(item)
-                                    for item in msg_dict
-                                ]
+                                self.received_at_ms = now_ms()
+                                started: float = time.perf_counter()
+                                # Deserialize from json into list[BinanceRawData], Validation step
+                                binance_ticker_list: list[BinanceRawData] = (
+                                    decoder.decode(msg_string)
+                                )
+                                self._decode_latency.observe(
+                                    time.perf_counter() - started
+                                )
+                                self._frames.inc()
+                                self._records.inc(len(binance_ticker_list))
                                 yield binance_ticker_list
                             elif msg.type == aiohttp.WSMsgType.CLOSED:
                                 raise ValueError(
@@ -72,8 +112,10 @@ class BinanceExtractor(AsyncExtractor[BinanceExtractorParams, BinanceRawData]):
                 print("WARNING: WebSocket session ended, will retry after short delay.")
                 await asyncio.sleep(1)
             except aiohttp.ClientError as e:
+                self._errors.inc()
                 raise Exception(f"Client error occurred: {e}") from e
             except Exception as e:
+                self._errors.inc()
                 raise Exception(f"Unexpected error occurred {e}")
 
 
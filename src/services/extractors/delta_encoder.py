@@ -0,0 +1,160 @@
+"""
+Change detection for the Binance !miniTicker@arr full-market frames.
+
+Binance resends almost every symbol each second, most of them unchanged. The encoder keeps the last
+forwarded ticker per symbol and only lets through the ones whose values moved:
+1. delta frames: the tickers whose price / volume fields differ from the last forwarded ones
+2. keyframes: sent on the first frame and then every keyframe_interval_s so consumers starting from
+   the latest offset get a complete picture. The changed tickers travel as usual, every other known
+   symbol's latest ticker is carried over in a separate carryover message ahead of them
+
+Carried over tickers were already forwarded once, they only serve SnapshotState: the other consumers
+skip carryover messages (is_carryover), else every keyframe would repeat a tick per symbol.
+
+A ticker is dropped only when it is identical to the last forwarded one apart from its event time,
+so the latest forwarded ticker per symbol always carries the values of the latest received one:
+replaying the frames from any keyframe onward rebuilds the exact market state, only the event times
+of the skipped tickers are lost.
+"""
+
+import time
+from typing import Callable, Literal, NamedTuple, Optional
+
+from pydantic import BaseModel
+
+from src.models.binance_model import BinanceRawData
+
+FrameKind = Literal["keyframe", "delta", "carryover"]
+
+# Kafka header names, the values are ASCII bytes
+FRAME_KIND_HEADER: str = "frame"
+FRAME_SEQUENCE_HEADER: str = "sequence"
+
+
+class DeltaEncoderParams(BaseModel):
+    """
+    - enabled: False forwards every frame as is
+    - keyframe_interval_s: seconds between two full keyframes
+    """
+
+    enabled: bool = True
+    keyframe_interval_s: float = 30.0
+
+
+def frame_headers(kind: FrameKind, sequence: int) -> list[tuple[str, bytes]]:
+    return [
+        (FRAME_KIND_HEADER, kind.encode("ascii")),
+        (FRAME_SEQUENCE_HEADER, str(sequence).encode("ascii")),
+    ]
+
+
+def is_carryover(headers: Optional[list[tuple[str, bytes]]]) -> bool:
+    """
+    True for a keyframe's carryover message, whose tickers were already forwarded once
+    """
+    return any(
+        name == FRAME_KIND_HEADER and value == b"carryover"
+        for name, value in headers or ()
+    )
+
+
+class EncodedFrame(NamedTuple):
+    kind: FrameKind
+    sequence: int
+    records: list[BinanceRawData]  # The changed tickers
+    # Keyframes only: the unchanged symbols' latest tickers, sent in their own carryover message
+    carried: tuple[BinanceRawData, ...] = ()
+
+    @property
+    def headers(self) -> list[tuple[str, bytes]]:
+        return frame_headers(self.kind, self.sequence)
+
+    @property
+    def carried_headers(self) -> list[tuple[str, bytes]]:
+        return frame_headers("carryover", self.sequence)
+
+
+def ticker_values(record: BinanceRawData) -> tuple[str, ...]:
+    """
+    Everything a ticker carries except its event type and event time
+    """
+    return (record.c, record.o, record.h, record.l, record.v, record.q)
+
+
+class BinanceDeltaEncoder:
+    """
+    Turns full-market frames into delta frames and periodic keyframes.
+    Frames without any change are skipped, encode() then returns None and the sequence does not move,
+    so a consumer sees a gap in the sequence only when a frame was lost.
+    With keyed partitioning a frame is split across partitions and a partition only receives the
+    frames touching its symbols, gaps are then only meaningful over the whole topic.
+    """
+
+    def __init__(
+        self,
+        params: DeltaEncoderParams,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._keyframe_interval_s: float = params.keyframe_interval_s
+        self._clock: Callable[[], float] = clock
+        self._last_values: dict[str, tuple[str, ...]] = {}
+        self._last_records: dict[str, BinanceRawData] = {}
+        self._next_keyframe_at: float = float("-inf")
+        self._sequence: int = 0
+        self.records_in: int = 0
+        self.records_out: int = 0
+
+    def encode(self, records: list[BinanceRawData]) -> Optional[EncodedFrame]:
+        self.records_in += len(records)
+        changed: list[BinanceRawData] = []
+        for record in records:
+            values: tuple[str, ...] = ticker_values(record)
+            if self._last_values.get(record.s) != values:
+                self._last_values[record.s] = values
+                changed.append(record)
+            self._last_records[record.s] = record
+
+        now: float = self._clock()
+        if now >= self._next_keyframe_at:
+            self._next_keyframe_at = now + self._keyframe_interval_s
+            # Unchanged symbols and the ones missing from this frame are carried over
+            changed_symbols: set[str] = {record.s for record in changed}
+            carried: tuple[BinanceRawData, ...] = tuple(
+                record
+                for symbol, record in self._last_records.items()
+                if symbol not in changed_symbols
+            )
+            self._sequence += 1
+            self.records_out += len(changed) + len(carried)
+            return EncodedFrame("keyframe", self._sequence, changed, carried)
+        if not changed:
+            return None
+        self._sequence += 1
+        self.records_out += len(changed)
+        return EncodedFrame("delta", self._sequence, changed)
+
+
+class SnapshotState:
+    """
+    Consumer side: rebuilds the full market from a stream of encoded frames, carryover messages
+    included. Frames before the first keyframe or carryover are ignored, the state would be incomplete.
+    """
+
+    def __init__(self) -> None:
+        self._records: dict[str, BinanceRawData] = {}
+        self._synced: bool = False
+
+    @property
+    def synced(self) -> bool:
+        return self._synced
+
+    def apply(self, kind: FrameKind, records: list[BinanceRawData]) -> None:
+        if kind != "delta":
+            self._synced = True
+        elif not self._synced:
+            return
+        for record in records:
+            self._records[record.s] = record
+
+    def snapshot(self) -> dict[str, BinanceRawData]:
+        return dict(self._records)
@@ -1,19 +1,23 @@
-import json
 import logging
 import threading
 import os
-from typing import AsyncGenerator, Any
+import time
+from typing import AsyncGenerator, Any, Optional
 
 import aiohttp
 import asyncio
-from aiohttp import WSMessage
+from aiohttp import ClientWebSocketResponse, WSMessage
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+from src.common.decoders import DecodeMode, FrameDecoder, build_decoder
 from src.common.generic_extractor import AsyncExtractor
 from src.models.kucoin_model import KucoinRawData
 from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import now_ms
+from src.utils.metrics import REGISTRY, Counter, Histogram
+from src.utils.symbol_filter import SymbolFilter, SymbolFilterConfig
 
 """
 Sample Response message:
@@ -29,9 +33,56 @@ Sample Response message:
 logger: logging.Logger = logging.Logger(__name__)
 logger_setup(logger)
 
+EXTRACTED_FRAMES = REGISTRY.counter(
+    "extractor_frames_total", "Websocket frames received", ("source",)
+)
+EXTRACTED_RECORDS = REGISTRY.counter(
+    "extractor_records_total", "Tickers decoded from the frames", ("source",)
+)
+EXTRACTOR_ERRORS = REGISTRY.counter(
+    "extractor_errors_total", "Websocket sessions ended by an error", ("source",)
+)
+DECODE_LATENCY = REGISTRY.histogram(
+    "extractor_decode_seconds", "Parsing and validating one frame", ("source",)
+)
+
 
 class KucoinExtractorParams(BaseModel):
-    pass
+    # "trusted" parses each frame straight into KucoinRawData in a single call
+    decode_mode: DecodeMode = "validate"
+    # Applied on the raw subject before validation, dropped pairs never reach the batcher
+    symbol_filter: SymbolFilterConfig = SymbolFilterConfig()
+    # Upper bound on how many tickers are drained from the socket into one yielded batch
+    max_batch_size: int = 1000
+
+
+async def pump_frames(
+    ws: ClientWebSocketResponse, frames: "asyncio.Queue[WSMessage]"
+) -> None:
+    """
+    Reads frames off the socket as they arrive. A full queue stops the reads, so the socket's
+    flow control pushes back on the exchange instead of frames piling up in memory.
+    """
+    async for msg in ws:
+        await frames.put(msg)
+
+
+async def wait_frame(
+    frames: "asyncio.Queue[WSMessage]", pump: "asyncio.Task[None]"
+) -> Optional[WSMessage]:
+    """
+    Next frame, None once the session ended and every frame was taken.
+    Raises whatever ended the pump if it failed.
+    """
+    if not frames.empty():
+        return frames.get_nowait()
+    get: asyncio.Task[WSMessage] = asyncio.create_task(frames.get())
+    await asyncio.wait((get, pump), return_when=asyncio.FIRST_COMPLETED)
+    if get.done():
+        return get.result()
+    get.cancel()
+    pump.result()
+    return None
 
 
 class KucoinWSData:
@@ -54,17 +105,83 @@ class KucoinExtractor(AsyncExtractor[KucoinExtractorParams, KucoinRawData]):
         # 1. threading.Event() because we want external threads to trigger stop, not from within the async loop
         # 2. To allow the thread to stop gracefully, finishing thoroughly and cleaning up all resources before stopping
         self.stop_event: threading.Event = threading.Event()
+        self._frames: Counter = EXTRACTED_FRAMES.labels("kucoin")
+        self._records: Counter = EXTRACTED_RECORDS.labels("kucoin")
+        self._errors: Counter = EXTRACTOR_ERRORS.labels("kucoin")
+        self._decode_latency: Histogram = DECODE_LATENCY.labels("kucoin")
+        # Wall clock ms the first frame of the last yielded batch was read off the socket
+        self.received_at_ms: int = 0
 
     def request_stop(self):
         self.stop_event.set()
 
+    def _decode_message(
+        self, msg: WSMessage, decoder: FrameDecoder[KucoinRawData]
+    ) -> list[KucoinRawData]:
+        if msg.type == aiohttp.WSMsgType.TEXT:
+            msg_string: str = msg.data
+            started: float = time.perf_counter()
+            records: list[KucoinRawData] = decoder.decode(msg_string)
+            self._decode_latency.observe(time.perf_counter() - started)
+            self._frames.inc()
+            self._records.inc(len(records))
+            return records
+        elif msg.type == aiohttp.WSMsgType.CLOSED:
+            raise ValueError("WebSocket connection closed.")
+        elif msg.type == aiohttp.WSMsgType.ERROR:
+            raise ValueError("WebSocket encountered an error.")
+        return []
+
+    async def _read_batches(
+        self,
+        ws: ClientWebSocketResponse,
+        decoder: FrameDecoder[KucoinRawData],
+        max_batch_size: int,
+    ) -> AsyncGenerator[list[KucoinRawData], None]:
+        """
+        Batches until the session ends or a stop is requested. Frames are read off the socket by a
+        pump task, every frame queued up while the previous batch was processed joins the next one.
+        """
+        frames: asyncio.Queue[WSMessage] = asyncio.Queue(maxsize=max_batch_size)
+        pump: asyncio.Task[None] = asyncio.create_task(pump_frames(ws, frames))
+        try:
+            while not self.stop_event.is_set():
+                msg: Optional[WSMessage] = await wait_frame(frames, pump)
+                if msg is None:
+                    return
+                self.received_at_ms = now_ms()
+                batch: list[KucoinRawData] = self._decode_message(msg, decoder)
+                while len(batch) < max_batch_size and not frames.empty():
+                    batch.extend(self._decode_message(frames.get_nowait(), decoder))
+                if batch:
+                    yield batch
+        finally:
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
+
     @retry(wait=wait_fixed(0.01), stop=stop_after_attempt(5), reraise=True)
     async def extract_async(
         self,
         kucoin_extractor_params: KucoinExtractorParams,
-    ) -> AsyncGenerator[KucoinRawData, None]:
+    ) -> AsyncGenerator[list[KucoinRawData], None]:
+        """
+        Yields batches of tickers, up to max_batch_size, see _read_batches
+        """
         # Kucoin requires to get WS details to subscribe to the WS
         # Creating connection string from the returned bullet_data
+        # Frames without subject / data are the welcome and ack messages, the decoder drops them
+        symbol_filter: SymbolFilter = SymbolFilter(
+            kucoin_extractor_params.symbol_filter
+        )
+        decoder: FrameDecoder[KucoinRawData] = build_decoder(
+            KucoinRawData,
+            kucoin_extractor_params.decode_mode,
+            is_array=False,
+            required_keys=("subject", "data"),
+            symbol_key="subject",
+            symbol_filter=None if symbol_filter.is_noop else symbol_filter,
+        )
+        max_batch_size: int = kucoin_extractor_params.max_batch_size
         while not self.stop_event.is_set():
             try:
                 bullet_data: dict[str, Any] = await KucoinWSData.get_kucoin_ws_details()
@@ -83,37 +200,27 @@ class KucoinExtractor(AsyncExtractor[KucoinExtractorParams, KucoinRawData]):
                         }
                         await ws.send_json(subscribe_message)
                         print("Subscription message sent.")
-                        async for msg in ws:
-                            if self.stop_event.is_set():
-                                print("Stop event received — breaking WebSocket loop.")
-                                break
-                            msg: WSMessage
-                            if msg.type == aiohttp.WSMsgType.TEXT:
-                                msg_string: str = msg.data
-                                msg_dict: dict[str, Any] = json.loads(msg_string)
-                                # To filter the welcome message
-                                if "subject" in msg_dict and "data" in msg_dict:
-                                    kucoin_ticker = KucoinRawData.model_validate(
-                                        msg_dict
-                                    )
-                                    yield kucoin_ticker
-                            elif msg.type == aiohttp.WSMsgType.CLOSED:
-                                raise ValueError("WebSocket connection closed.")
-                            elif msg.type == aiohttp.WSMsgType.ERROR:
-                                raise ValueError("WebSocket encountered an error.")
+                        async for batch in self._read_batches(
+                            ws, decoder, max_batch_size
+                        ):
+                            yield batch
+                        if self.stop_event.is_set():
+                            print("Stop event received — breaking WebSocket loop.")
                 print("WARNING: WebSocket session ended, will retry after short delay.")
                 await asyncio.sleep(1)
             except aiohttp.ClientError as e:
+                self._errors.inc()
                 raise Exception(f"Client error occurred: {e}") from e
             except Exception as e:
+                self._errors.inc()
                 raise Exception(f"Unexpected error occurred: {e}") from e
 
 
 async def main() -> None:
     kucoin_extractor_params: KucoinExtractorParams = KucoinExtractorParams()
     kucoin_extractor: KucoinExtractor = KucoinExtractor()
-    async for ticker in kucoin_extractor.extract_async(kucoin_extractor_params):
-        print(ticker)
+    async for tickers in kucoin_extractor.extract_async(kucoin_extractor_params):
+        print(tickers)
 
 
 if __name__ == "__main__":
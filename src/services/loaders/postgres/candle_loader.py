@@ -0,0 +1,96 @@
+"""
+Writes closed OHLC bars to the candles table, one unnest statement per batch like PostgresLoader.
+Closed bars are final, the upsert only makes replays after a restart idempotent. A replay starts at the
+oldest tick of the bars still open, so a bar closed before the restart may come back with only its
+later ticks: the upsert never replaces a bar with one built from fewer ticks.
+"""
+
+from typing import Any, Optional
+
+import asyncpg
+
+from database.tables import candles_table
+from src.models.candle_model import CandleData
+from src.services.loaders.postgres.postgres_loader import asyncpg_dsn
+
+CANDLE_COLUMNS: tuple[str, ...] = (
+    "source",
+    "symbol",
+    "interval",
+    "open_time",
+    "close_time",
+    "open",
+    "high",
+    "low",
+    "close",
+    "tick_count",
+    "created_at",
+)
+CANDLE_TYPES: tuple[str, ...] = (
+    "text",
+    "text",
+    "text",
+    "timestamp",
+    "timestamp",
+    "float8",
+    "float8",
+    "float8",
+    "float8",
+    "int4",
+    "timestamp",
+)
+
+
+def build_upsert_candles_query(table_name: str) -> str:
+    arrays: str = ", ".join(
+        f"${position}::{column_type}[]"
+        for position, column_type in enumerate(CANDLE_TYPES, start=1)
+    )
+    columns: str = ", ".join(CANDLE_COLUMNS)
+    updates: str = ", ".join(
+        f"{column} = EXCLUDED.{column}" for column in CANDLE_COLUMNS[4:]
+    )
+    return f"""
+        INSERT INTO {table_name} ({columns})
+        SELECT * FROM unnest({arrays})
+        ON CONFLICT (source, symbol, interval, open_time) DO UPDATE SET {updates}
+        WHERE {table_name}.tick_count <= EXCLUDED.tick_count
+    """
+
+
+class CandleLoader:
+    def __init__(
+        self,
+        connection_string: str,
+        min_pool_size: int = 1,
+        max_pool_size: int = 2,
+    ) -> None:
+        self._dsn: str = asyncpg_dsn(connection_string)
+        self._upsert_query: str = build_upsert_candles_query(candles_table.name)
+        self._min_pool_size: int = min_pool_size
+        self._max_pool_size: int = max_pool_size
+        self._pool: Optional[asyncpg.Pool] = None
+
+    async def start(self) -> None:
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            dsn=self._dsn, min_size=self._min_pool_size, max_size=self._max_pool_size
+        )
+
+    async def write(self, candles: list[CandleData]) -> int:
+        if not candles:
+            return 0
+        assert self._pool is not None, "CandleLoader.start() was not awaited"
+        columns: list[list[Any]] = [[] for _ in CANDLE_COLUMNS]
+        for candle in candles:
+            for column, name in zip(columns, CANDLE_COLUMNS):
+                column.append(getattr(candle, name))
+        async with self._pool.acquire() as connection:
+            await connection.execute(self._upsert_query, *columns)
+        return len(candles)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -0,0 +1,142 @@
+"""
+Keeps the daily partitions of price_history in line with the clock:
+
+1. premake_days partitions are created ahead of today, so writes never wait on DDL
+2. partitions older than retention_days are detached and dropped, which is instant compared to DELETE
+3. a write that lands outside every partition creates the missing day on demand
+
+Partitions are named {table}_pYYYYMMDD and cover [day, day + 1).
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+import asyncpg
+
+from database.tables import PRICE_HISTORY_PARTITION_PREFIX, price_history_table
+from src.utils.generic_logger import logger_setup
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+
+class PricePartitionManager:
+    def __init__(
+        self,
+        table_name: str = price_history_table.name,
+        partition_prefix: str = PRICE_HISTORY_PARTITION_PREFIX,
+        premake_days: int = 3,
+        retention_days: int = 30,
+    ) -> None:
+        self._table_name: str = table_name
+        self._partition_prefix: str = partition_prefix
+        self._premake_days: int = premake_days
+        self._retention_days: int = retention_days
+        # Days known to have a partition, saves a catalog round trip per batch
+        self._known_days: set[date] = set()
+
+    @property
+    def table_name(self) -> str:
+        return self._table_name
+
+    def partition_name(self, day: date) -> str:
+        return f"{self._partition_prefix}{day:%Y%m%d}"
+
+    def partition_day(self, partition_name: str) -> Optional[date]:
+        """
+        Inverse of partition_name, None for tables that do not follow the naming scheme
+        """
+        if not partition_name.startswith(self._partition_prefix):
+            return None
+        try:
+            return datetime.strptime(
+                partition_name[len(self._partition_prefix) :], "%Y%m%d"
+            ).date()
+        except ValueError:
+            return None
+
+    def retention_cutoff(self, today: Optional[date] = None) -> date:
+        """
+        Oldest day still retained, anything before it is dropped
+        """
+        today = today or datetime.utcnow().date()
+        return today - timedelta(days=self._retention_days)
+
+    def missing_days(self, days: Iterable[date]) -> list[date]:
+        return sorted(set(days) - self._known_days)
+
+    async def ensure_partitions(
+        self,
+        connection: asyncpg.Connection,
+        days: Iterable[date],
+        today: Optional[date] = None,
+    ) -> None:
+        """
+        Creates the partitions for days that are not known yet, days past retention are skipped
+        so late ticks never resurrect a dropped partition
+        """
+        cutoff: date = self.retention_cutoff(today)
+        for day in self.missing_days(days):
+            if day < cutoff:
+                continue
+            name: str = self.partition_name(day)
+            try:
+                await connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self._table_name} "
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                )
+            except (asyncpg.DuplicateTableError, asyncpg.UniqueViolationError):
+                # Another loader created it between our check and the CREATE
+                pass
+            self._known_days.add(day)
+
+    async def list_partitions(self, connection: asyncpg.Connection) -> list[str]:
+        rows: list[asyncpg.Record] = await connection.fetch(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = $1
+            """,
+            self._table_name,
+        )
+        return [row["relname"] for row in rows]
+
+    async def drop_expired(
+        self, connection: asyncpg.Connection, today: Optional[date] = None
+    ) -> list[str]:
+        cutoff: date = self.retention_cutoff(today)
+        dropped: list[str] = []
+        for name in await self.list_partitions(connection):
+            day: Optional[date] = self.partition_day(name)
+            if day is None or day >= cutoff:
+                continue
+            # Detaching first keeps the lock on the parent short
+            await connection.execute(
+                f"ALTER TABLE {self._table_name} DETACH PARTITION {name}"
+            )
+            await connection.execute(f"DROP TABLE IF EXISTS {name}")
+            self._known_days.discard(day)
+            dropped.append(name)
+        return dropped
+
+    async def maintain(
+        self, connection: asyncpg.Connection, today: Optional[date] = None
+    ) -> None:
+        """
+        One maintenance pass: premake the upcoming days, then apply retention
+        """
+        today = today or datetime.utcnow().date()
+        await self.ensure_partitions(
+            connection,
+            (
+                today + timedelta(days=offset)
+                for offset in range(self._premake_days + 1)
+            ),
+            today,
+        )
+        dropped: list[str] = await self.drop_expired(connection, today)
+        if dropped:
+            logger.info(f"Dropped expired {self._table_name} partitions: {dropped}")
@@ -0,0 +1,169 @@
+"""
+Bulk writer for the transformed feeds, one asyncpg round trip per batch and table.
+
+1. latest price: the batch is sent as 5 column arrays in asyncpg's binary format and unnested server side,
+   so the statement size and planning cost do not grow with the batch. DISTINCT ON keeps the newest tick
+   per symbol since ON CONFLICT cannot touch the same row twice within one statement.
+2. history: appended with binary COPY into the daily partitioned price_history table
+"""
+
+import logging
+from datetime import date, datetime
+from typing import Any, Optional, Union
+
+import asyncpg
+from sqlalchemy import Table
+
+from src.models.binance_model import BinanceTransformedData
+from src.models.kucoin_model import KucoinTransformedData
+from src.services.loaders.postgres.partition_manager import PricePartitionManager
+from src.utils.generic_logger import logger_setup
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+TransformedData = Union[KucoinTransformedData, BinanceTransformedData]
+
+HISTORY_COLUMNS: tuple[str, ...] = ("symbol", "price", "time", "source", "created_at")
+
+
+def asyncpg_dsn(connection_string: str) -> str:
+    """
+    asyncpg takes a plain postgresql:// DSN, SQLAlchemy style driver suffixes are dropped
+    """
+    scheme, separator, rest = connection_string.partition("://")
+    return f"{scheme.split('+', 1)[0]}{separator}{rest}"
+
+
+def build_upsert_latest_query(table_name: str) -> str:
+    """
+    A tick only replaces the stored row when it is at least as recent, so replays and
+    out of order batches never move a price backwards
+    """
+    return f"""
+        INSERT INTO {table_name} (symbol, price, time, source, created_at)
+        SELECT DISTINCT ON (symbol) symbol, price, time, source, created_at
+        FROM unnest($1::text[], $2::float8[], $3::timestamp[], $4::text[], $5::timestamp[])
+            AS batch(symbol, price, time, source, created_at)
+        ORDER BY symbol, time DESC
+        ON CONFLICT (symbol) DO UPDATE SET
+            price = EXCLUDED.price,
+            time = EXCLUDED.time,
+            source = EXCLUDED.source,
+            created_at = EXCLUDED.created_at
+        WHERE {table_name}.time <= EXCLUDED.time
+    """
+
+
+def to_columns(
+    records: list[TransformedData],
+) -> tuple[list[str], list[float], list[datetime], list[str], list[datetime]]:
+    symbols: list[str] = []
+    prices: list[float] = []
+    times: list[datetime] = []
+    sources: list[str] = []
+    created_ats: list[datetime] = []
+    for record in records:
+        symbols.append(record.symbol)
+        prices.append(record.price)
+        times.append(record.time)
+        sources.append(record.source)
+        created_ats.append(record.created_at)
+    return symbols, prices, times, sources, created_ats
+
+
+class PostgresLoader:
+    """
+    Owns an asyncpg pool and upserts the latest price per symbol into one of the result tables.
+    With a partition manager, every tick is also appended to the price history table.
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        table: Table,
+        min_pool_size: int = 1,
+        max_pool_size: int = 4,
+        command_timeout_s: float = 30.0,
+        history: Optional[PricePartitionManager] = None,
+    ) -> None:
+        self._dsn: str = asyncpg_dsn(connection_string)
+        self._table_name: str = table.name
+        self._upsert_latest_query: str = build_upsert_latest_query(table.name)
+        self._min_pool_size: int = min_pool_size
+        self._max_pool_size: int = max_pool_size
+        self._command_timeout_s: float = command_timeout_s
+        self._history: Optional[PricePartitionManager] = history
+        self._pool: Optional[asyncpg.Pool] = None
+
+    async def start(self) -> None:
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            dsn=self._dsn,
+            min_size=self._min_pool_size,
+            max_size=self._max_pool_size,
+            command_timeout=self._command_timeout_s,
+        )
+
+    async def upsert_latest(self, records: list[TransformedData]) -> int:
+        """
+        Writes a whole batch in a single statement, returns the number of rows sent
+        """
+        if not records:
+            return 0
+        assert self._pool is not None, "PostgresLoader.start() was not awaited"
+        columns: tuple[Any, ...] = to_columns(records)
+        async with self._pool.acquire() as connection:
+            await connection.execute(self._upsert_latest_query, *columns)
+        return len(records)
+
+    async def write_batch(self, records: list[TransformedData]) -> int:
+        """
+        Appends the batch to the history table and upserts the latest prices in one transaction,
+        so a batch is either fully written or can be replayed as a whole
+        """
+        if self._history is None:
+            return await self.upsert_latest(records)
+        if not records:
+            return 0
+        assert self._pool is not None, "PostgresLoader.start() was not awaited"
+        cutoff: date = self._history.retention_cutoff()
+        # Ticks older than retention would land in a dropped partition
+        history_rows: list[tuple[Any, ...]] = [
+            (
+                record.symbol,
+                record.price,
+                record.time,
+                record.source,
+                record.created_at,
+            )
+            for record in records
+            if record.time.date() >= cutoff
+        ]
+        columns: tuple[Any, ...] = to_columns(records)
+        async with self._pool.acquire() as connection:
+            days: set[date] = {row[2].date() for row in history_rows}
+            if self._history.missing_days(days):
+                await self._history.ensure_partitions(connection, days)
+            async with connection.transaction():
+                if history_rows:
+                    await connection.copy_records_to_table(
+                        self._history.table_name,
+                        records=history_rows,
+                        columns=HISTORY_COLUMNS,
+                    )
+                await connection.execute(self._upsert_latest_query, *columns)
+        return len(records)
+
+    async def maintain_partitions(self) -> None:
+        if self._history is None:
+            return
+        assert self._pool is not None, "PostgresLoader.start() was not awaited"
+        async with self._pool.acquire() as connection:
+            await self._history.maintain(connection)
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -0,0 +1,189 @@
+"""
+Archive formats for raw batches uploaded to S3.
+
+- json: legacy single JSON array per object, still readable for older keys
+- ndjson.gz / ndjson.zst: one JSON record per line, gzip or zstd compressed
+- parquet: columnar, zstd compressed, for cheaper downstream scans
+
+zstandard and pyarrow are optional, the formats depending on them raise when selected without them.
+"""
+
+import gzip
+import io
+import json
+import mmap
+from abc import ABC, abstractmethod
+from typing import IO, Any, Iterator, Optional, Type, Union
+
+from src.common.decoders import json_loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# Object bodies come either straight from S3 or memory-mapped from the local cache
+ObjectBody = Union[bytes, mmap.mmap]
+
+
+def as_stream(body: ObjectBody) -> IO[bytes]:
+    """
+    File-like view over a body, mmaps are read in place rather than copied into a BytesIO
+    """
+    if isinstance(body, mmap.mmap):
+        body.seek(0)
+        return body  # type: ignore[return-value]
+    return io.BytesIO(body)
+
+
+class ArchiveWriter(ABC):
+    extension: str
+    content_type: str
+
+    @abstractmethod
+    def encode(self, records: list[dict[str, Any]]) -> bytes:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def decode(self, body: bytes) -> list[dict[str, Any]]:
+        raise NotImplementedError()
+
+    def iter_records(self, body: ObjectBody) -> Iterator[dict[str, Any]]:
+        """
+        Yields records one at a time, formats that can stream override this to avoid decoding
+        the whole object up front
+        """
+        yield from self.decode(bytes(body))
+
+
+class JsonArchiveWriter(ArchiveWriter):
+    extension = ".json"
+    content_type = "application/json"
+
+    def encode(self, records: list[dict[str, Any]]) -> bytes:
+        return json.dumps(records).encode("utf-8")
+
+    def decode(self, body: bytes) -> list[dict[str, Any]]:
+        records: list[dict[str, Any]] = json_loads(body)
+        return records
+
+
+class NdjsonArchiveWriter(ArchiveWriter, ABC):
+    content_type = "application/x-ndjson"
+
+    @staticmethod
+    def _to_ndjson(records: list[dict[str, Any]]) -> bytes:
+        return "\n".join(json.dumps(record) for record in records).encode("utf-8")
+
+    @staticmethod
+    def _from_ndjson(payload: bytes) -> list[dict[str, Any]]:
+        return [json_loads(line) for line in payload.splitlines() if line]
+
+    @staticmethod
+    def _iter_ndjson(stream: IO[bytes]) -> Iterator[dict[str, Any]]:
+        for line in stream:
+            if line.strip():
+                yield json_loads(line)
+
+
+class GzipNdjsonArchiveWriter(NdjsonArchiveWriter):
+    extension = ".ndjson.gz"
+
+    def __init__(self, compress_level: int = 6) -> None:
+        self._compress_level: int = compress_level
+
+    def encode(self, records: list[dict[str, Any]]) -> bytes:
+        return gzip.compress(
+            self._to_ndjson(records), compresslevel=self._compress_level
+        )
+
+    def decode(self, body: bytes) -> list[dict[str, Any]]:
+        return self._from_ndjson(gzip.decompress(body))
+
+    def iter_records(self, body: ObjectBody) -> Iterator[dict[str, Any]]:
+        # Decompresses line by line, the full decompressed object is never materialized
+        with gzip.GzipFile(fileobj=as_stream(body)) as stream:
+            yield from self._iter_ndjson(stream)
+
+
+class ZstdNdjsonArchiveWriter(NdjsonArchiveWriter):
+    extension = ".ndjson.zst"
+
+    def __init__(self, compress_level: int = 3) -> None:
+        if zstandard is None:
+            raise ImportError("zstandard is required for the ndjson.zst archive format")
+        self._compress_level: int = compress_level
+
+    def encode(self, records: list[dict[str, Any]]) -> bytes:
+        compressor = zstandard.ZstdCompressor(level=self._compress_level)
+        return compressor.compress(self._to_ndjson(records))
+
+    def decode(self, body: bytes) -> list[dict[str, Any]]:
+        # stream_reader copes with frames written without the content size header
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)) as reader:
+            return self._from_ndjson(reader.read())
+
+    def iter_records(self, body: ObjectBody) -> Iterator[dict[str, Any]]:
+        with zstandard.ZstdDecompressor().stream_reader(as_stream(body)) as reader:
+            yield from self._iter_ndjson(io.BufferedReader(reader))  # type: ignore[arg-type]
+
+
+class ParquetArchiveWriter(ArchiveWriter):
+    extension = ".parquet"
+    content_type = "application/vnd.apache.parquet"
+
+    def __init__(self, compression: str = "zstd") -> None:
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for the parquet archive format")
+        self._compression: str = compression
+
+    def encode(self, records: list[dict[str, Any]]) -> bytes:
+        # Nested records (Kucoin's data dict) become struct columns
+        table = pyarrow.Table.from_pylist(records)
+        buffer: io.BytesIO = io.BytesIO()
+        pyarrow.parquet.write_table(table, buffer, compression=self._compression)
+        return buffer.getvalue()
+
+    def decode(self, body: bytes) -> list[dict[str, Any]]:
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(body))
+        records: list[dict[str, Any]] = table.to_pylist()
+        return records
+
+    def iter_records(self, body: ObjectBody) -> Iterator[dict[str, Any]]:
+        # One row group at a time
+        parquet_file = pyarrow.parquet.ParquetFile(pyarrow.BufferReader(body))
+        for record_batch in parquet_file.iter_batches():
+            yield from record_batch.to_pylist()
+
+
+ARCHIVE_WRITERS: dict[str, Type[ArchiveWriter]] = {
+    "json": JsonArchiveWriter,
+    "ndjson.gz": GzipNdjsonArchiveWriter,
+    "ndjson.zst": ZstdNdjsonArchiveWriter,
+    "parquet": ParquetArchiveWriter,
+}
+
+
+def get_archive_writer(archive_format: str) -> ArchiveWriter:
+    writer_cls: Optional[Type[ArchiveWriter]] = ARCHIVE_WRITERS.get(archive_format)
+    if writer_cls is None:
+        raise ValueError(
+            f"Unknown archive format: {archive_format}, expected one of {list(ARCHIVE_WRITERS)}"
+        )
+    return writer_cls()
+
+
+def writer_for_key(key: str) -> ArchiveWriter:
+    """
+    Picks the writer able to decode an existing object from its key's extension
+    """
+    for archive_format, writer_cls in ARCHIVE_WRITERS.items():
+        if key.endswith(writer_cls.extension):
+            return get_archive_writer(archive_format)
+    raise ValueError(f"Unknown archive format for key: {key}")
@@ -1,19 +1,53 @@
-import json
+import itertools
 import logging
 import os
+import uuid
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Iterator
-import re
+from io import BytesIO
+from typing import Iterator, Optional, Union
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from dotenv import load_dotenv
 from mypy_boto3_s3 import ListObjectsV2Paginator
+from tenacity import retry, stop_after_attempt, wait_random_exponential
 
+from src.models.s3_manifest_entry import S3ManifestEntry
+from src.services.loaders.s3.archive_writer import (
+    ArchiveWriter,
+    ObjectBody,
+    get_archive_writer,
+    writer_for_key,
+)
+from src.utils.extract_event_datetime import epoch_ms, extract_event_datetime
 from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import record_freshness
+from src.utils.metrics import REGISTRY
+from src.services.loaders.s3.s3_manifest import S3Manifest
+from src.services.loaders.s3.s3_object_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    S3ObjectCache,
+)
+from src.utils.s3_key_builder import (
+    build_s3_key,
+    legacy_day_prefixes,
+    parse_s3_key_time,
+    partition_prefixes,
+)
 
 logger: logging.Logger = logging.Logger(__name__)
 logger_setup(logger)
 
+# Downloaded body, or the path of the object in the local cache
+Fetched = Union[bytes, str]
+
+S3_UPLOADED_BYTES = REGISTRY.counter(
+    "s3_uploaded_bytes_total", "Encoded object bytes written to S3", ("source",)
+)
+
 
 class S3Explorer:
     """
@@ -21,80 +55,319 @@ class S3Explorer:
     kucoin and binance.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        multipart_threshold_bytes: int = 8 * 1024 * 1024,
+        multipart_chunk_bytes: int = 8 * 1024 * 1024,
+        multipart_concurrency: int = 4,
+        archive_format: Optional[str] = None,
+        manifest: Optional[S3Manifest] = None,
+        list_legacy_keys: bool = True,
+        cache: Optional[S3ObjectCache] = None,
+    ):
         self.bucket = os.getenv("MINIO_BUCKET", "cryptopricesrt")
+        # boto3 clients are thread safe, a single client is shared by every upload worker
         self.client = boto3.client(
             "s3",
             endpoint_url=os.getenv("MINIO_ENDPOINT_URL"),
             aws_access_key_id=os.getenv("MINIO_ACCESS_KEY"),
             aws_secret_access_key=os.getenv("MINIO_SECRET_KEY"),
         )
+        self._multipart_threshold_bytes: int = multipart_threshold_bytes
+        # Objects above the threshold go through the transfer manager, which uploads parts in parallel
+        self._transfer_config: TransferConfig = TransferConfig(
+            multipart_threshold=multipart_threshold_bytes,
+            multipart_chunksize=multipart_chunk_bytes,
+            max_concurrency=multipart_concurrency,
+        )
+        self._archive_writer: ArchiveWriter = get_archive_writer(
+            archive_format or os.getenv("S3_ARCHIVE_FORMAT", "ndjson.gz")
+        )
+        # Keys are {source}/{date}/{hour}/{timestamp}_{writer_id}_{sequence}, unique across processes
+        self._writer_id: str = uuid.uuid4().hex[:8]
+        self._sequence: Iterator[int] = itertools.count()
+        # Optional local index of uploaded objects, range lookups skip LIST calls when set
+        manifest_path: Optional[str] = os.getenv("S3_MANIFEST_PATH")
+        self._manifest: Optional[S3Manifest] = manifest or (
+            S3Manifest(manifest_path) if manifest_path else None
+        )
+        # Optional read-through disk cache for downloads, archived objects never change once written
+        cache_dir: Optional[str] = os.getenv("S3_CACHE_DIR")
+        cache_max_bytes: int = int(
+            os.getenv("S3_CACHE_MAX_BYTES", str(DEFAULT_CACHE_MAX_BYTES))
+        )
+        self._cache: Optional[S3ObjectCache] = cache or (
+            S3ObjectCache(cache_dir, cache_max_bytes) if cache_dir else None
+        )
+        # Also look for flat {source}/%Y-%m-%dT%H-%M-%S.json keys written before partitioning
+        self._list_legacy_keys: bool = list_legacy_keys
 
     def upload_batch(
         self,
         source: str,
         records: list[dict],
         timestamp: datetime,
-    ) -> None:
+    ) -> str:
         """
-        Uploads a batch of raw results to s3 given the source folder
+        Uploads a batch of raw results to s3 given the source folder, returns the key written
 
         - source (str) "binance" or "kucoin"
         - records (list[dict]): Raw data
-        - timestamp (datetime): UTC ingestion timestamp used as filename
+        - timestamp (datetime): UTC ingestion timestamp used in the key
+        The object carries its row count and min / max event time as user metadata.
         """
-        folder: str = f"{source}/"
-        filename: str = timestamp.strftime("%Y-%m-%dT%H-%M-%S.json")
-        key: str = folder + filename
+        key: str = build_s3_key(
+            source=source,
+            timestamp=timestamp,
+            writer_id=self._writer_id,
+            sequence=next(self._sequence),
+            extension=self._archive_writer.extension,
+        )
+        body: bytes = self._archive_writer.encode(records)
+        metadata: dict[str, str] = self.batch_metadata(source, records)
+        etag: Optional[str] = self._put_object(key, body, metadata)
+        S3_UPLOADED_BYTES.labels(source).inc(len(body))
+        if "min-event-time" in metadata:
+            record_freshness(source, "s3", epoch_ms(metadata["min-event-time"]))
+        if self._manifest is not None:
+            self._manifest.record(
+                S3ManifestEntry(
+                    key=key,
+                    source=source,
+                    key_time=timestamp,
+                    size_bytes=len(body),
+                    etag=etag,
+                    row_count=len(records),
+                    min_event_time=metadata.get("min-event-time"),
+                    max_event_time=metadata.get("max-event-time"),
+                )
+            )
+        return key
 
-        self.client.put_object(
-            Bucket=self.bucket,
-            Key=key,
-            Body=json.dumps(records).encode("utf-8"),
-            ContentType="application/json",
+    @staticmethod
+    def batch_metadata(source: str, records: list[dict]) -> dict[str, str]:
+        metadata: dict[str, str] = {"row-count": str(len(records))}
+        if source not in ("kucoin", "binance") or not records:
+            return metadata
+        event_times: list[datetime] = [
+            extract_event_datetime(source, record) for record in records  # type: ignore[arg-type]
+        ]
+        metadata["min-event-time"] = min(event_times).isoformat()
+        metadata["max-event-time"] = max(event_times).isoformat()
+        return metadata
+
+    @retry(
+        # Exponential backoff with full jitter so parallel workers do not retry in lockstep
+        wait=wait_random_exponential(multiplier=0.1, max=5),
+        stop=stop_after_attempt(5),
+        reraise=True,
+    )
+    def _put_object(
+        self, key: str, body: bytes, metadata: dict[str, str]
+    ) -> Optional[str]:
+        """
+        Retried as a whole with the same key, so a retry can never leave a duplicate object behind.
+        Returns the ETag when S3 hands it back (single part uploads only).
+        """
+        content_type: str = self._archive_writer.content_type
+        if len(body) < self._multipart_threshold_bytes:
+            response = self.client.put_object(
+                Bucket=self.bucket,
+                Key=key,
+                Body=body,
+                ContentType=content_type,
+                Metadata=metadata,
+            )
+            etag: Optional[str] = response.get("ETag")
+            return etag
+        self.client.upload_fileobj(
+            BytesIO(body),
+            self.bucket,
+            key,
+            ExtraArgs={"ContentType": content_type, "Metadata": metadata},
+            Config=self._transfer_config,
         )
+        return None
 
     def download_batch(
-        self, source: str, start_time: datetime, end_time: datetime = datetime.utcnow()
+        self,
+        source: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
     ) -> list[dict]:
         """
-        Downloads and returns a list[dict] given source and a range of time
+        Downloads and returns a list[dict] given source and a range of time.
+        Holds the whole range in memory, prefer iter_batches for anything large.
         """
         all_records: list[dict] = []
-        for key in self.list_files_with_range(source, start_time, end_time):
-            # get_object reads file in memory
-            response = self.client.get_object(Bucket=self.bucket, Key=key)
-            content = response["Body"].read()
-            records = json.loads(content)
-            all_records.extend(records)
+        for batch in self.iter_batches(source, start_time, end_time):
+            all_records.extend(batch)
         return all_records
 
+    def iter_batches(
+        self,
+        source: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        batch_size: int = 10_000,
+        max_concurrency: int = 8,
+        prefetch: int = 16,
+        ordered: bool = True,
+    ) -> Iterator[list[dict]]:
+        """
+        Streams records for a source and time range as batches of at most batch_size records.
+
+        - Objects are fetched concurrently by max_concurrency threads
+        - At most prefetch fetched (still compressed) objects are held at a time, so memory is bounded
+          by the window rather than the time range
+        - Objects are decompressed and decoded incrementally as batches are pulled
+        - ordered=True yields objects in key (time) order, ordered=False yields whichever lands first
+        """
+        entries: Iterator[S3ManifestEntry] = self.list_objects_with_range(
+            source, start_time, end_time
+        )
+        executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="s3-download"
+        )
+        window: deque[tuple[str, Future[Fetched]]] = deque()
+        try:
+            for entry in itertools.islice(entries, prefetch):
+                window.append((entry.key, executor.submit(self._fetch_entry, entry)))
+            while window:
+                key, fetched = self._next_fetched(window, ordered)
+                next_entry: Optional[S3ManifestEntry] = next(entries, None)
+                if next_entry is not None:
+                    window.append(
+                        (next_entry.key, executor.submit(self._fetch_entry, next_entry))
+                    )
+                batch: list[dict] = []
+                with self._open_fetched(key, fetched) as body:
+                    for record in writer_for_key(key).iter_records(body):
+                        batch.append(record)
+                        if len(batch) >= batch_size:
+                            yield batch
+                            batch = []
+                if batch:
+                    yield batch
+        finally:
+            # Consumer stopped early or failed, drop whatever is still queued
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _next_fetched(
+        window: deque[tuple[str, Future[Fetched]]], ordered: bool
+    ) -> tuple[str, Fetched]:
+        if not ordered:
+            wait([future for _, future in window], return_when=FIRST_COMPLETED)
+            for index, (key, future) in enumerate(window):
+                if future.done():
+                    del window[index]
+                    return key, future.result()
+        key, future = window.popleft()
+        return key, future.result()
+
+    def _fetch_object(self, key: str) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=key)
+        body: bytes = response["Body"].read()
+        return body
+
+    def _fetch_entry(self, entry: S3ManifestEntry) -> Fetched:
+        """
+        Object body, or its path in the local cache when one is configured
+        """
+        if self._cache is None:
+            return self._fetch_object(entry.key)
+        etag: Optional[str] = entry.etag
+        if etag is None:
+            etag = self.client.head_object(Bucket=self.bucket, Key=entry.key)["ETag"]
+        return self._cache.fetch(entry.key, etag, lambda: self._fetch_object(entry.key))
+
+    @contextmanager
+    def _open_fetched(self, key: str, fetched: Fetched) -> Iterator[ObjectBody]:
+        if isinstance(fetched, bytes) or self._cache is None:
+            yield fetched  # type: ignore[misc]
+            return
+        with ExitStack() as stack:
+            body: ObjectBody
+            try:
+                body = stack.enter_context(self._cache.open(fetched))
+            except FileNotFoundError:
+                # Evicted by another process between fetch and open
+                body = self._fetch_object(key)
+            yield body
+
+    def cache_stats(self) -> dict[str, int]:
+        return self._cache.stats() if self._cache is not None else {}
+
     def list_files_with_range(
-        self, source: str, start_time: datetime, end_time: datetime = datetime.utcnow()
+        self, source: str, start_time: datetime, end_time: Optional[datetime] = None
     ) -> Iterator[str]:
         """
-        List all files under a given prefix and time range and return a generator of file paths
+        List all files under a given prefix and time range and return a generator of file paths.
+        end_time defaults to now, evaluated per call rather than once at import time.
+        """
+        for obj in self.list_objects_with_range(source, start_time, end_time):
+            yield obj.key
+
+    def list_objects_with_range(
+        self, source: str, start_time: datetime, end_time: Optional[datetime] = None
+    ) -> Iterator[S3ManifestEntry]:
         """
-        prefix: str = f"{source}/"
-        regex: re.Pattern = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2})\.json$")
+        Same as list_files_with_range with size and ETag. Answered from the manifest when one is
+        configured, otherwise only the date / hour prefixes overlapping the range are listed.
+        """
+        if end_time is None:
+            end_time = datetime.utcnow()
+        if self._manifest is not None:
+            yield from self._manifest.entries_in_range(source, start_time, end_time)
+        else:
+            yield from self._list_bucket_with_range(source, start_time, end_time)
+
+    def _list_bucket_with_range(
+        self, source: str, start_time: datetime, end_time: datetime
+    ) -> Iterator[S3ManifestEntry]:
+        prefixes: list[str] = partition_prefixes(source, start_time, end_time)
+        if self._list_legacy_keys:
+            prefixes = legacy_day_prefixes(source, start_time, end_time) + prefixes
 
         # S3 limits the number of results per API call (usually 1000 objects per request).
         # If you have more than 1000 files in a folder/prefix, a single list_objects_v2 call will not return everything.
         # The paginator transparently makes multiple requests behind the scenes, so you can process all files matching
         # your filter.
         paginator: ListObjectsV2Paginator = self.client.get_paginator("list_objects_v2")
-        # paginate creates an iterator that paginate the response
-        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
-            # iterate through objects of each page
-            for obj in page.get("Contents", []):
-                match = regex.search(obj["Key"])
-                if not match:
-                    continue
-                file_time: datetime = datetime.strptime(
-                    match.group(1), "%Y-%m-%dT%H-%M-%S"
-                )
-                if start_time <= file_time <= end_time:
-                    yield obj["Key"]
+        for prefix in prefixes:
+            # paginate creates an iterator that paginate the response
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+                # iterate through objects of each page
+                for obj in page.get("Contents", []):
+                    file_time: Optional[datetime] = parse_s3_key_time(obj["Key"])
+                    if file_time is None:
+                        continue
+                    if start_time <= file_time <= end_time:
+                        yield S3ManifestEntry(
+                            key=obj["Key"],
+                            source=source,
+                            key_time=file_time,
+                            size_bytes=obj["Size"],
+                            etag=obj.get("ETag"),
+                        )
+
+    def sync_manifest(
+        self, source: str, start_time: datetime, end_time: Optional[datetime] = None
+    ) -> int:
+        """
+        Backfills the manifest from the bucket for objects this process did not upload itself.
+        Returns the number of objects recorded.
+        """
+        if self._manifest is None:
+            raise ValueError("No manifest configured")
+        recorded: int = 0
+        for entry in self._list_bucket_with_range(
+            source, start_time, end_time or datetime.utcnow()
+        ):
+            self._manifest.record(entry)
+            recorded += 1
+        return recorded
 
 
 if __name__ == "__main__":
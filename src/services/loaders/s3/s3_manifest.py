@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Optional
+
+from src.models.s3_manifest_entry import S3ManifestEntry
+
+
+class S3Manifest:
+    """
+    Locally persisted index of archived objects, kept in SQLite next to the process.
+
+    The uploader records every object it writes, so a time range lookup is an indexed query instead of
+    LIST calls against the bucket. WAL mode lets readers in other processes query while it is written.
+    """
+
+    _SCHEMA: str = """
+        CREATE TABLE IF NOT EXISTS s3_objects (
+            key TEXT PRIMARY KEY,
+            source TEXT NOT NULL,
+            key_time TEXT NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            etag TEXT,
+            row_count INTEGER,
+            min_event_time TEXT,
+            max_event_time TEXT
+        );
+        CREATE INDEX IF NOT EXISTS s3_objects_source_key_time
+            ON s3_objects (source, key_time);
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path: str = path
+        # Upload workers record from several threads, sqlite3 connections are not thread safe on their own
+        self._lock: threading.Lock = threading.Lock()
+        self._connection: sqlite3.Connection = sqlite3.connect(
+            path, check_same_thread=False
+        )
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(self._SCHEMA)
+
+    @staticmethod
+    def _to_text(value: Optional[datetime]) -> Optional[str]:
+        # ISO strings of naive UTC datetimes sort the same way as the datetimes themselves
+        return value.isoformat() if value is not None else None
+
+    def record(self, entry: S3ManifestEntry) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                """
+                INSERT OR REPLACE INTO s3_objects
+                    (key, source, key_time, size_bytes, etag, row_count, min_event_time, max_event_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    entry.key,
+                    entry.source,
+                    self._to_text(entry.key_time),
+                    entry.size_bytes,
+                    entry.etag,
+                    entry.row_count,
+                    self._to_text(entry.min_event_time),
+                    self._to_text(entry.max_event_time),
+                ),
+            )
+
+    def entries_in_range(
+        self, source: str, start_time: datetime, end_time: datetime
+    ) -> list[S3ManifestEntry]:
+        """
+        Objects whose key time falls in [start_time, end_time], in key time order
+        """
+        with self._lock:
+            rows: list[tuple] = self._connection.execute(
+                """
+                SELECT key, source, key_time, size_bytes, etag, row_count, min_event_time, max_event_time
+                FROM s3_objects
+                WHERE source = ? AND key_time >= ? AND key_time <= ?
+                ORDER BY key_time, key
+                """,
+                (source, self._to_text(start_time), self._to_text(end_time)),
+            ).fetchall()
+        return [
+            S3ManifestEntry(
+                key=key,
+                source=row_source,
+                key_time=key_time,
+                size_bytes=size_bytes,
+                etag=etag,
+                row_count=row_count,
+                min_event_time=min_event_time,
+                max_event_time=max_event_time,
+            )
+            for (
+                key,
+                row_source,
+                key_time,
+                size_bytes,
+                etag,
+                row_count,
+                min_event_time,
+                max_event_time,
+            ) in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
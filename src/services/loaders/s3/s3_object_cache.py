@@ -0,0 +1,128 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Union
+
+CachedBody = Union[bytes, mmap.mmap]
+
+DEFAULT_CACHE_MAX_BYTES: int = 10 * 1024**3
+
+
+class S3ObjectCache:
+    """
+    Read-through on-disk cache for archived S3 objects, which are immutable once written.
+
+    1. Content addressed by key + ETag, an object rewritten under the same key never serves stale bytes
+    2. Writes go to a temp file in the cache directory then os.replace, so concurrent processes sharing
+       the directory only ever see complete files
+    3. Size bounded LRU, every hit bumps the file's mtime and eviction drops the oldest mtimes first
+    4. Cached files are read through mmap, decoders stream from the page cache without copying
+    """
+
+    _TMP_SUFFIX: str = ".tmp"
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self._directory: str = directory
+        self._max_bytes: int = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        # Running estimate of the directory size, rescanned whenever eviction runs
+        self._current_bytes: int = sum(size for _, _, size in self._scan())
+
+    def _path(self, key: str, etag: str) -> str:
+        digest: str = hashlib.sha256(f"{key}\0{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self._directory, digest)
+
+    def fetch(self, key: str, etag: str, loader: Callable[[], bytes]) -> str:
+        """
+        Returns the path of the cached object, calling loader to download it on a miss
+        """
+        path: str = self._path(key, etag)
+        try:
+            # Bumping mtime on every hit is what makes eviction least recently used
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return path
+        except FileNotFoundError:
+            pass
+
+        body: bytes = loader()
+        self._write_atomic(path, body)
+        with self._lock:
+            self.misses += 1
+            self._current_bytes += len(body)
+            over_budget: bool = self._current_bytes > self._max_bytes
+        if over_budget:
+            self._evict(keep=path)
+        return path
+
+    @contextmanager
+    def open(self, path: str) -> Iterator[CachedBody]:
+        """
+        Memory maps a cached file for reading, empty files cannot be mapped and yield b""
+        """
+        with open(path, "rb") as cached_file:
+            if os.fstat(cached_file.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(cached_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def _write_atomic(self, path: str, body: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=self._TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(body)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _scan(self) -> list[tuple[str, float, int]]:
+        entries: list[tuple[str, float, int]] = []
+        with os.scandir(self._directory) as directory:
+            for entry in directory:
+                if entry.name.endswith(self._TMP_SUFFIX):
+                    continue
+                try:
+                    stat: os.stat_result = entry.stat()
+                except FileNotFoundError:
+                    # Evicted by another process mid scan
+                    continue
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self, keep: str) -> None:
+        entries: list[tuple[str, float, int]] = sorted(
+            self._scan(), key=lambda entry: entry[1]
+        )
+        total: int = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self._max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._current_bytes = total
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._current_bytes,
+            }
@@ -0,0 +1,229 @@
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from queue import Empty, Queue
+from threading import BoundedSemaphore, Event, Thread
+from typing import Optional
+
+from src.services.loaders.s3.s3_explorer import S3Explorer
+from src.utils.generic_logger import logger_setup
+from src.utils.metrics import REGISTRY, Gauge
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+S3_QUEUE_DEPTH = REGISTRY.gauge(
+    "s3_queue_depth", "Submissions waiting for the source dispatcher", ("source",)
+)
+S3_PENDING_UPLOADS = REGISTRY.gauge(
+    "s3_pending_uploads", "Batches handed to the pool and not uploaded yet"
+)
+S3_UPLOADS = REGISTRY.counter("s3_uploads_total", "Batches uploaded", ("source",))
+S3_UPLOADED_RECORDS = REGISTRY.counter(
+    "s3_uploaded_records_total", "Records across the uploaded batches", ("source",)
+)
+S3_UPLOAD_ERRORS = REGISTRY.counter(
+    "s3_upload_errors_total", "Batches that failed to upload after retries", ("source",)
+)
+S3_UPLOAD_LATENCY = REGISTRY.histogram(
+    "s3_upload_seconds",
+    "Encoding and uploading one batch, retries included",
+    ("source",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+# (records, UTC ingestion timestamp) as put on a per source queue
+S3QueueItem = tuple[list[dict], datetime]
+
+
+class S3SourceDispatcher(Thread):
+    """
+    Drains one source's queue into batches and hands full batches to the pool.
+    Batching stays per source, uploads do not: while one batch is uploading the next keeps filling.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        queue: "Queue[S3QueueItem]",
+        pool: "S3UploaderPool",
+        batch_size: int,
+        batch_timeout_s: float,
+        queue_depth: Gauge,
+    ) -> None:
+        super().__init__(name=f"s3-dispatcher-{source}")
+        self._source: str = source
+        self._queue: "Queue[S3QueueItem]" = queue
+        self._queue_depth: Gauge = queue_depth
+        self._pool: S3UploaderPool = pool
+        self._batch_size: int = batch_size
+        self._batch_timeout_s: float = batch_timeout_s
+        self._shutdown_event: Event = Event()
+        # Records are accumulated as plain dicts, no per record model is built on this hot path
+        self._pending: list[dict] = []
+        self._pending_timestamp: Optional[datetime] = None
+        self._pending_since: float = -1
+
+    def _batch_ready(self) -> bool:
+        return len(self._pending) >= self._batch_size or (
+            self._pending_since > 0
+            and time.perf_counter() - self._pending_since >= self._batch_timeout_s
+        )
+
+    def _hand_off(self) -> None:
+        if not self._pending or self._pending_timestamp is None:
+            return
+        batch, timestamp = self._pending, self._pending_timestamp
+        self._pending, self._pending_timestamp, self._pending_since = [], None, -1
+        self._pool.submit_upload(self._source, batch, timestamp)
+
+    def run(self) -> None:
+        while not self._shutdown_event.is_set():
+            try:
+                records, timestamp = self._queue.get(timeout=1)
+                self._queue_depth.set(self._queue.qsize())
+                if not self._pending:
+                    self._pending_timestamp = timestamp
+                    self._pending_since = time.perf_counter()
+                self._pending.extend(records)
+            except Empty:
+                pass
+            except Exception as e:
+                print(f"[S3Dispatcher:{self._source}] Error during get: {e}")
+            if self._batch_ready():
+                self._hand_off()
+
+        # Final flush, drain anything still queued after the shutdown event
+        while True:
+            try:
+                records, timestamp = self._queue.get_nowait()
+            except Empty:
+                break
+            if not self._pending:
+                self._pending_timestamp = timestamp
+            self._pending.extend(records)
+        self._queue_depth.set(0)
+        self._hand_off()
+
+    def stop(self) -> None:
+        self._shutdown_event.set()
+
+
+class S3UploaderPool:
+    """
+    Uploads raw batches to S3 in the background:
+    1. One queue and dispatcher thread per source, so a busy Binance feed never delays Kucoin batches
+    2. Up to max_workers uploads run in parallel on a thread pool sharing one boto3 client
+    3. At most max_pending_uploads batches are held in memory, dispatchers block beyond that
+    4. Large objects go multipart and failed uploads retry with jitter, see S3Explorer.upload_batch
+    """
+
+    def __init__(
+        self,
+        uploader: S3Explorer,
+        batch_size: int,
+        batch_timeout_s: float,
+        sources: tuple[str, ...] = ("kucoin", "binance"),
+        max_workers: int = 4,
+        max_pending_uploads: Optional[int] = None,
+    ) -> None:
+        self._uploader: S3Explorer = uploader
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="s3-upload"
+        )
+        self._upload_slots: BoundedSemaphore = BoundedSemaphore(
+            max_pending_uploads or max_workers * 2
+        )
+        self._queues: dict[str, "Queue[S3QueueItem]"] = {
+            source: Queue() for source in sources
+        }
+        # One pool per source and process, released by join()
+        self._queue_depths: dict[str, Gauge] = {}
+        try:
+            for source in sources:
+                self._queue_depths[source] = S3_QUEUE_DEPTH.claim(source)
+        except ValueError:
+            self._release_gauges()
+            raise
+        self._dispatchers: dict[str, S3SourceDispatcher] = {
+            source: S3SourceDispatcher(
+                source=source,
+                queue=queue,
+                pool=self,
+                batch_size=batch_size,
+                batch_timeout_s=batch_timeout_s,
+                queue_depth=self._queue_depths[source],
+            )
+            for source, queue in self._queues.items()
+        }
+        self._pending_uploads: Gauge = S3_PENDING_UPLOADS.labels()
+
+    def queue(self, source: str) -> "Queue[S3QueueItem]":
+        """
+        Per source queue, exposed so producers and monitoring can use it directly
+        """
+        return self._queues[source]
+
+    def submit(self, source: str, records: list[dict], timestamp: datetime) -> None:
+        queue: "Queue[S3QueueItem]" = self._queues[source]
+        queue.put((records, timestamp))
+        self._queue_depths[source].set(queue.qsize())
+
+    def submit_upload(
+        self, source: str, records: list[dict], timestamp: datetime
+    ) -> None:
+        """
+        Schedules one upload on the pool, blocks the calling dispatcher while the pool is saturated
+        """
+        self._upload_slots.acquire()
+        try:
+            future: Future[None] = self._executor.submit(
+                self._upload, source, records, timestamp
+            )
+        except Exception:
+            self._upload_slots.release()
+            raise
+        self._pending_uploads.inc()
+        future.add_done_callback(
+            lambda done: self._on_upload_done(done, source, len(records))
+        )
+
+    def _upload(self, source: str, records: list[dict], timestamp: datetime) -> None:
+        started: float = time.perf_counter()
+        self._uploader.upload_batch(source=source, records=records, timestamp=timestamp)
+        S3_UPLOAD_LATENCY.labels(source).observe(time.perf_counter() - started)
+
+    def _on_upload_done(self, future: "Future[None]", source: str, count: int) -> None:
+        self._pending_uploads.dec()
+        self._upload_slots.release()
+        error: Optional[BaseException] = future.exception()
+        if error is not None:
+            S3_UPLOAD_ERRORS.labels(source).inc()
+            print(f"[S3UploaderPool] Error during {source} upload: {error}")
+        else:
+            S3_UPLOADS.labels(source).inc()
+            S3_UPLOADED_RECORDS.labels(source).inc(count)
+            print(f"{source} upload to S3 Successful ({count} records)")
+
+    def start(self) -> None:
+        for dispatcher in self._dispatchers.values():
+            dispatcher.start()
+
+    def stop(self) -> None:
+        for dispatcher in self._dispatchers.values():
+            dispatcher.stop()
+
+    def join(self) -> None:
+        """
+        Waits for the dispatchers' final flush and for every in-flight upload to finish
+        """
+        for dispatcher in self._dispatchers.values():
+            dispatcher.join()
+        self._executor.shutdown(wait=True)
+        self._release_gauges()
+
+    def _release_gauges(self) -> None:
+        for source in self._queue_depths:
+            S3_QUEUE_DEPTH.release(source)
+        self._queue_depths = {}
@@ -0,0 +1,113 @@
+"""
+Process-local store of the latest tick per symbol, per source and merged across sources.
+
+Updates and reads both run on the event loop thread, so no locks are needed:
+1. an update is two dict assignments, O(1) per tick
+2. single symbol reads are dict lookups
+3. full market snapshots are encoded once per version and served from cache until the next update,
+   or for up to snapshot_max_age_s when the feed updates faster than clients poll
+"""
+
+import time
+from typing import Any, Iterable, NamedTuple, Optional
+
+from src.common.decoders import json_dumps
+from src.utils.extract_event_datetime import epoch_ms
+
+MERGED: str = "merged"
+
+
+class PriceTick(NamedTuple):
+    symbol: str
+    price: float
+    time_ms: int  # Exchange event time, epoch ms
+    source: str
+
+    def as_dict(self) -> dict[str, Any]:
+        # A dict literal is ~2x faster than NamedTuple._asdict on the snapshot path
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "time_ms": self.time_ms,
+            "source": self.source,
+        }
+
+
+class LatestPriceStore:
+    def __init__(self, snapshot_max_age_s: float = 0.0) -> None:
+        self._views: dict[str, dict[str, PriceTick]] = {MERGED: {}}
+        # Bumped on every update, snapshots encoded at an older version are stale
+        self._version: int = 0
+        self._snapshot_max_age_s: float = snapshot_max_age_s
+        # source -> (version, encoded at, payload)
+        self._encoded: dict[str, tuple[int, float, bytes]] = {}
+
+    @property
+    def sources(self) -> list[str]:
+        return [view for view in self._views if view != MERGED]
+
+    def __len__(self) -> int:
+        return len(self._views[MERGED])
+
+    def size(self, source: str = MERGED) -> int:
+        return len(self._views.get(source, {}))
+
+    def update(self, symbol: str, price: float, time_ms: int, source: str) -> None:
+        tick: PriceTick = PriceTick(symbol, price, time_ms, source)
+        view: Optional[dict[str, PriceTick]] = self._views.get(source)
+        if view is None:
+            view = self._views[source] = {}
+        view[symbol] = tick
+        merged: dict[str, PriceTick] = self._views[MERGED]
+        current: Optional[PriceTick] = merged.get(symbol)
+        # Merged view keeps the most recent tick across exchanges
+        if current is None or current.time_ms <= time_ms:
+            merged[symbol] = tick
+        self._version += 1
+
+    def update_many(self, records: Iterable[dict[str, Any]]) -> int:
+        """
+        Applies transformed records as dicts (symbol, price, time, source), returns how many were applied
+        """
+        applied: int = 0
+        for record in records:
+            self.update(
+                record["symbol"],
+                record["price"],
+                epoch_ms(record["time"]),
+                record["source"],
+            )
+            applied += 1
+        return applied
+
+    def get(self, symbol: str, source: str = MERGED) -> Optional[PriceTick]:
+        view: Optional[dict[str, PriceTick]] = self._views.get(source)
+        if view is None:
+            return None
+        return view.get(symbol)
+
+    def get_many(self, symbols: Iterable[str], source: str = MERGED) -> list[PriceTick]:
+        """
+        Unknown symbols are left out rather than returned as None
+        """
+        view: dict[str, PriceTick] = self._views.get(source, {})
+        return [view[symbol] for symbol in symbols if symbol in view]
+
+    def snapshot(self, source: str = MERGED) -> dict[str, PriceTick]:
+        return dict(self._views.get(source, {}))
+
+    def snapshot_json(self, source: str = MERGED) -> bytes:
+        """
+        Full market view encoded as a JSON array, re-encoded at most once per update
+        """
+        now: float = time.monotonic()
+        cached: Optional[tuple[int, float, bytes]] = self._encoded.get(source)
+        if cached is not None and (
+            cached[0] == self._version or now - cached[1] < self._snapshot_max_age_s
+        ):
+            return cached[2]
+        encoded: bytes = json_dumps(
+            [tick.as_dict() for tick in self._views.get(source, {}).values()]
+        )
+        self._encoded[source] = (self._version, now, encoded)
+        return encoded
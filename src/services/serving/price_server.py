@@ -0,0 +1,70 @@
+"""
+HTTP query API over a LatestPriceStore:
+
+GET /prices                          full market snapshot
+GET /prices?symbols=BTCUSDT,ETHUSDT  several symbols, unknown ones are left out
+GET /prices/{symbol}                 single symbol, 404 when unknown
+GET /health                          symbol count per view
+
+Every route takes an optional ?source=kucoin|binance, the merged view across exchanges is the default.
+"""
+
+from typing import Optional
+
+from aiohttp import web
+
+from src.common.decoders import json_dumps
+from src.services.serving.latest_price_store import (
+    MERGED,
+    LatestPriceStore,
+    PriceTick,
+)
+
+STORE_KEY: web.AppKey[LatestPriceStore] = web.AppKey("store", LatestPriceStore)
+
+
+def _json_response(body: bytes, status: int = 200) -> web.Response:
+    return web.Response(body=body, status=status, content_type="application/json")
+
+
+def _source(request: web.Request) -> str:
+    return request.query.get("source", MERGED)
+
+
+async def get_prices(request: web.Request) -> web.Response:
+    store: LatestPriceStore = request.app[STORE_KEY]
+    symbols: Optional[str] = request.query.get("symbols")
+    if symbols is None:
+        return _json_response(store.snapshot_json(_source(request)))
+    ticks: list[PriceTick] = store.get_many(
+        (symbol.strip().upper() for symbol in symbols.split(",") if symbol),
+        _source(request),
+    )
+    return _json_response(json_dumps([tick.as_dict() for tick in ticks]))
+
+
+async def get_price(request: web.Request) -> web.Response:
+    store: LatestPriceStore = request.app[STORE_KEY]
+    symbol: str = request.match_info["symbol"].upper()
+    tick: Optional[PriceTick] = store.get(symbol, _source(request))
+    if tick is None:
+        return _json_response(
+            json_dumps({"error": f"Unknown symbol {symbol}"}), status=404
+        )
+    return _json_response(json_dumps(tick.as_dict()))
+
+
+async def get_health(request: web.Request) -> web.Response:
+    store: LatestPriceStore = request.app[STORE_KEY]
+    views: dict[str, int] = {source: store.size(source) for source in store.sources}
+    views[MERGED] = store.size()
+    return _json_response(json_dumps({"status": "ok", "symbols": views}))
+
+
+def build_app(store: LatestPriceStore) -> web.Application:
+    app: web.Application = web.Application()
+    app[STORE_KEY] = store
+    app.router.add_get("/prices", get_prices)
+    app.router.add_get("/prices/{symbol}", get_price)
+    app.router.add_get("/health", get_health)
+    return app
@@ -0,0 +1,99 @@
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pydantic import TypeAdapter
+
+from src.models.binance_model import BinanceTransformedData
+from src.models.kucoin_model import KucoinTransformedData
+
+QUOTE_SUFFIXES: tuple[str, ...] = ("USDT", "USDC")
+
+# Building the models through a list TypeAdapter runs in pydantic-core, ~3x faster than model_construct per row
+_KUCOIN_ADAPTER: TypeAdapter[list[KucoinTransformedData]] = TypeAdapter(
+    list[KucoinTransformedData]
+)
+_BINANCE_ADAPTER: TypeAdapter[list[BinanceTransformedData]] = TypeAdapter(
+    list[BinanceTransformedData]
+)
+
+
+class PandasTransformer:
+    """
+    In-process alternative to SparkTransformer with the same interface.
+    Batches are a few dozen records, so column operations on pandas / NumPy beat a JVM round trip:
+    symbol normalization, suffix filter, price cast and epoch to timestamp are each one vectorized op.
+    """
+
+    @staticmethod
+    def _epoch_ms_to_datetime(epoch_ms: pd.Series) -> list[datetime]:
+        # datetime64[ms] -> object gives naive UTC datetime.datetime values in one pass
+        return list(epoch_ms.to_numpy(dtype="datetime64[ms]").astype(object))
+
+    def transform_kucoin(
+        self, kucoin_records: list[dict[str, Any]]
+    ) -> list[KucoinTransformedData]:
+        """
+        Be sure to let the consumer deserialize from Jsonarray -> list[dict] using json_loads before passing here
+        """
+        if not kucoin_records:
+            return []
+        df: pd.DataFrame = pd.DataFrame(
+            {
+                "subject": [record["subject"] for record in kucoin_records],
+                "price": [record["data"]["price"] for record in kucoin_records],
+                "time": [record["data"]["time"] for record in kucoin_records],
+            }
+        )
+        df["symbol"] = df["subject"].str.replace("-", "", regex=False)
+        df = df[df["symbol"].str.endswith(QUOTE_SUFFIXES)]
+        prices: np.ndarray = df["price"].to_numpy(dtype=np.float64)
+        times: list[datetime] = self._epoch_ms_to_datetime(df["time"])
+        created_at: datetime = datetime.utcnow()
+        return _KUCOIN_ADAPTER.validate_python(
+            [
+                {
+                    "symbol": symbol,
+                    "price": price,
+                    "time": time,
+                    "source": "kucoin",
+                    "created_at": created_at,
+                }
+                for symbol, price, time in zip(
+                    df["symbol"].tolist(), prices.tolist(), times
+                )
+            ]
+        )
+
+    def transform_binance(
+        self, binance_records: list[dict[str, Any]]
+    ) -> list[BinanceTransformedData]:
+        """
+        Be sure to let the consumer deserialize from Jsonarray -> list[dict] using json_loads before passing here
+        """
+        if not binance_records:
+            return []
+        df: pd.DataFrame = pd.DataFrame(
+            {
+                "s": [record["s"] for record in binance_records],
+                "c": [record["c"] for record in binance_records],
+                "E": [record["E"] for record in binance_records],
+            }
+        )
+        df = df[df["s"].str.endswith(QUOTE_SUFFIXES)]
+        prices: np.ndarray = df["c"].to_numpy(dtype=np.float64)
+        times: list[datetime] = self._epoch_ms_to_datetime(df["E"])
+        created_at: datetime = datetime.utcnow()
+        return _BINANCE_ADAPTER.validate_python(
+            [
+                {
+                    "symbol": symbol,
+                    "price": price,
+                    "time": time,
+                    "source": "binance",
+                    "created_at": created_at,
+                }
+                for symbol, price, time in zip(df["s"].tolist(), prices.tolist(), times)
+            ]
+        )
@@ -50,7 +50,8 @@ class SparkTransformer:
             .withColumn("price", F.col("data.price").cast("float"))
             .withColumn("time", F.expr("to_timestamp(data.time / 1000)"))
             .withColumn("source", F.lit("kucoin"))
-            .select("symbol", "price", "time", "source")
+            .withColumn("created_at", F.current_timestamp())
+            .select("symbol", "price", "time", "source", "created_at")
         )  # select only necessary column
         # Converts Spark DF into pydantic dataclass by calling asDict() on every row. collect() gives back a list[row]
         return [
@@ -71,7 +72,8 @@ class SparkTransformer:
             .withColumn("price", F.col("c").cast("double"))
             .withColumn("time", F.expr("to_timestamp(E / 1000)"))
             .withColumn("source", F.lit("binance"))
-            .select("symbol", "price", "time", "source")
+            .withColumn("created_at", F.current_timestamp())
+            .select("symbol", "price", "time", "source", "created_at")
         )
 
         return [
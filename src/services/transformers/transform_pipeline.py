@@ -0,0 +1,335 @@
+"""
+Pipelined consume -> transform -> produce loop for a single raw topic.
+
+Each stage is its own task connected by bounded queues, so while batch N is being transformed,
+batch N+1 is already being fetched and batch N-1 is waiting on its delivery report:
+
+1. fetch: poll_batch + json decode on the consumer thread, undecodable messages are quarantined to
+   the dead-letter topic and committed past with the batch
+2. transform: transformer engine on the transform thread
+3. produce: enqueue into the async producer without waiting for the broker
+4. commit: await the delivery futures in fetch order, then commit the offsets of that batch
+
+Offsets are only committed once every transformed message of a batch has been acknowledged,
+so a crash replays at most the batches still in flight. A transform keeping state across batches
+e.g. open candles can hold commits further back through held_since, so that state is rebuilt by the
+replay after a restart.
+
+The latency traces of the fetched messages are merged, stamped with trace_stage and sent along
+with every output message, see src.utils.latency_trace.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from confluent_kafka import Message
+from pydantic import BaseModel
+
+from src.kafka.consumers import GenericConsumer
+from src.kafka.producers import AsyncAbstractProducer
+from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import LatencyTrace, batch_trace
+from src.utils.metrics import REGISTRY, Counter, Histogram
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+TransformedRecord = TypeVar("TransformedRecord", bound=BaseModel)
+
+STAGES: tuple[str, ...] = ("fetch", "transform", "produce", "commit")
+
+# What travels between the stages, every batch keeps its raw messages so their offsets can be committed.
+# Past the transform it also carries held_since, read right after that batch was transformed
+FetchedBatch = tuple[list[Message], list[dict[str, Any]], Optional[LatencyTrace]]
+TransformedBatch = tuple[
+    list[Message], list[Any], Optional[LatencyTrace], Optional[int]
+]
+ProducedBatch = tuple[list[Message], list["asyncio.Future[Any]"], float, Optional[int]]
+
+STAGE_LATENCY = REGISTRY.histogram(
+    "pipeline_stage_seconds", "Wall time per batch and stage", ("pipeline", "stage")
+)
+PIPELINE_RECORDS_IN = REGISTRY.counter(
+    "pipeline_records_in_total", "Records fetched from the input topic", ("pipeline",)
+)
+PIPELINE_RECORDS_OUT = REGISTRY.counter(
+    "pipeline_records_out_total", "Records handed to the producer", ("pipeline",)
+)
+
+
+def _last_per_partition(messages: list[Message]) -> list[Message]:
+    last: dict[tuple[str, int], Message] = {}
+    for message in messages:
+        key: tuple[str, int] = (message.topic(), message.partition())
+        if key not in last or message.offset() > last[key].offset():
+            last[key] = message
+    return list(last.values())
+
+
+class StageTimings:
+    """
+    Accumulates wall time and batch counts per stage between two reports
+    """
+
+    def __init__(self) -> None:
+        self._seconds: dict[str, float] = {stage: 0.0 for stage in STAGES}
+        self._batches: dict[str, int] = {stage: 0 for stage in STAGES}
+        self.records_in: int = 0
+        self.records_out: int = 0
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._seconds[stage] += seconds
+        self._batches[stage] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Average ms per batch for every stage, plus record throughput
+        """
+        stats: dict[str, Any] = {
+            f"{stage}_ms": (
+                round(1000 * self._seconds[stage] / self._batches[stage], 3)
+                if self._batches[stage]
+                else 0.0
+            )
+            for stage in STAGES
+        }
+        stats["batches"] = self._batches["commit"]
+        stats["records_in"] = self.records_in
+        stats["records_out"] = self.records_out
+        return stats
+
+
+class TransformPipeline(Generic[TransformedRecord]):
+    """
+    Runs the 4 stages for one raw topic until stop() is called.
+    - max_batch_messages: raw Kafka messages fetched per batch
+    - max_records_per_message: transformed records are split into Kafka messages of at most this size
+    - pipeline_depth: batches allowed to queue up between two stages
+    - on_report: receives (name, stats) on every report, used to ship stats out of a worker process
+    - sink: optional second destination for every transformed batch e.g. a database writer,
+      runs alongside the Kafka delivery and the offsets wait for both
+    - trace_stage: name of the stage stamped on the latency trace of every output batch
+    - held_since: for a transform keeping state across batches, the number of the oldest batch its
+      state still needs (batches are numbered from 0 in fetch order, transform is called once for
+      each), None when it holds none. That batch and the later ones are not committed until released
+    """
+
+    def __init__(
+        self,
+        name: str,
+        consumer: GenericConsumer[Any],
+        producer: AsyncAbstractProducer[TransformedRecord],
+        transform: Callable[[list[dict[str, Any]]], list[TransformedRecord]],
+        transform_executor: ThreadPoolExecutor,
+        max_batch_messages: int = 500,
+        poll_timeout_s: float = 0.5,
+        max_records_per_message: int = 1000,
+        pipeline_depth: int = 2,
+        report_interval_s: float = 30.0,
+        on_report: Optional[Callable[[str, dict[str, Any]], None]] = None,
+        sink: Optional[Callable[[list[TransformedRecord]], Awaitable[Any]]] = None,
+        trace_stage: str = "transform",
+        held_since: Optional[Callable[[], Optional[int]]] = None,
+    ) -> None:
+        self._name: str = name
+        self._consumer: GenericConsumer[Any] = consumer
+        self._producer: AsyncAbstractProducer[TransformedRecord] = producer
+        self._transform: Callable[[list[dict[str, Any]]], list[TransformedRecord]] = (
+            transform
+        )
+        self._transform_executor: ThreadPoolExecutor = transform_executor
+        # The consumer is only ever touched from this thread
+        self._consumer_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{name}-consumer"
+        )
+        self._max_batch_messages: int = max_batch_messages
+        self._poll_timeout_s: float = poll_timeout_s
+        self._max_records_per_message: int = max_records_per_message
+        self._pipeline_depth: int = pipeline_depth
+        self._report_interval_s: float = report_interval_s
+        self._on_report: Optional[Callable[[str, dict[str, Any]], None]] = on_report
+        self._sink: Optional[Callable[[list[TransformedRecord]], Awaitable[Any]]] = sink
+        self._trace_stage: str = trace_stage
+        self._held_since: Optional[Callable[[], Optional[int]]] = held_since
+        self.timings: StageTimings = StageTimings()
+        self._stage_latency: dict[str, Histogram] = {
+            stage: STAGE_LATENCY.labels(name, stage) for stage in STAGES
+        }
+        self._records_in: Counter = PIPELINE_RECORDS_IN.labels(name)
+        self._records_out: Counter = PIPELINE_RECORDS_OUT.labels(name)
+        self._stopping: bool = False
+
+    def stop(self) -> None:
+        """
+        Stops fetching, batches already fetched still go through transform, produce and commit
+        """
+        self._stopping = True
+
+    async def run(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        # A None sentinel travels down the queues on shutdown
+        to_transform: asyncio.Queue[Optional[FetchedBatch]] = asyncio.Queue(
+            maxsize=self._pipeline_depth
+        )
+        to_produce: asyncio.Queue[Optional[TransformedBatch]] = asyncio.Queue(
+            maxsize=self._pipeline_depth
+        )
+        to_commit: asyncio.Queue[Optional[ProducedBatch]] = asyncio.Queue(
+            maxsize=self._pipeline_depth
+        )
+
+        await self._producer.start()
+        stages: list[asyncio.Task[None]] = [
+            asyncio.create_task(self._fetch_stage(loop, to_transform)),
+            asyncio.create_task(self._transform_stage(loop, to_transform, to_produce)),
+            asyncio.create_task(self._produce_stage(to_produce, to_commit)),
+            asyncio.create_task(self._commit_stage(loop, to_commit)),
+        ]
+        reporter: asyncio.Task[None] = asyncio.create_task(self._report_forever())
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            reporter.cancel()
+            for stage in stages:
+                stage.cancel()
+            self._report()
+            self._consumer_executor.shutdown(wait=True)
+
+    async def _fetch_stage(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        to_transform: "asyncio.Queue[Optional[FetchedBatch]]",
+    ) -> None:
+        while not self._stopping:
+            started: float = time.perf_counter()
+            messages, records, trace = await loop.run_in_executor(
+                self._consumer_executor, self._fetch
+            )
+            if not messages:
+                continue
+            self._record("fetch", time.perf_counter() - started)
+            self.timings.records_in += len(records)
+            self._records_in.inc(len(records))
+            await to_transform.put((messages, records, trace))
+        await to_transform.put(None)
+
+    def _fetch(self) -> FetchedBatch:
+        messages: list[Message] = self._consumer.poll_batch(
+            num_messages=self._max_batch_messages, timeout=self._poll_timeout_s
+        )
+        return messages, self._consumer.decode_records(messages), batch_trace(messages)
+
+    async def _transform_stage(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        to_transform: "asyncio.Queue[Optional[FetchedBatch]]",
+        to_produce: "asyncio.Queue[Optional[TransformedBatch]]",
+    ) -> None:
+        while (item := await to_transform.get()) is not None:
+            messages, records, trace = item
+            started: float = time.perf_counter()
+            transformed, held_since = await loop.run_in_executor(
+                self._transform_executor, self._transform_batch, records
+            )
+            self._record("transform", time.perf_counter() - started)
+            await to_produce.put((messages, transformed, trace, held_since))
+        await to_produce.put(None)
+
+    def _transform_batch(
+        self, records: list[dict[str, Any]]
+    ) -> tuple[list[TransformedRecord], Optional[int]]:
+        transformed: list[TransformedRecord] = self._transform(records)
+        # Read right after the batch on the same thread, so it matches what the batch emitted
+        return transformed, self._held_since() if self._held_since is not None else None
+
+    async def _produce_stage(
+        self,
+        to_produce: "asyncio.Queue[Optional[TransformedBatch]]",
+        to_commit: "asyncio.Queue[Optional[ProducedBatch]]",
+    ) -> None:
+        while (item := await to_produce.get()) is not None:
+            messages, transformed, trace, held_since = item
+            started: float = time.perf_counter()
+            headers: Optional[list[tuple[str, bytes]]] = (
+                trace.stamp(self._trace_stage).headers
+                if trace is not None and transformed
+                else None
+            )
+            deliveries: list[asyncio.Future[Any]] = []
+            if self._sink is not None and transformed:
+                deliveries.append(asyncio.ensure_future(self._sink(transformed)))
+            for chunk_start in range(
+                0, len(transformed), self._max_records_per_message
+            ):
+                deliveries.append(
+                    await self._producer.produce(
+                        transformed[
+                            chunk_start : chunk_start + self._max_records_per_message
+                        ],
+                        headers=headers,
+                    )
+                )
+            self._record("produce", time.perf_counter() - started)
+            self.timings.records_out += len(transformed)
+            self._records_out.inc(len(transformed))
+            await to_commit.put((messages, deliveries, time.perf_counter(), held_since))
+        await to_commit.put(None)
+
+    async def _commit_stage(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        to_commit: "asyncio.Queue[Optional[ProducedBatch]]",
+    ) -> None:
+        """
+        Batches arrive in fetch order, a failed delivery stops the pipeline without committing
+        so the batch is consumed again after a restart.
+        Batches still held by the transform state wait in held, numbered in fetch order.
+        """
+        held: deque[tuple[int, list[Message]]] = deque()
+        batch_number: int = 0
+        while (item := await to_commit.get()) is not None:
+            messages, deliveries, produced_at, held_since = item
+            await asyncio.gather(*deliveries)
+            held.append((batch_number, messages))
+            released: list[Message] = []
+            while held and (held_since is None or held[0][0] < held_since):
+                released.extend(held.popleft()[1])
+            if held and held[-1][0] == batch_number:
+                # Only the last message of each partition matters to the commit
+                held[-1] = (batch_number, _last_per_partition(messages))
+            batch_number += 1
+            if released:
+                await loop.run_in_executor(
+                    self._consumer_executor, self._consumer.commit_messages, released
+                )
+            # Time spent waiting on the broker acknowledgement after produce handed off
+            self._record("commit", time.perf_counter() - produced_at)
+        if held:
+            logger.info(
+                f"[{self._name}] {len(held)} batch(es) still held by the transform state left "
+                f"uncommitted, they are replayed on restart"
+            )
+
+    def _record(self, stage: str, seconds: float) -> None:
+        """
+        The timings start over on every report, the histograms are cumulative
+        """
+        self.timings.record(stage, seconds)
+        self._stage_latency[stage].observe(seconds)
+
+    async def _report_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self._report_interval_s)
+            self._report()
+
+    def _report(self) -> None:
+        stats: dict[str, Any] = self.timings.snapshot()
+        if stats["batches"]:
+            logger.info(f"[{self._name}] pipeline stats: {stats}")
+        if self._on_report is not None:
+            self._on_report(self._name, stats)
+        self.timings = StageTimings()
@@ -0,0 +1,36 @@
+from typing import Any, Literal, Protocol
+
+from src.models.binance_model import BinanceTransformedData
+from src.models.kucoin_model import KucoinTransformedData
+
+TransformerEngine = Literal["spark", "pandas"]
+
+
+class Transformer(Protocol):
+    """
+    Interface shared by SparkTransformer and PandasTransformer
+    """
+
+    def transform_kucoin(
+        self, kucoin_records: list[dict[str, Any]]
+    ) -> list[KucoinTransformedData]: ...
+
+    def transform_binance(
+        self, binance_records: list[dict[str, Any]]
+    ) -> list[BinanceTransformedData]: ...
+
+
+def build_transformer(engine: TransformerEngine) -> Transformer:
+    """
+    Picks the transform engine from config, engines are imported lazily so the pandas engine
+    never pulls in pyspark and the JVM
+    """
+    if engine == "pandas":
+        from src.services.transformers.pandas_transformer import PandasTransformer
+
+        return PandasTransformer()
+    if engine == "spark":
+        from src.services.transformers.spark_transformer import SparkTransformer
+
+        return SparkTransformer()
+    raise ValueError(f"Unknown transformer engine: {engine}")
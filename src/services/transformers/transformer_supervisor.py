@@ -0,0 +1,299 @@
+"""
+Supervisor mode for the transformer: runs TransformerProcess in N worker processes.
+
+1. Every worker joins the same raw consumer groups, Kafka spreads the partitions across them
+2. Crashed workers are restarted with an exponential backoff, reset once a worker stays up
+3. Workers ship their pipeline stats over a multiprocessing queue, the supervisor logs the aggregate
+   and flags workers that stopped reporting
+
+Workers are spawned rather than forked so no librdkafka thread state is ever inherited.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event
+from typing import Any, Callable, Optional
+
+from confluent_kafka import Consumer
+
+from src.utils.generic_logger import logger_setup
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+RAW_TOPICS: dict[str, str] = {
+    "kucoin_raw": "kucoin_raw_data",
+    "binance_raw": "binance_raw_data",
+}
+
+# (worker_id, pid, pipeline name, stats) as put on the stats queue by a worker
+WorkerReport = tuple[int, int, str, dict[str, Any]]
+WorkerTarget = Callable[
+    [int, dict[str, Any], "multiprocessing.Queue[WorkerReport]", Event], None
+]
+
+
+def resolve_worker_count(requested: int, config: dict[str, Any]) -> int:
+    """
+    0 means one worker per core. Workers beyond the partition count of the widest raw topic
+    would never be assigned anything, so the count is capped there when the broker is reachable.
+    """
+    workers: int = requested if requested > 0 else (os.cpu_count() or 1)
+    max_partitions: int = 0
+    for config_key, topic in RAW_TOPICS.items():
+        consumer_config: dict[str, Any] = {
+            key.replace("_", "."): value
+            for key, value in config["kafka"]["consumer"][config_key].items()
+        }
+        consumer: Consumer = Consumer(consumer_config)
+        try:
+            metadata = consumer.list_topics(topic, timeout=5)
+            max_partitions = max(max_partitions, len(metadata.topics[topic].partitions))
+        except Exception as e:
+            print(f"Could not read partition count of {topic}: {e}")
+        finally:
+            consumer.close()
+    if max_partitions == 0:
+        return workers
+    return max(1, min(workers, max_partitions))
+
+
+def run_worker(
+    worker_id: int,
+    config: dict[str, Any],
+    stats_queue: "multiprocessing.Queue[WorkerReport]",
+    stop_event: Event,
+) -> None:
+    """
+    Entry point of a worker process, Ctrl+C is left to the supervisor which stops workers through stop_event
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_run_transformer(worker_id, config, stats_queue, stop_event))
+
+
+async def _run_transformer(
+    worker_id: int,
+    config: dict[str, Any],
+    stats_queue: "multiprocessing.Queue[WorkerReport]",
+    stop_event: Event,
+) -> None:
+    # Imported in the child so the supervisor never loads the transform engine
+    from src.transform_process import TransformerProcess
+
+    pid: int = os.getpid()
+
+    def report(name: str, stats: dict[str, Any]) -> None:
+        stats_queue.put((worker_id, pid, name, stats))
+
+    transformer_process: TransformerProcess = TransformerProcess(
+        consumer_config=config, on_report=report, metrics_port_offset=worker_id
+    )
+
+    async def watch_stop() -> None:
+        while not stop_event.is_set():
+            await asyncio.sleep(0.5)
+        transformer_process.stop()
+
+    watcher: asyncio.Task[None] = asyncio.create_task(watch_stop())
+    try:
+        await transformer_process.start()
+    finally:
+        watcher.cancel()
+
+
+class WorkerState:
+    def __init__(self, worker_id: int) -> None:
+        self.worker_id: int = worker_id
+        self.process: Optional[SpawnProcess] = None
+        self.started_at: float = 0.0
+        self.restarts: int = 0
+        self.consecutive_crashes: int = 0
+        self.restart_at: Optional[float] = None
+        self.last_report_at: Optional[float] = None
+        self.latest_stats: dict[str, dict[str, Any]] = {}
+
+
+class TransformerSupervisor:
+    """
+    Spawns and babysits the worker processes until stop() is called or SIGTERM / SIGINT is received.
+    - workers: number of worker processes, see resolve_worker_count
+    - restart_backoff_s / max_restart_backoff_s: delay before restarting a crashed worker, doubled per crash
+    - stable_after_s: a worker up for this long resets its crash backoff
+    - stale_after_s: a worker without a stats report for this long is reported unhealthy
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        workers: int,
+        restart_backoff_s: float = 1.0,
+        max_restart_backoff_s: float = 60.0,
+        stable_after_s: float = 60.0,
+        check_interval_s: float = 1.0,
+        report_interval_s: float = 30.0,
+        stale_after_s: Optional[float] = None,
+        worker_target: WorkerTarget = run_worker,
+    ) -> None:
+        self._config: dict[str, Any] = config
+        self._worker_count: int = workers
+        self._restart_backoff_s: float = restart_backoff_s
+        self._max_restart_backoff_s: float = max_restart_backoff_s
+        self._stable_after_s: float = stable_after_s
+        self._check_interval_s: float = check_interval_s
+        self._report_interval_s: float = report_interval_s
+        # Workers report once per pipeline report interval even when idle
+        pipeline_interval_s: float = (
+            config.get("transformer", {})
+            .get("pipeline", {})
+            .get("report_interval_s", 30.0)
+        )
+        self._stale_after_s: float = stale_after_s or 3 * pipeline_interval_s
+        self._worker_target: WorkerTarget = worker_target
+        self._context = multiprocessing.get_context("spawn")
+        self._stats_queue: "multiprocessing.Queue[WorkerReport]" = self._context.Queue()
+        self._stop_event: Event = self._context.Event()
+        self._workers: list[WorkerState] = []
+        self._totals: dict[str, dict[str, int]] = {}
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def run(self) -> None:
+        """
+        Blocks until the supervisor is stopped, then waits for the workers to drain and exit
+        """
+        print(f"Transformer Supervisor starting {self._worker_count} worker(s)")
+        previous_handlers: dict[int, Any] = {}
+        # Signal handlers can only be installed from the main thread
+        if threading.current_thread() is threading.main_thread():
+            previous_handlers = {
+                sig: signal.signal(sig, lambda *_: self.stop())
+                for sig in (signal.SIGINT, signal.SIGTERM)
+            }
+        self._workers = [
+            WorkerState(worker_id) for worker_id in range(self._worker_count)
+        ]
+        for worker in self._workers:
+            self._start_worker(worker)
+        next_report_at: float = time.monotonic() + self._report_interval_s
+        try:
+            while not self._stop_event.wait(self._check_interval_s):
+                self._drain_stats()
+                self._check_workers()
+                if time.monotonic() >= next_report_at:
+                    self._report()
+                    next_report_at = time.monotonic() + self._report_interval_s
+        finally:
+            self._shutdown()
+            for sig, handler in previous_handlers.items():
+                signal.signal(sig, handler)
+            print("Transformer Supervisor stopped")
+
+    def _start_worker(self, worker: WorkerState) -> None:
+        process: SpawnProcess = self._context.Process(
+            target=self._worker_target,
+            args=(worker.worker_id, self._config, self._stats_queue, self._stop_event),
+            name=f"transformer-worker-{worker.worker_id}",
+            daemon=False,
+        )
+        process.start()
+        worker.process = process
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        worker.last_report_at = None
+        print(f"Started transformer worker {worker.worker_id} (pid {process.pid})")
+
+    def _check_workers(self) -> None:
+        now: float = time.monotonic()
+        for worker in self._workers:
+            process: Optional[SpawnProcess] = worker.process
+            if process is not None and process.is_alive():
+                if now - worker.started_at >= self._stable_after_s:
+                    worker.consecutive_crashes = 0
+                continue
+            if worker.restart_at is None:
+                exitcode: Optional[int] = process.exitcode if process else None
+                delay: float = min(
+                    self._max_restart_backoff_s,
+                    self._restart_backoff_s * 2**worker.consecutive_crashes,
+                )
+                worker.consecutive_crashes += 1
+                worker.restart_at = now + delay
+                print(
+                    f"Transformer worker {worker.worker_id} exited with code {exitcode}, restarting in {delay:.1f}s"
+                )
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self._start_worker(worker)
+
+    def _drain_stats(self) -> None:
+        while True:
+            try:
+                worker_id, _, name, stats = self._stats_queue.get_nowait()
+            except queue.Empty:
+                return
+            worker: WorkerState = self._workers[worker_id]
+            worker.last_report_at = time.monotonic()
+            worker.latest_stats[name] = stats
+            totals: dict[str, int] = self._totals.setdefault(
+                name, {"batches": 0, "records_in": 0, "records_out": 0}
+            )
+            for key in totals:
+                totals[key] += stats.get(key, 0)
+
+    def health(self) -> dict[str, Any]:
+        """
+        Per worker liveness and staleness, plus cumulative throughput per pipeline across all workers
+        """
+        now: float = time.monotonic()
+        workers: list[dict[str, Any]] = []
+        for worker in self._workers:
+            alive: bool = worker.process is not None and worker.process.is_alive()
+            last_seen: float = worker.last_report_at or worker.started_at
+            workers.append(
+                {
+                    "worker_id": worker.worker_id,
+                    "pid": worker.process.pid if worker.process else None,
+                    "alive": alive,
+                    "healthy": alive and now - last_seen < self._stale_after_s,
+                    "restarts": worker.restarts,
+                    "stats": worker.latest_stats,
+                }
+            )
+        return {
+            "workers": workers,
+            "healthy_workers": sum(worker["healthy"] for worker in workers),
+            "totals": self._totals,
+        }
+
+    def _report(self) -> None:
+        health: dict[str, Any] = self.health()
+        logger.info(
+            f"transformer supervisor: {health['healthy_workers']}/{len(self._workers)} healthy, totals {health['totals']}"
+        )
+        for worker in health["workers"]:
+            if not worker["healthy"]:
+                logger.warning(f"transformer worker unhealthy: {worker}")
+
+    def _shutdown(self, timeout_s: float = 30.0) -> None:
+        """
+        Workers finish their in-flight batches and commit before exiting, stragglers are terminated
+        """
+        self._stop_event.set()
+        deadline: float = time.monotonic() + timeout_s
+        for worker in self._workers:
+            if worker.process is None:
+                continue
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                print(f"Terminating transformer worker {worker.worker_id}")
+                worker.process.terminate()
+                worker.process.join()
+        self._drain_stats()
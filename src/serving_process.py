@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+import toml
+from aiohttp import web
+from dotenv import load_dotenv
+
+from src.kafka.async_consumer import AsyncPrefetchingConsumer
+from src.kafka.consumers import BinanceTransformedConsumer, KucoinTransformedConsumer
+from src.services.serving.latest_price_store import LatestPriceStore
+from src.services.serving.price_server import build_app
+from src.utils.generic_logger import logger_setup
+from src.utils.latency_trace import LatencyTrace, batch_trace
+from src.utils.metrics import ProcessMetrics
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+
+class PriceServingProcess:
+    """
+    High level orchestrator for serving live prices:
+    1. Consume from kucoin_transformed_data and binance_transformed_data topics
+    2. Apply every tick to the in-memory LatestPriceStore
+    3. Serve the store over HTTP
+
+    Every instance needs the whole market, so each assigns itself every partition from the end
+    (assign_latest in config.toml) instead of joining a consumer group, and never commits.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self._metrics: ProcessMetrics = ProcessMetrics.from_config(config, "serving")
+        serving_config: dict[str, Any] = config.get("serving", {})
+        self._host: str = serving_config.get("host", "0.0.0.0")
+        self._port: int = serving_config.get("port", 8080)
+        self._max_batch_messages: int = serving_config.get("max_batch_messages", 500)
+        self._poll_timeout_s: float = serving_config.get("poll_timeout_s", 0.1)
+        self._store = LatestPriceStore(
+            snapshot_max_age_s=serving_config.get("snapshot_max_age_s", 0.0)
+        )
+        kafka_consumer_config: dict[str, Any] = config["kafka"]["consumer"]
+        self._kucoin_consumer = KucoinTransformedConsumer(
+            self._serving_consumer_config(kafka_consumer_config["kucoin_serving"])
+        )
+        self._binance_consumer = BinanceTransformedConsumer(
+            self._serving_consumer_config(kafka_consumer_config["binance_serving"])
+        )
+        # Fetch and JSON decode happen on the consumer threads, the store is only touched from the loop
+        self._batches: tuple[AsyncPrefetchingConsumer[Any], ...] = tuple(
+            AsyncPrefetchingConsumer(
+                consumer,
+                num_messages=self._max_batch_messages,
+                poll_timeout_s=self._poll_timeout_s,
+                decode="records",
+                name=f"{name}-serving",
+            )
+            for name, consumer in (
+                ("kucoin", self._kucoin_consumer),
+                ("binance", self._binance_consumer),
+            )
+        )
+
+    @staticmethod
+    def _serving_consumer_config(kafka_config: dict[str, Any]) -> dict[str, Any]:
+        return {key.replace("_", "."): value for key, value in kafka_config.items()}
+
+    @property
+    def store(self) -> LatestPriceStore:
+        return self._store
+
+    def stop(self) -> None:
+        for batches in self._batches:
+            batches.stop()
+
+    async def _feed(self, batches: AsyncPrefetchingConsumer[Any]) -> None:
+        async with batches:
+            async for batch in batches:
+                self._store.update_many(batch.records)
+                trace: Optional[LatencyTrace] = batch_trace(batch.messages)
+                if trace is not None:
+                    trace.stamp("serve")
+
+    async def start(self) -> None:
+        print("Price Serving Process Started")
+        self._metrics.start()
+        runner: web.AppRunner = web.AppRunner(build_app(self._store), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, self._host, self._port).start()
+        print(f"Serving prices on http://{self._host}:{self._port}/prices")
+        try:
+            await asyncio.gather(
+                *(self._feed(batches) for batches in self._batches),
+            )
+        finally:
+            await runner.cleanup()
+            self._kucoin_consumer.close()
+            self._binance_consumer.close()
+            await self._metrics.stop()
+            print("Price Serving Process Stopped")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    try:
+        config: dict[str, Any] = toml.load("src/config/config.toml")
+        serving_process: PriceServingProcess = PriceServingProcess(config=config)
+        asyncio.run(serving_process.start())
+    except KeyboardInterrupt:
+        print("Keyboard interrupted")
@@ -1,9 +1,27 @@
+import asyncio
 import logging
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import toml
+from dotenv import load_dotenv
 
 from src.kafka.consumers import KucoinRawConsumer, BinanceRawConsumer
+from src.kafka.producers import (
+    AsyncTransformedBinanceProducer,
+    AsyncTransformedKucoinProducer,
+)
+from src.services.transformers.transform_pipeline import TransformPipeline
+from src.services.transformers.transformer_supervisor import (
+    TransformerSupervisor,
+    resolve_worker_count,
+)
+from src.services.transformers.transformer_factory import (
+    Transformer,
+    build_transformer,
+)
 from src.utils.generic_logger import logger_setup
-
+from src.utils.metrics import ProcessMetrics
 
 logger: logging.Logger = logging.Logger(__name__)
 logger_setup(logger)
@@ -17,14 +35,122 @@ class TransformerProcess:
     3. Call transform_kucoin and transform binance from transformer class
     4. Serialize list[KucoinTransformedData] and list[BinanceTransformedData]
     5. Produce to binance_transformed_data and kucoin_transformed_data topics
+    6. Commit the raw offsets once the transformed batch is acknowledged
+
+    Each topic runs as its own TransformPipeline, so the stages of one batch overlap with the next.
     """
 
-    def __init__(self, consumer_config: dict[str, Any]) -> None:
+    def __init__(
+        self,
+        consumer_config: dict[str, Any],
+        on_report: Optional[Callable[[str, dict[str, Any]], None]] = None,
+        metrics_port_offset: int = 0,
+    ) -> None:
+        # Supervised workers each serve their metrics on the configured port + worker id
+        self._metrics: ProcessMetrics = ProcessMetrics.from_config(
+            consumer_config, "transformer", port_offset=metrics_port_offset
+        )
         kucoin_consumer_config: dict[str, str] = consumer_config["kafka"]["consumer"][
             "kucoin_raw"
         ]
         binance_consumer_config: dict[str, str] = consumer_config["kafka"]["consumer"][
             "binance_raw"
         ]
-        self.kucoin_consumer = KucoinRawConsumer(kucoin_consumer_config)
-        self.binance_consumer = BinanceRawConsumer(binance_consumer_config)
+        kucoin_producer_config: dict[str, str] = consumer_config["kafka"]["producer"][
+            "kucoin_transformed"
+        ]
+        binance_producer_config: dict[str, str] = consumer_config["kafka"]["producer"][
+            "binance_transformed"
+        ]
+        self.kucoin_consumer = KucoinRawConsumer(
+            self._format_kafka_config(kucoin_consumer_config)
+        )
+        self.binance_consumer = BinanceRawConsumer(
+            self._format_kafka_config(binance_consumer_config)
+        )
+        self._kucoin_producer = AsyncTransformedKucoinProducer(
+            producer_config=self._format_kafka_config(kucoin_producer_config)
+        )
+        self._binance_producer = AsyncTransformedBinanceProducer(
+            producer_config=self._format_kafka_config(binance_producer_config)
+        )
+
+        transformer_config: dict[str, Any] = consumer_config.get("transformer", {})
+        self._transformer: Transformer = build_transformer(
+            transformer_config.get("engine", "pandas")
+        )
+        pipeline_config: dict[str, Any] = transformer_config.get("pipeline", {})
+        # Shared by both pipelines, the engines are not guaranteed to be thread safe
+        self._transform_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="transform"
+        )
+        self._kucoin_pipeline = TransformPipeline(
+            name="kucoin",
+            consumer=self.kucoin_consumer,
+            producer=self._kucoin_producer,
+            transform=self._transformer.transform_kucoin,
+            transform_executor=self._transform_executor,
+            on_report=on_report,
+            **pipeline_config,
+        )
+        self._binance_pipeline = TransformPipeline(
+            name="binance",
+            consumer=self.binance_consumer,
+            producer=self._binance_producer,
+            transform=self._transformer.transform_binance,
+            transform_executor=self._transform_executor,
+            on_report=on_report,
+            **pipeline_config,
+        )
+
+    @staticmethod
+    def _format_kafka_config(kafka_config: dict[str, Any]) -> dict[str, Any]:
+        return {key.replace("_", "."): value for key, value in kafka_config.items()}
+
+    def stop(self) -> None:
+        self._kucoin_pipeline.stop()
+        self._binance_pipeline.stop()
+
+    async def start(self) -> None:
+        """
+        Runs both pipelines until they are stopped or one of them fails
+        """
+        print("Transformer Process Started")
+        self._metrics.start()
+        try:
+            await asyncio.gather(
+                self._kucoin_pipeline.run(),
+                self._binance_pipeline.run(),
+            )
+        finally:
+            await self._kucoin_producer.close()
+            await self._binance_producer.close()
+            self.kucoin_consumer.close()
+            self.binance_consumer.close()
+            self._transform_executor.shutdown(wait=True)
+            await self._metrics.stop()
+            print("Transformer Process Stopped")
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    try:
+        config: dict[str, Any] = toml.load("src/config/config.toml")
+        supervisor_config: dict[str, Any] = config.get("transformer", {}).get(
+            "supervisor", {}
+        )
+        workers: int = supervisor_config.get("workers", 1)
+        if workers == 1:
+            transformer_process: TransformerProcess = TransformerProcess(
+                consumer_config=config
+            )
+            asyncio.run(transformer_process.start())
+        else:
+            supervisor: TransformerSupervisor = TransformerSupervisor(
+                config=config,
+                workers=resolve_worker_count(workers, config),
+                **{k: v for k, v in supervisor_config.items() if k != "workers"},
+            )
+            supervisor.run()
+    except KeyboardInterrupt:
+        print("Keyboard interrupted")
@@ -1,7 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Literal
 
-
 """
 Converts UNIX timestamp retrieved from Binance and Kucoin into datetime format
 """
@@ -23,3 +22,20 @@ def extract_event_datetime(
         raise ValueError(f"Unknown source: {source}")
 
     return datetime.utcfromtimestamp(timestamp_ms / 1000)
+
+
+_EPOCH: datetime = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def epoch_ms(time: datetime | str | int) -> int:
+    """
+    Transformed records carry naive UTC datetimes, or their ISO string once they went through Kafka
+    """
+    if isinstance(time, int):
+        return time
+    if isinstance(time, str):
+        time = datetime.fromisoformat(time)
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    # Integer division on the timedelta, float timestamps can round 1ms down
+    return (time - _EPOCH) // timedelta(milliseconds=1)
@@ -0,0 +1,161 @@
+"""
+End-to-end freshness tracing, from the exchange event time to the sinks.
+
+Every batch carries the wall clock time (UNIX ms) it reached each stage, in Kafka headers
+trace.<stage> next to trace.source:
+1. event: the oldest exchange event time of the batch, so freshness is the batch's worst case
+2. receive: the first websocket frame of the batch was read
+3. produce: the raw batch was handed to the producer
+4. transform / consolidate / candles: a pipeline produced its output batch
+5. load / serve / s3: the batch reached Postgres, the price server or the archive, these sinks
+   only record, nothing travels further
+
+A pipeline fetching many messages merges their traces stage by stage on the earliest stamp,
+so the oldest message of a batch sets its freshness.
+
+Reaching a stage updates two histograms, percentiles come from histogram_quantile:
+- trace_hop_seconds{source, hop}: since the previous stage, e.g. hop="produce_to_transform"
+- trace_freshness_seconds{source, stage}: since the exchange event
+
+Stamps come from the clocks of different hosts, the exchange's included: a hop is only as
+accurate as the clocks are in sync, and a negative one from clock skew is recorded as 0.
+"""
+
+import time
+from typing import Any, Iterable, NamedTuple, Optional
+
+from src.utils.metrics import REGISTRY
+
+TRACE_HEADER_PREFIX: str = "trace."
+SOURCE_HEADER: str = "trace.source"
+
+FRESHNESS_BUCKETS: tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+
+HOP_LATENCY = REGISTRY.histogram(
+    "trace_hop_seconds",
+    "Time a batch took between two consecutive stages",
+    ("source", "hop"),
+    buckets=FRESHNESS_BUCKETS,
+)
+FRESHNESS = REGISTRY.histogram(
+    "trace_freshness_seconds",
+    "Age of a batch's oldest exchange event when it reaches a stage",
+    ("source", "stage"),
+    buckets=FRESHNESS_BUCKETS,
+)
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def record_freshness(source: str, stage: str, event_ms: int) -> None:
+    FRESHNESS.labels(source, stage).observe(max(0, now_ms() - event_ms) / 1000)
+
+
+class LatencyTrace(NamedTuple):
+    source: str
+    # (stage, UNIX ms) in the order they were reached
+    stamps: tuple[tuple[str, int], ...]
+
+    @classmethod
+    def start(cls, source: str, event_ms: int, receive_ms: int) -> "LatencyTrace":
+        return cls(source, (("event", event_ms),)).stamp("receive", receive_ms)
+
+    @property
+    def event_ms(self) -> Optional[int]:
+        return self.stamps[0][1] if self.stamps[0][0] == "event" else None
+
+    def stamp(self, stage: str, at_ms: Optional[int] = None) -> "LatencyTrace":
+        """
+        Returns the trace extended with stage, recording the hop and the freshness on the way
+        """
+        if at_ms is None:
+            at_ms = now_ms()
+        previous_stage, previous_ms = self.stamps[-1]
+        HOP_LATENCY.labels(self.source, f"{previous_stage}_to_{stage}").observe(
+            max(0, at_ms - previous_ms) / 1000
+        )
+        event_ms: Optional[int] = self.event_ms
+        if event_ms is not None:
+            FRESHNESS.labels(self.source, stage).observe(
+                max(0, at_ms - event_ms) / 1000
+            )
+        return LatencyTrace(self.source, self.stamps + ((stage, at_ms),))
+
+    @property
+    def headers(self) -> list[tuple[str, bytes]]:
+        return [(SOURCE_HEADER, self.source.encode("ascii"))] + [
+            (TRACE_HEADER_PREFIX + stage, str(at_ms).encode("ascii"))
+            for stage, at_ms in self.stamps
+        ]
+
+    @classmethod
+    def from_headers(
+        cls, headers: Optional[list[tuple[str, bytes]]]
+    ) -> Optional["LatencyTrace"]:
+        """
+        None for messages produced without a trace, or with a malformed one
+        """
+        if not headers:
+            return None
+        source: Optional[str] = None
+        stamps: list[tuple[str, int]] = []
+        try:
+            for name, value in headers:
+                if not name.startswith(TRACE_HEADER_PREFIX):
+                    continue
+                if name == SOURCE_HEADER:
+                    source = value.decode("ascii")
+                else:
+                    stamps.append((name[len(TRACE_HEADER_PREFIX) :], int(value)))
+        except (UnicodeDecodeError, ValueError):
+            return None
+        if source is None or not stamps:
+            return None
+        return cls(source, tuple(stamps))
+
+    @classmethod
+    def merge(
+        cls, traces: Iterable[Optional["LatencyTrace"]]
+    ) -> Optional["LatencyTrace"]:
+        """
+        Earliest stamp per stage, stages in the order of the first trace
+        """
+        source: Optional[str] = None
+        earliest: dict[str, int] = {}
+        for trace in traces:
+            if trace is None:
+                continue
+            if source is None:
+                source = trace.source
+            for stage, at_ms in trace.stamps:
+                if at_ms < earliest.get(stage, at_ms + 1):
+                    earliest[stage] = at_ms
+        if source is None:
+            return None
+        return cls(source, tuple(earliest.items()))
+
+
+def batch_trace(messages: Iterable[Any]) -> Optional[LatencyTrace]:
+    """
+    The merged trace of a batch of Kafka messages, None when none of them is traced
+    """
+    return LatencyTrace.merge(
+        LatencyTrace.from_headers(message.headers()) for message in messages
+    )
@@ -0,0 +1,593 @@
+"""
+In-process metrics exposed as Prometheus text on a local HTTP endpoint.
+
+1. Counter, Gauge and Histogram families live in a registry, REGISTRY being the process wide one.
+   Labelled children are resolved once by the instrumented class and kept as attributes, so the hot
+   path is a locked add: no dict lookup, no string formatting, nothing allocated
+2. A gauge tracking one instance's state, e.g. a queue depth or the in-flight deliveries, is
+   claimed by that instance and released when it closes: a second instance claiming the same
+   labels is refused instead of silently overwriting the first one's series
+3. MetricsServer serves the registry from a stdlib HTTP server thread, so asyncio and threaded
+   processes alike can expose it
+4. EventLoopMonitor samples the event loop lag and reports callbacks blocking the loop, with the
+   stack they are blocked in, while they are still blocking
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import FrameType
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Generic,
+    Iterator,
+    Optional,
+    TypeVar,
+)
+
+from pydantic import BaseModel
+
+from src.utils.generic_logger import logger_setup
+
+logger: logging.Logger = logging.Logger(__name__)
+logger_setup(logger)
+
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a sub-millisecond validation up to a slow multipart upload
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+# (name suffix, extra labels, value) as rendered by a child
+Sample = tuple[str, tuple[tuple[str, str], ...], float]
+
+
+class Counter:
+    """
+    Monotonic, reset only by a process restart
+    """
+
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def samples(self) -> list[Sample]:
+        return [("", (), self._value)]
+
+
+class Gauge:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self) -> None:
+        self._value: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def samples(self) -> list[Sample]:
+        return [("", (), self._value)]
+
+
+class Histogram:
+    """
+    Bucket counts are kept per bucket and only made cumulative when rendered
+    """
+
+    __slots__ = ("_buckets", "_counts", "_sum", "_lock")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self._buckets: tuple[float, ...] = buckets
+        # The last slot is +Inf
+        self._counts: list[int] = [0] * (len(buckets) + 1)
+        self._sum: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index: int = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def samples(self) -> list[Sample]:
+        with self._lock:
+            counts: list[int] = list(self._counts)
+            total: float = self._sum
+        samples: list[Sample] = []
+        cumulative: int = 0
+        for bound, count in zip(self._buckets + (math.inf,), counts):
+            cumulative += count
+            samples.append(("_bucket", (("le", _format_value(bound)),), cumulative))
+        samples.append(("_sum", (), total))
+        samples.append(("_count", (), cumulative))
+        return samples
+
+
+Child = TypeVar("Child", Counter, Gauge, Histogram)
+
+
+class MetricFamily(Generic[Child]):
+    """
+    One metric name, one child per combination of label values.
+    An unlabelled family has a single child, labels() without values.
+    """
+
+    kind: ClassVar[str]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        new_child: Callable[[], Child],
+    ) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: tuple[str, ...] = labelnames
+        self._new_child: Callable[[], Child] = new_child
+        self._children: dict[tuple[str, ...], Child] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        # Label values whose child is owned by a single instance, see claim()
+        self._claimed: set[tuple[str, ...]] = set()
+
+    def _check_labels(self, values: tuple[str, ...]) -> None:
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+
+    def labels(self, *values: str) -> Child:
+        """
+        Resolve once and keep the child, this is not meant for the hot path
+        """
+        self._check_labels(values)
+        child: Optional[Child] = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def claim(self, *values: str) -> Child:
+        """
+        A fresh child owned by the caller until release(), raises if the labels already have an owner
+        """
+        self._check_labels(values)
+        with self._lock:
+            if values in self._claimed:
+                raise ValueError(f"{self.name}{values} is already owned")
+            self._claimed.add(values)
+            child: Child = self._new_child()
+            self._children[values] = child
+        return child
+
+    def release(self, *values: str) -> None:
+        """
+        Drops a claimed child, its series disappears from the next scrape
+        """
+        with self._lock:
+            self._claimed.discard(values)
+            self._children.pop(values, None)
+
+    def remove(self, *values: str) -> None:
+        with self._lock:
+            self._children.pop(values, None)
+
+    def render(self) -> list[str]:
+        lines: list[str] = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            children: list[tuple[tuple[str, ...], Child]] = list(self._children.items())
+        for values, child in children:
+            labels: tuple[tuple[str, str], ...] = tuple(zip(self.labelnames, values))
+            for suffix, extra_labels, value in child.samples():
+                lines.append(
+                    f"{self.name}{suffix}{_format_labels(labels + extra_labels)} "
+                    f"{_format_value(value)}"
+                )
+        return lines
+
+
+class CounterFamily(MetricFamily[Counter]):
+    kind = "counter"
+
+
+class GaugeFamily(MetricFamily[Gauge]):
+    kind = "gauge"
+
+
+class HistogramFamily(MetricFamily[Histogram]):
+    kind = "histogram"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    rendered: str = ",".join(
+        f'{name}="{_escape_label_value(value)}"' for name, value in labels
+    )
+    return "{" + rendered + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 2**53:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Registering a name twice returns the existing family, so every instance of an instrumented
+    class can declare its metrics, as long as kind and labels match
+    """
+
+    def __init__(self) -> None:
+        self._families: dict[str, MetricFamily[Any]] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def _register(
+        self,
+        family_type: type[MetricFamily[Any]],
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...],
+        new_child: Callable[[], Any],
+    ) -> Any:
+        with self._lock:
+            family: Optional[MetricFamily[Any]] = self._families.get(name)
+            if family is None:
+                family = family_type(name, documentation, labelnames, new_child)
+                self._families[name] = family
+            elif type(family) is not family_type or family.labelnames != labelnames:
+                raise ValueError(
+                    f"{name} is already registered as a {family.kind} with labels {family.labelnames}"
+                )
+            return family
+
+    def counter(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> CounterFamily:
+        return self._register(CounterFamily, name, documentation, labelnames, Counter)
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: tuple[str, ...] = ()
+    ) -> GaugeFamily:
+        return self._register(GaugeFamily, name, documentation, labelnames, Gauge)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> HistogramFamily:
+        return self._register(
+            HistogramFamily,
+            name,
+            documentation,
+            labelnames,
+            lambda: Histogram(buckets),
+        )
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format, version 0.0.4
+        """
+        with self._lock:
+            families: list[MetricFamily[Any]] = list(self._families.values())
+        lines: list[str] = []
+        for family in families:
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY: MetricsRegistry = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    Serves GET /metrics on a daemon thread, port 0 binds any free port (see .port)
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+    ) -> None:
+        self._registry: MetricsRegistry = registry
+        self._host: str = host
+        self._requested_port: int = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        if self._server is None:
+            return self._requested_port
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        registry: MetricsRegistry = self._registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body: bytes = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                # One line per scrape would drown the process logs
+                pass
+
+        self._server = ThreadingHTTPServer(
+            (self._host, self._requested_port), MetricsHandler
+        )
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+        print(f"Metrics served on http://{self._host}:{self.port}/metrics")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        self._server = None
+        self._thread = None
+
+
+class EventLoopMonitor:
+    """
+    1. A task sleeps interval_s in a loop, how late it wakes up is the loop lag
+    2. A watchdog thread checks that the task keeps ticking. When it has not for slow_callback_s,
+       whatever runs on the loop is blocking it: the stall is counted and the stack of the loop
+       thread is logged once per stall, while the culprit is still on it
+
+    Unlike asyncio debug mode this costs one timer per interval_s, so it can stay on in production.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        interval_s: float = 0.25,
+        slow_callback_s: float = 0.1,
+        registry: MetricsRegistry = REGISTRY,
+    ) -> None:
+        self._name: str = name
+        self._interval_s: float = interval_s
+        self._slow_callback_s: float = slow_callback_s
+        self._lag: Histogram = registry.histogram(
+            "event_loop_lag_seconds",
+            "Delay between a timer's deadline and its callback running",
+            ("loop",),
+        ).labels(name)
+        self._stalls: Counter = registry.counter(
+            "event_loop_stalls_total",
+            "Times the event loop was blocked longer than the slow callback threshold",
+            ("loop",),
+        ).labels(name)
+        self._last_tick: float = time.monotonic()
+        self._stall_reported: bool = False
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task[None]] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event: threading.Event = threading.Event()
+
+    def start(self) -> None:
+        """
+        Called from the loop to monitor
+        """
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._tick_forever())
+        self._watchdog = threading.Thread(
+            target=self._watch, name=f"{self._name}-loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def _tick_forever(self) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        while True:
+            expected: float = loop.time() + self._interval_s
+            await asyncio.sleep(self._interval_s)
+            self._lag.observe(max(0.0, loop.time() - expected))
+            self._last_tick = time.monotonic()
+            if self._stall_reported:
+                self._stall_reported = False
+                logger.warning(f"[{self._name}] event loop unblocked")
+
+    def _watch(self) -> None:
+        while not self._stop_event.wait(self._interval_s):
+            blocked_s: float = time.monotonic() - self._last_tick - self._interval_s
+            if blocked_s < self._slow_callback_s or self._stall_reported:
+                continue
+            self._stall_reported = True
+            self._stalls.inc()
+            logger.warning(
+                f"[{self._name}] event loop blocked for {blocked_s * 1000:.0f}ms, "
+                f"currently in:\n{self._loop_stack()}"
+            )
+
+    def _loop_stack(self) -> str:
+        frame: Optional[FrameType] = sys._current_frames().get(
+            self._loop_thread_id or -1
+        )
+        if frame is None:
+            return "<loop thread not found>"
+        return "".join(traceback.format_stack(frame, limit=8))
+
+    async def stop(self) -> None:
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+
+class MetricsParams(BaseModel):
+    """
+    [metrics] in config.toml
+    - ports: metrics port per process name, a process without a port serves no endpoint
+    - loop_lag_interval_s / slow_callback_ms: see EventLoopMonitor
+    """
+
+    enabled: bool = True
+    host: str = "127.0.0.1"
+    ports: dict[str, int] = {}
+    loop_lag_interval_s: float = 0.25
+    slow_callback_ms: float = 100.0
+
+
+class ProcessMetrics:
+    """
+    The endpoint and the event loop monitor of one process.
+    port_offset is added to the configured port, so worker processes of one kind do not collide.
+    """
+
+    def __init__(
+        self,
+        params: MetricsParams,
+        process_name: str,
+        port_offset: int = 0,
+        registry: MetricsRegistry = REGISTRY,
+    ) -> None:
+        port: Optional[int] = params.ports.get(process_name)
+        self._server: Optional[MetricsServer] = (
+            MetricsServer(registry, params.host, port + port_offset)
+            if params.enabled and port is not None
+            else None
+        )
+        self._loop_monitor: Optional[EventLoopMonitor] = (
+            EventLoopMonitor(
+                process_name,
+                interval_s=params.loop_lag_interval_s,
+                slow_callback_s=params.slow_callback_ms / 1000,
+                registry=registry,
+            )
+            if params.enabled
+            else None
+        )
+
+    @classmethod
+    def from_config(
+        cls, config: dict[str, Any], process_name: str, port_offset: int = 0
+    ) -> "ProcessMetrics":
+        return cls(
+            MetricsParams(**config.get("metrics", {})), process_name, port_offset
+        )
+
+    def start(self) -> None:
+        """
+        Called from the process event loop
+        """
+        if self._server is not None:
+            try:
+                self._server.start()
+            except OSError as e:
+                # A taken port must not take the pipeline down with it
+                print(f"WARNING: metrics endpoint not started: {e}")
+        if self._loop_monitor is not None:
+            self._loop_monitor.start()
+
+    async def stop(self) -> None:
+        if self._loop_monitor is not None:
+            await self._loop_monitor.stop()
+        if self._server is not None:
+            self._server.stop()
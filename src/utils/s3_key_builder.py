@@ -1,15 +1,72 @@
-from datetime import datetime
+import re
+from datetime import datetime, timedelta
+from typing import Optional
 
+KEY_TIME_FORMAT: str = "%Y-%m-%dT%H-%M-%S"
+_KEY_TIME_REGEX: re.Pattern[str] = re.compile(
+    r"(\d{4}-\d{2}-\d{2}T\d{2}-\d{2}-\d{2})[^/]*$"
+)
 
-def build_s3_key(source: str, event_dt: datetime) -> str:
+
+def build_s3_key(
+    source: str, timestamp: datetime, writer_id: str, sequence: int, extension: str
+) -> str:
+    """
+    Builds a structured, collision free s3 key path partitioned by date and hour.
+    E.g binance/2025-05-07/15/2025-05-07T15-04-59_3f9a1c2e_000042.ndjson.gz
+    - writer_id: unique per uploading process, sequence: increasing per writer
+    So two batches in the same second, from one process or several, never overwrite each other.
+    """
+    date: str = timestamp.strftime("%Y-%m-%d")
+    hour: str = timestamp.strftime("%H")
+    timestamp_str: str = timestamp.strftime(KEY_TIME_FORMAT)
+    return (
+        f"{source}/{date}/{hour}/{timestamp_str}_{writer_id}_{sequence:06d}{extension}"
+    )
+
+
+def parse_s3_key_time(key: str) -> Optional[datetime]:
+    """
+    Returns the batch timestamp of a key, handles both partitioned keys and legacy
+    {source}/%Y-%m-%dT%H-%M-%S.json keys. None if the key has no timestamp.
     """
-    Builds a structured s3 key path using source and timestamp.
-    E.g raw/kucoin/2025/05/07/data_20250507T15.json.gz
+    match: Optional[re.Match[str]] = _KEY_TIME_REGEX.search(key)
+    if match is None:
+        return None
+    return datetime.strptime(match.group(1), KEY_TIME_FORMAT)
+
+
+def partition_prefixes(
+    source: str, start_time: datetime, end_time: datetime
+) -> list[str]:
+    """
+    Smallest set of date / hour prefixes covering [start_time, end_time], in time order.
+    Days fully inside the range collapse to a single {source}/{date}/ prefix, partial days list
+    one {source}/{date}/{hour}/ prefix per overlapping hour.
     """
-    year: str = event_dt.strftime("%Y")
-    month: str = event_dt.strftime("%m")
-    day: str = event_dt.strftime("%d")
-    hour: str = event_dt.strftime("%H")
-    timestamp_str: str = event_dt.strftime("%Y%m%dT%H")
+    prefixes: list[str] = []
+    hour: datetime = start_time.replace(minute=0, second=0, microsecond=0)
+    while hour <= end_time:
+        day_start: datetime = hour.replace(hour=0)
+        day_end: datetime = day_start + timedelta(days=1)
+        if hour == day_start and start_time <= day_start and day_end <= end_time:
+            prefixes.append(f"{source}/{day_start.strftime('%Y-%m-%d')}/")
+            hour = day_end
+            continue
+        prefixes.append(f"{source}/{hour.strftime('%Y-%m-%d')}/{hour.strftime('%H')}/")
+        hour += timedelta(hours=1)
+    return prefixes
 
-    return f"raw/{source}/{year}/{month}/{day}/{hour}/data_{timestamp_str}.json.gz"
+
+def legacy_day_prefixes(
+    source: str, start_time: datetime, end_time: datetime
+) -> list[str]:
+    """
+    Per day prefixes for legacy {source}/%Y-%m-%dT%H-%M-%S.json keys
+    """
+    prefixes: list[str] = []
+    day: datetime = start_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end_time:
+        prefixes.append(f"{source}/{day.strftime('%Y-%m-%d')}T")
+        day += timedelta(days=1)
+    return prefixes
@@ -0,0 +1,48 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SymbolFilterConfig(BaseModel):
+    """
+    - allow_suffixes: quote currencies to keep e.g. ["USDT", "USDC"], empty keeps every symbol
+    - allow: symbols always kept regardless of suffix
+    - deny: symbols always dropped, takes precedence over allow
+    Symbols are matched in the exchange's own format e.g. BTC-USDT for Kucoin, BTCUSDT for Binance
+    """
+
+    allow_suffixes: list[str] = []
+    allow: list[str] = []
+    deny: list[str] = []
+
+
+class SymbolFilter:
+    """
+    Allow / deny filter for exchange symbols, meant to run before validation.
+    Rules are compiled into frozensets and a suffix tuple once, and every verdict is memoized
+    so the steady state cost per symbol is a single dict lookup.
+    """
+
+    def __init__(self, config: SymbolFilterConfig) -> None:
+        self._allow_suffixes: tuple[str, ...] = tuple(config.allow_suffixes)
+        self._allow: frozenset[str] = frozenset(config.allow)
+        self._deny: frozenset[str] = frozenset(config.deny)
+        self._verdicts: dict[str, bool] = {}
+
+    @property
+    def is_noop(self) -> bool:
+        return not (self._allow_suffixes or self._allow or self._deny)
+
+    def __call__(self, symbol: str) -> bool:
+        verdict: Optional[bool] = self._verdicts.get(symbol)
+        if verdict is None:
+            verdict = self._evaluate(symbol)
+            self._verdicts[symbol] = verdict
+        return verdict
+
+    def _evaluate(self, symbol: str) -> bool:
+        if symbol in self._deny:
+            return False
+        if not (self._allow or self._allow_suffixes):
+            return True
+        return symbol in self._allow or symbol.endswith(self._allow_suffixes)
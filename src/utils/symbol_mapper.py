@@ -0,0 +1,72 @@
+from typing import NamedTuple, Optional
+
+from pydantic import BaseModel
+
+
+class SymbolMapperConfig(BaseModel):
+    """
+    - quotes: quote currencies recognised when splitting concatenated symbols e.g. BTCUSDT
+    - aliases: exchange specific asset codes mapped to the common one e.g. {"XBT": "BTC"}
+    """
+
+    quotes: list[str] = ["USDT", "USDC", "FDUSD", "TUSD", "BTC", "ETH", "BNB", "EUR"]
+    aliases: dict[str, str] = {}
+
+
+class CanonicalSymbol(NamedTuple):
+    base: str
+    quote: str
+
+    @property
+    def symbol(self) -> str:
+        # Same format as the transformed topics, e.g. BTCUSDT
+        return f"{self.base}{self.quote}"
+
+
+class SymbolMapper:
+    """
+    Maps exchange symbols onto one canonical (base, quote) pair so the same market lines up across exchanges:
+    Kucoin BTC-USDT and Binance BTCUSDT both become BTC/USDT.
+    Every mapping is memoized, so the steady state cost per symbol is a single dict lookup.
+    """
+
+    def __init__(self, config: SymbolMapperConfig) -> None:
+        # Longest first so the most specific quote wins when several are suffixes of the symbol
+        self._quotes: tuple[str, ...] = tuple(
+            sorted(config.quotes, key=len, reverse=True)
+        )
+        self._aliases: dict[str, str] = dict(config.aliases)
+        self._index: dict[str, Optional[CanonicalSymbol]] = {}
+
+    def __call__(self, exchange_symbol: str) -> Optional[CanonicalSymbol]:
+        """
+        None when the quote currency is not one of the configured quotes
+        """
+        try:
+            return self._index[exchange_symbol]
+        except KeyError:
+            canonical: Optional[CanonicalSymbol] = self._map(exchange_symbol)
+            self._index[exchange_symbol] = canonical
+            return canonical
+
+    def _map(self, exchange_symbol: str) -> Optional[CanonicalSymbol]:
+        base: str
+        quote: str
+        if "-" in exchange_symbol:
+            base, _, quote = exchange_symbol.partition("-")
+        else:
+            matched: Optional[str] = next(
+                (
+                    quote
+                    for quote in self._quotes
+                    if exchange_symbol.endswith(quote) and exchange_symbol != quote
+                ),
+                None,
+            )
+            if matched is None:
+                return None
+            base, quote = exchange_symbol[: -len(matched)], matched
+        quote = self._aliases.get(quote, quote)
+        if quote not in self._quotes:
+            return None
+        return CanonicalSymbol(self._aliases.get(base, base), quote)
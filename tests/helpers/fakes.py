@@ -0,0 +1,85 @@
+"""
+Fakes shared by the unit tests, standing in for the broker and the database
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+
+class FakeMessage:
+    """
+    Stands in for confluent_kafka.Message
+    """
+
+    def __init__(
+        self,
+        value: bytes = b"",
+        offset: int = 0,
+        partition: int = 0,
+        headers: Optional[list[tuple[str, bytes]]] = None,
+        topic: str = "raw_data",
+    ) -> None:
+        self._value = value
+        self._offset = offset
+        self._partition = partition
+        self._headers = headers
+        self._topic = topic
+
+    def value(self) -> bytes:
+        return self._value
+
+    def offset(self) -> int:
+        return self._offset
+
+    def partition(self) -> int:
+        return self._partition
+
+    def headers(self) -> Optional[list[tuple[str, bytes]]]:
+        return self._headers
+
+    def topic(self) -> str:
+        return self._topic
+
+    def error(self) -> None:
+        return None
+
+
+class FakeConnection:
+    """
+    Stands in for an asyncpg connection, records every statement
+    """
+
+    def __init__(self) -> None:
+        self.executed: list[tuple[str, tuple[Any, ...]]] = []
+        self.copied: list[tuple[str, list[tuple[Any, ...]]]] = []
+        self.partitions: list[str] = []
+
+    async def execute(self, query: str, *args: Any) -> str:
+        self.executed.append((query, args))
+        return "INSERT 0 1"
+
+    async def fetch(self, query: str, *args: Any) -> list[dict[str, str]]:
+        return [{"relname": name} for name in self.partitions]
+
+    async def copy_records_to_table(
+        self, table_name: str, records: list[tuple[Any, ...]], columns: Any
+    ) -> str:
+        self.copied.append((table_name, records))
+        return f"COPY {len(records)}"
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        yield
+
+
+class FakePool:
+    """
+    Stands in for an asyncpg pool, every acquire hands out the same connection
+    """
+
+    def __init__(self) -> None:
+        self.connection = FakeConnection()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[FakeConnection]:
+        yield self.connection
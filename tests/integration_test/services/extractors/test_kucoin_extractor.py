@@ -35,7 +35,7 @@ class TestKucoinExtractorStream:
     async def test_kucoin_stream(self):
         extractor = KucoinExtractor()
         params = KucoinExtractorParams()
-        results: list[KucoinRawData] = []
+        results: list[list[KucoinRawData]] = []
 
         async def run_extractor():
             async for result in extractor.extract_async(params):
@@ -52,4 +52,5 @@ class TestKucoinExtractorStream:
         await task
 
         assert len(results) > 0, "No messages were streamed"
-        assert isinstance(results[0], KucoinRawData), "Expected type KucoinRawData"
+        assert isinstance(results[0], list), "Expected a batch of KucoinRawData"
+        assert isinstance(results[0][0], KucoinRawData), "Expected type KucoinRawData"
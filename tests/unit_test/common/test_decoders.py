@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from benchmarks.benchmark_utils.payloads import (
+    BINANCE_RECORDED_TICKERS,
+    KUCOIN_RECORDED_TICKERS,
+)
+from src.common.decoders import DecodeMode, build_decoder
+from src.models.binance_model import BinanceRawData
+from src.models.kucoin_model import KucoinRawData
+from src.utils.symbol_filter import SymbolFilter, SymbolFilterConfig
+
+
+@pytest.mark.parametrize("mode", ["validate", "trusted"])
+class TestFrameDecoders:
+    def test_binance_frame(self, mode: DecodeMode) -> None:
+        decoder = build_decoder(BinanceRawData, mode, is_array=True)
+        records = decoder.decode(json.dumps(BINANCE_RECORDED_TICKERS))
+        assert [record.s for record in records] == ["BTCUSDT", "ETHUSDT"]
+
+    def test_kucoin_frames_drop_control_messages(self, mode: DecodeMode) -> None:
+        decoder = build_decoder(
+            KucoinRawData, mode, is_array=False, required_keys=("subject", "data")
+        )
+        records = [
+            record
+            for frame in KUCOIN_RECORDED_TICKERS
+            for record in decoder.decode(json.dumps(frame).encode("utf-8"))
+        ]
+        assert [record.subject for record in records] == ["CRO-USDT", "ADA-USDC"]
+
+    def test_invalid_frame_raises(self, mode: DecodeMode) -> None:
+        decoder = build_decoder(BinanceRawData, mode, is_array=True)
+        with pytest.raises(ValidationError):
+            decoder.decode(json.dumps([{"s": "BTCUSDT"}]))
+
+
+@pytest.mark.parametrize("mode", ["validate", "trusted"])
+class TestSymbolFilterPushdown:
+    @pytest.fixture
+    def symbol_filter(self) -> SymbolFilter:
+        return SymbolFilter(
+            SymbolFilterConfig(
+                allow_suffixes=["USDT"], allow=["ADA-USDC"], deny=["CRO-USDT"]
+            )
+        )
+
+    def test_kucoin_filter(self, mode: DecodeMode, symbol_filter: SymbolFilter) -> None:
+        decoder = build_decoder(
+            KucoinRawData,
+            mode,
+            is_array=False,
+            required_keys=("subject", "data"),
+            symbol_key="subject",
+            symbol_filter=symbol_filter,
+        )
+        records = [
+            record
+            for frame in KUCOIN_RECORDED_TICKERS
+            for record in decoder.decode(json.dumps(frame))
+        ]
+        assert [record.subject for record in records] == ["ADA-USDC"]
+
+    def test_binance_filter_skips_invalid_dropped_items(
+        self, mode: DecodeMode, symbol_filter: SymbolFilter
+    ) -> None:
+        decoder = build_decoder(
+            BinanceRawData,
+            mode,
+            is_array=True,
+            symbol_key="s",
+            symbol_filter=symbol_filter,
+        )
+        # The dropped item is not valid, it must never reach the validator
+        frame = BINANCE_RECORDED_TICKERS + [{"s": "BNBBTC"}]
+        records = decoder.decode(json.dumps(frame))
+        assert [record.s for record in records] == ["BTCUSDT", "ETHUSDT"]
+
+    def test_items_without_symbol_are_left_to_validation(
+        self, mode: DecodeMode, symbol_filter: SymbolFilter
+    ) -> None:
+        decoder = build_decoder(
+            BinanceRawData,
+            mode,
+            is_array=True,
+            symbol_key="s",
+            symbol_filter=symbol_filter,
+        )
+        frame = BINANCE_RECORDED_TICKERS + [{"E": 1743147448467}]
+        with pytest.raises(ValidationError):
+            decoder.decode(json.dumps(frame))
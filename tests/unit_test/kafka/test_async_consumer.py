@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+from typing import Any, Optional
+
+import pytest
+
+from src.kafka.async_consumer import AsyncPrefetchingConsumer, ConsumedBatch
+from src.kafka.consumers import GenericConsumer, KucoinTransformedConsumer
+from src.models.kucoin_model import KucoinTransformedData
+from tests.helpers.fakes import FakeMessage
+
+
+class FakeConsumer(GenericConsumer[Any]):
+    """
+    Serves one message per poll, records which threads touched it
+    """
+
+    def __init__(self, batches: int, payload_bytes: int = 10) -> None:
+        self._remaining: int = batches
+        self._payload_bytes: int = payload_bytes
+        self.fetched: int = 0
+        self.committed: list[int] = []
+        self.threads: set[str] = set()
+        self.fail_after: Optional[int] = None
+
+    def poll_batch(self, num_messages: int = 500, timeout: float = 1.0) -> list[Any]:
+        self.threads.add(threading.current_thread().name)
+        if self.fail_after is not None and self.fetched >= self.fail_after:
+            raise ConnectionError("broker gone")
+        if self._remaining == 0:
+            return []
+        self._remaining -= 1
+        self.fetched += 1
+        record: dict[str, Any] = {
+            "offset": self.fetched,
+            "pad": "x" * self._payload_bytes,
+        }
+        return [FakeMessage(json.dumps([record]).encode(), self.fetched)]
+
+    def commit_messages(self, messages: list[Any]) -> None:
+        self.threads.add(threading.current_thread().name)
+        self.committed.extend(message.offset() for message in messages)
+
+
+def prefetching(
+    consumer: FakeConsumer, **options: Any
+) -> AsyncPrefetchingConsumer[Any]:
+    return AsyncPrefetchingConsumer(
+        consumer, poll_timeout_s=0.01, decode="records", name="test", **options
+    )
+
+
+class TestAsyncPrefetchingConsumer:
+    async def test_yields_batches_and_commits_explicitly(self) -> None:
+        consumer = FakeConsumer(batches=3)
+        seen: list[int] = []
+        async with prefetching(consumer) as batches:
+            async for batch in batches:
+                seen.extend(record["offset"] for record in batch.records)
+                await batches.commit(batch)
+                if len(seen) == 3:
+                    batches.stop()
+        assert seen == [1, 2, 3]
+        assert consumer.committed == [1, 2, 3]
+        # Fetch and commit share one thread, never the event loop's
+        assert consumer.threads == {"test-prefetch_0"}
+
+    async def test_prefetches_while_the_loop_works(self) -> None:
+        consumer = FakeConsumer(batches=10)
+        async with prefetching(consumer, max_prefetch_batches=2) as batches:
+            first: ConsumedBatch = await batches.__anext__()
+            await asyncio.sleep(0.2)
+            # One batch handed out, two queued, one more fetched and waiting for room
+            assert consumer.fetched == 4
+            assert first.records[0]["offset"] == 1
+        assert consumer.committed == []
+
+    async def test_bytes_cap_bounds_the_prefetch(self) -> None:
+        consumer = FakeConsumer(batches=10, payload_bytes=1000)
+        async with prefetching(
+            consumer, max_prefetch_batches=8, max_prefetch_bytes=1500
+        ) as batches:
+            await batches.__anext__()
+            await asyncio.sleep(0.2)
+            assert consumer.fetched == 3
+            assert batches.buffered_bytes > 1500
+
+    async def test_fetch_errors_surface_in_the_loop(self) -> None:
+        consumer = FakeConsumer(batches=5)
+        consumer.fail_after = 1
+        async with prefetching(consumer) as batches:
+            await batches.__anext__()
+            with pytest.raises(ConnectionError):
+                await batches.__anext__()
+
+
+class FakeKafkaConsumer:
+    def consume(self, num_messages: int, timeout: float) -> list[Any]:
+        record: dict[str, Any] = {
+            "symbol": "BTC-USDT",
+            "price": 1.0,
+            "time": "2025-03-28T07:37:28",
+            "source": "kucoin",
+            "created_at": "2025-03-28T07:37:28",
+        }
+        return [FakeMessage(json.dumps([record]).encode(), 0)]
+
+    def close(self) -> None:
+        return None
+
+
+class TestGenericConsumerConsume:
+    def test_timeout_is_passed_to_librdkafka(self) -> None:
+        consumer = KucoinTransformedConsumer(
+            {"bootstrap.servers": "localhost:9092", "group.id": "test-consume"}
+        )
+        consumer._consumer.close()
+        consumer._consumer = FakeKafkaConsumer()  # type: ignore[assignment]
+        [record] = consumer.consume(num_messages=1, timeout=0.1)
+        assert isinstance(record, KucoinTransformedData)
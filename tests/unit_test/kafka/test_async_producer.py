@@ -0,0 +1,203 @@
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+import pytest
+from confluent_kafka import KafkaException
+
+from src.kafka.producers import AsyncRawKucoinProducer, symbol_partition
+from src.models.kucoin_model import KucoinCryptoData, KucoinRawData
+from tests.helpers.fakes import FakeMessage
+
+
+class FakeProducer:
+    """
+    Stands in for confluent_kafka.Producer, deliveries only fire when the test releases them
+    """
+
+    def __init__(self) -> None:
+        self.pending: list[tuple[Callable[..., None], bytes]] = []
+        self.fail_next: bool = False
+        self.flushed: bool = False
+
+    def produce(
+        self, topic: str, value: bytes, on_delivery: Callable[..., None]
+    ) -> None:
+        self.pending.append((on_delivery, value))
+
+    def poll(self, timeout: float) -> int:
+        return self.deliver()
+
+    def deliver(self) -> int:
+        delivered: int = len(self.pending)
+        for on_delivery, value in self.pending:
+            err: Optional[Any] = "broker down" if self.fail_next else None
+            on_delivery(err, FakeMessage(value))
+        self.pending = []
+        return delivered
+
+    def flush(self, timeout: float) -> int:
+        self.flushed = True
+        self.deliver()
+        return 0
+
+
+def make_record(subject: str) -> KucoinRawData:
+    return KucoinRawData(
+        topic="/market/ticker:all",
+        type="message",
+        subject=subject,
+        data=KucoinCryptoData(
+            bestAsk="1.1",
+            bestAskSize="1",
+            bestBid="1.0",
+            price="1.05",
+            sequence="1",
+            size="1",
+            time=1743064920774,
+        ),
+    )
+
+
+class TestAsyncAbstractProducer:
+    @pytest.fixture
+    def fake_producer(self) -> FakeProducer:
+        return FakeProducer()
+
+    @pytest.fixture
+    def producer(self, fake_producer: FakeProducer) -> AsyncRawKucoinProducer:
+        producer = AsyncRawKucoinProducer(
+            {"bootstrap.servers": "localhost:9092"},
+            max_in_flight_messages=1,
+            poll_timeout_s=0.01,
+        )
+        producer._producer = fake_producer  # type: ignore[assignment]
+        return producer
+
+    async def test_produce_returns_delivery_future(
+        self, producer: AsyncRawKucoinProducer
+    ) -> None:
+        delivery = await producer.produce([make_record("BTC-USDT")])
+        message = await asyncio.wait_for(delivery, timeout=1)
+        assert b"BTC-USDT" in message.value()
+        assert producer.in_flight_messages == 0
+        await producer.close()
+
+    async def test_produce_applies_backpressure(
+        self, producer: AsyncRawKucoinProducer, fake_producer: FakeProducer
+    ) -> None:
+        await producer.start()
+        # Stop the poll task from draining so the cap is actually hit
+        fake_producer.poll = lambda timeout: 0  # type: ignore[method-assign]
+        await producer.produce([make_record("BTC-USDT")])
+        second = asyncio.create_task(producer.produce([make_record("ETH-USDT")]))
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        assert producer.in_flight_messages == 1
+
+        fake_producer.deliver()
+        await asyncio.wait_for(second, timeout=1)
+        assert producer.in_flight_messages == 1
+        await producer.close()
+        assert fake_producer.flushed
+
+    async def test_failed_delivery_raises(
+        self, producer: AsyncRawKucoinProducer, fake_producer: FakeProducer
+    ) -> None:
+        fake_producer.fail_next = True
+        delivery = await producer.produce([make_record("BTC-USDT")])
+        with pytest.raises(KafkaException):
+            await asyncio.wait_for(delivery, timeout=1)
+        await producer.close()
+
+
+class FakeTopicMetadata:
+    def __init__(self, partitions: int) -> None:
+        self.partitions: dict[int, Any] = {
+            partition: None for partition in range(partitions)
+        }
+        self.error: Optional[Any] = None
+
+
+class FakeClusterMetadata:
+    def __init__(self, topic: str, partitions: int) -> None:
+        self.topics: dict[str, FakeTopicMetadata] = {
+            topic: FakeTopicMetadata(partitions)
+        }
+
+
+class FakeKeyedProducer(FakeProducer):
+    def __init__(self, partitions: int) -> None:
+        super().__init__()
+        self.partitions: int = partitions
+        self.metadata_requests: int = 0
+        self.routing: list[dict[str, Any]] = []
+
+    def list_topics(self, topic: str, timeout: float) -> FakeClusterMetadata:
+        self.metadata_requests += 1
+        return FakeClusterMetadata(topic, self.partitions)
+
+    def produce(  # type: ignore[override]
+        self, topic: str, value: bytes, on_delivery: Callable[..., None], **routing: Any
+    ) -> None:
+        self.routing.append(routing)
+        super().produce(topic, value, on_delivery)
+
+
+class TestKeyedPartitioning:
+    @pytest.fixture
+    def fake_producer(self) -> FakeKeyedProducer:
+        return FakeKeyedProducer(partitions=4)
+
+    @pytest.fixture
+    def producer(self, fake_producer: FakeKeyedProducer) -> AsyncRawKucoinProducer:
+        producer = AsyncRawKucoinProducer(
+            {"bootstrap.servers": "localhost:9092", "partitioning": "keyed"},
+            poll_timeout_s=0.01,
+        )
+        producer._producer = fake_producer  # type: ignore[assignment]
+        return producer
+
+    async def test_batch_is_split_by_symbol(
+        self, producer: AsyncRawKucoinProducer, fake_producer: FakeKeyedProducer
+    ) -> None:
+        symbols: list[str] = [f"SYM{index}-USDT" for index in range(20)]
+        delivery = await producer.produce([make_record(symbol) for symbol in symbols])
+        messages = await asyncio.wait_for(delivery, timeout=1)
+        await producer.close()
+
+        assert fake_producer.metadata_requests == 1
+        assert len(messages) == len(fake_producer.routing) == 4
+        for routing, message in zip(fake_producer.routing, messages):
+            assert routing["key"] == str(routing["partition"]).encode()
+            produced: list[str] = [
+                record["subject"] for record in json.loads(message.value())
+            ]
+            assert {symbol_partition(symbol, 4) for symbol in produced} == {
+                routing["partition"]
+            }
+            # Relative order is kept within a partition
+            assert produced == [symbol for symbol in symbols if symbol in produced]
+
+    async def test_a_symbol_always_lands_on_the_same_partition(
+        self, producer: AsyncRawKucoinProducer, fake_producer: FakeKeyedProducer
+    ) -> None:
+        for _ in range(3):
+            await producer.produce([make_record("BTC-USDT")])
+        await producer.close()
+        assert fake_producer.metadata_requests == 1
+        assert {routing["partition"] for routing in fake_producer.routing} == {
+            symbol_partition("BTC-USDT", 4)
+        }
+
+    async def test_unkeyed_producers_send_one_message(
+        self, fake_producer: FakeKeyedProducer
+    ) -> None:
+        producer = AsyncRawKucoinProducer(
+            {"bootstrap.servers": "localhost:9092"}, poll_timeout_s=0.01
+        )
+        producer._producer = fake_producer  # type: ignore[assignment]
+        await producer.produce([make_record("BTC-USDT"), make_record("ETH-USDT")])
+        await producer.close()
+        assert fake_producer.routing == [{}]
+        assert fake_producer.metadata_requests == 0
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+from confluent_kafka import OFFSET_END, TopicPartition
+
+from src.kafka import consumers
+from src.kafka.consumers import BinanceTransformedConsumer
+
+
+class FakeKafkaConsumer:
+    """
+    Stands in for confluent_kafka.Consumer, records how the consumer attaches to its topic
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.config: dict[str, Any] = config
+        self.subscribed: list[str] = []
+        self.assigned: list[TopicPartition] = []
+
+    def list_topics(self, topic: str, timeout: float) -> SimpleNamespace:
+        return SimpleNamespace(
+            topics={topic: SimpleNamespace(partitions={1: None, 0: None, 2: None})}
+        )
+
+    def subscribe(self, topics: list[str], **callbacks: Any) -> None:
+        self.subscribed.extend(topics)
+
+    def assign(self, partitions: list[TopicPartition]) -> None:
+        self.assigned.extend(partitions)
+
+    def close(self) -> None:
+        pass
+
+
+class TestAssignLatest:
+    @pytest.fixture(autouse=True)
+    def fake_consumer(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(consumers, "Consumer", FakeKafkaConsumer)
+
+    def test_assigns_every_partition_from_the_end_without_joining_the_group(
+        self,
+    ) -> None:
+        consumer = BinanceTransformedConsumer(
+            {
+                "bootstrap.servers": "localhost:9092",
+                "group.id": "test-serving",
+                "assign.latest": True,
+            }
+        )
+        kafka_consumer: Any = consumer._consumer
+        assert kafka_consumer.subscribed == []
+        assert "assign.latest" not in kafka_consumer.config
+        assert [
+            (tp.topic, tp.partition, tp.offset) for tp in kafka_consumer.assigned
+        ] == [
+            ("binance_transformed_data", partition, OFFSET_END)
+            for partition in (0, 1, 2)
+        ]
+        assert consumer.assigned_partitions == [0, 1, 2]
+
+    def test_subscribes_by_default(self) -> None:
+        consumer = BinanceTransformedConsumer(
+            {"bootstrap.servers": "localhost:9092", "group.id": "test-serving"}
+        )
+        kafka_consumer: Any = consumer._consumer
+        assert kafka_consumer.subscribed == ["binance_transformed_data"]
+        assert kafka_consumer.assigned == []
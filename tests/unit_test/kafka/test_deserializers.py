@@ -0,0 +1,244 @@
+import copy
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+import pytest
+from confluent_kafka import TopicPartition
+
+from benchmarks.benchmark_utils.payloads import kucoin_tickers
+from src.kafka.consumers import DeserializationError, KucoinRawConsumer
+from src.kafka.dead_letter import DeadLetterError
+from src.kafka.deserializers import DeserializeMode, deserialize_payload
+from src.kafka.producers import AsyncTransformedKucoinProducer
+from src.models.kucoin_model import KucoinRawData, KucoinTransformedData
+from tests.helpers.fakes import FakeMessage
+
+
+class FakeProducer:
+    """
+    Deliveries are acknowledged on flush, failing with delivery_error when it is set
+    """
+
+    def __init__(self, delivery_error: Optional[str] = None) -> None:
+        self.produced: list[tuple[bytes, dict[str, bytes]]] = []
+        self.delivery_error: Optional[str] = delivery_error
+        self._callbacks: list[Callable[..., None]] = []
+
+    def produce(
+        self,
+        topic: str,
+        value: bytes,
+        headers: list[tuple[str, bytes]],
+        on_delivery: Callable[..., None],
+    ) -> None:
+        self.produced.append((value, dict(headers)))
+        self._callbacks.append(on_delivery)
+
+    def poll(self, timeout: float) -> int:
+        return 0
+
+    def flush(self, timeout: float) -> int:
+        callbacks, self._callbacks = self._callbacks, []
+        for on_delivery in callbacks:
+            on_delivery(self.delivery_error, None)
+        return 0
+
+
+class FakeKafkaConsumer:
+    def __init__(self) -> None:
+        self.committed: list[list[TopicPartition]] = []
+
+    def commit(self, offsets: list[TopicPartition], asynchronous: bool) -> None:
+        self.committed.append(offsets)
+
+    def close(self) -> None:
+        pass
+
+
+def kucoin_payload(tickers: list[dict[str, Any]]) -> bytes:
+    return json.dumps(tickers).encode()
+
+
+def broken_ticker() -> dict[str, Any]:
+    ticker: dict[str, Any] = copy.deepcopy(kucoin_tickers(1)[0])
+    del ticker["data"]["price"]
+    return ticker
+
+
+MODES: tuple[DeserializeMode, ...] = ("validate", "batch")
+
+
+class TestDeserializePayload:
+    @pytest.mark.parametrize("mode", MODES)
+    def test_every_mode_builds_the_models(self, mode: DeserializeMode) -> None:
+        tickers: list[dict[str, Any]] = kucoin_tickers(20)
+        records, bad_records = deserialize_payload(
+            KucoinRawData, mode, kucoin_payload(tickers)
+        )
+        assert bad_records == []
+        assert [record.data.price for record in records] == [
+            ticker["data"]["price"] for ticker in tickers
+        ]
+
+    @pytest.mark.parametrize("mode", MODES)
+    def test_bad_records_are_singled_out(self, mode: DeserializeMode) -> None:
+        tickers: list[dict[str, Any]] = kucoin_tickers(3)
+        records, bad_records = deserialize_payload(
+            KucoinRawData,
+            mode,
+            kucoin_payload([tickers[0], broken_ticker(), tickers[2]]),
+        )
+        assert len(records) == 2
+        [(payload, error)] = bad_records
+        assert "price" in error
+        assert json.loads(payload) == broken_ticker()
+
+    def test_undecodable_message_is_one_bad_record(self) -> None:
+        records, [(payload, error)] = deserialize_payload(
+            KucoinRawData, "batch", b'[{"topic": '
+        )
+        assert records == []
+        assert payload == b'[{"topic": '
+        assert error.startswith("Undecodable message")
+
+    def test_columnar_payloads(self) -> None:
+        producer = AsyncTransformedKucoinProducer(
+            {"bootstrap.servers": "localhost:9092", "wire.format": "columnar"}
+        )
+        batch: list[KucoinTransformedData] = [
+            KucoinTransformedData(
+                symbol="BTC-USDT",
+                price=1.5,
+                time=datetime(2025, 3, 28),
+                source="kucoin",
+                created_at=datetime(2025, 3, 28),
+            )
+        ]
+        payload, _ = producer.encode(batch)
+        for mode in MODES:
+            records, _ = deserialize_payload(
+                KucoinTransformedData, mode, payload, "KucoinTransformedData.v1"
+            )
+            assert records == batch
+
+
+class TestGenericConsumerDeserializeBatch:
+    def build_consumer(self, **options: Any) -> KucoinRawConsumer:
+        return KucoinRawConsumer(
+            {
+                "bootstrap.servers": "localhost:9092",
+                "group.id": "test-deserializers",
+                **options,
+            }
+        )
+
+    def build_quarantining_consumer(
+        self, fake_producer: FakeProducer
+    ) -> KucoinRawConsumer:
+        consumer = self.build_consumer(
+            **{"deserialize.mode": "batch", "dead.letter.topic": "kucoin_dead_letter"}
+        )
+        assert consumer._dead_letter is not None
+        consumer._dead_letter._producer = fake_producer  # type: ignore[assignment]
+        return consumer
+
+    def test_bad_records_fail_the_batch_without_dead_letter_topic(self) -> None:
+        consumer = self.build_consumer(**{"deserialize.mode": "batch"})
+        try:
+            with pytest.raises(DeserializationError):
+                consumer.deserialize_batch(
+                    [FakeMessage(kucoin_payload([broken_ticker()]))]
+                )
+        finally:
+            consumer.close()
+
+    def test_bad_records_are_quarantined(self) -> None:
+        fake_producer = FakeProducer()
+        consumer = self.build_quarantining_consumer(fake_producer)
+        try:
+            records: list[KucoinRawData] = consumer.deserialize_batch(
+                [
+                    FakeMessage(kucoin_payload(kucoin_tickers(2)), offset=7),
+                    FakeMessage(kucoin_payload([broken_ticker()]), offset=8),
+                    FakeMessage(b"not json", offset=9),
+                ]
+            )
+        finally:
+            consumer.close()
+        assert len(records) == 2
+        assert [
+            headers["dlq.source.offset"] for _, headers in fake_producer.produced
+        ] == [
+            b"8",
+            b"9",
+        ]
+        assert fake_producer.produced[1][0] == b"not json"
+
+    def test_unknown_codec_or_schema_is_quarantined(self) -> None:
+        fake_producer = FakeProducer()
+        consumer = self.build_quarantining_consumer(fake_producer)
+        try:
+            records: list[KucoinRawData] = consumer.deserialize_batch(
+                [
+                    FakeMessage(b"poison", offset=7, headers=[("codec", b"avro")]),
+                    FakeMessage(kucoin_payload(kucoin_tickers(2)), offset=8),
+                    FakeMessage(
+                        b"poison",
+                        offset=9,
+                        headers=[("codec", b"columnar"), ("schema", b"Nope.v9")],
+                    ),
+                ]
+            )
+        finally:
+            consumer.close()
+        assert len(records) == 2
+        assert [
+            headers["dlq.source.offset"] for _, headers in fake_producer.produced
+        ] == [
+            b"7",
+            b"9",
+        ]
+        assert all(
+            headers["dlq.error"].startswith(b"Undecodable message")
+            for _, headers in fake_producer.produced
+        )
+
+    def test_offsets_are_not_committed_when_a_dead_letter_is_lost(self) -> None:
+        fake_producer = FakeProducer(delivery_error="broker down")
+        consumer = self.build_quarantining_consumer(fake_producer)
+        real_consumer = consumer._consumer
+        fake_consumer = FakeKafkaConsumer()
+        consumer._consumer = fake_consumer  # type: ignore[assignment]
+        consumer._assigned.add(("raw_data", 0))
+        messages: list[Any] = [FakeMessage(b"not json", offset=3)]
+        try:
+            consumer.deserialize_batch(messages)
+            with pytest.raises(DeadLetterError):
+                consumer.commit_messages(messages)
+            assert fake_consumer.committed == []
+            # Once delivered, the commit goes through
+            fake_producer.delivery_error = None
+            consumer.deserialize_batch(messages)
+            consumer.commit_messages(messages)
+            assert fake_consumer.committed == [[TopicPartition("raw_data", 0, 4)]]
+        finally:
+            consumer._consumer = real_consumer
+            consumer.close()
+
+    def test_process_pool_keeps_message_order(self) -> None:
+        consumer = self.build_consumer(
+            **{"deserialize.mode": "batch", "decode.workers": 2}
+        )
+        tickers: list[dict[str, Any]] = kucoin_tickers(40)
+        messages: list[Any] = [
+            FakeMessage(kucoin_payload(tickers[start : start + 5]), offset=start)
+            for start in range(0, 40, 5)
+        ]
+        try:
+            records: list[KucoinRawData] = consumer.deserialize_batch(messages)
+        finally:
+            consumer.close()
+        assert [record.subject for record in records] == [
+            ticker["subject"] for ticker in tickers
+        ]
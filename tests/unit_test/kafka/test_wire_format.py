@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from benchmarks.benchmark_utils.payloads import binance_tickers, kucoin_tickers
+from src.kafka.consumers import decode_message
+from src.kafka.producers import AsyncConsolidatedProducer, AsyncRawKucoinProducer
+from src.kafka.wire_format import (
+    WireFormatError,
+    WireSchema,
+    columnar_schema_of,
+    decode_columnar,
+    encode_columnar,
+    latest_schema,
+    pin_schema,
+    register_schema,
+)
+from src.models.binance_model import BinanceRawData
+from src.models.consolidated_model import ConsolidatedPriceData
+from src.models.kucoin_model import KucoinRawData
+from tests.helpers.fakes import FakeMessage
+
+
+def consolidated(arbitrage_bps: Optional[float]) -> ConsolidatedPriceData:
+    return ConsolidatedPriceData(
+        symbol="BTCUSDT",
+        base="BTC",
+        quote="USDT",
+        best_bid=100.5,
+        best_bid_source="binance",
+        best_ask=100.0,
+        best_ask_source="kucoin",
+        last=100.25,
+        last_source="kucoin",
+        spread=-0.5,
+        spread_bps=-49.9,
+        arbitrage_bps=arbitrage_bps,
+        sources=2,
+        time=datetime(2025, 3, 28, 7, 37, 28, 467000),
+        created_at=datetime(2025, 3, 28, 7, 37, 29, 1),
+    )
+
+
+class TestColumnarCodec:
+    def test_round_trips_flat_and_nested_models(self) -> None:
+        binance: list[BinanceRawData] = [
+            BinanceRawData(**ticker) for ticker in binance_tickers(100)
+        ]
+        kucoin: list[KucoinRawData] = [
+            KucoinRawData(**ticker) for ticker in kucoin_tickers(50)
+        ]
+        for batch in (binance, kucoin):
+            schema: WireSchema = latest_schema(type(batch[0]))
+            assert decode_columnar(schema, encode_columnar(schema, batch)) == [
+                record.model_dump() for record in batch
+            ]
+        assert ("data", "price") in [
+            column.path for column in latest_schema(KucoinRawData).columns
+        ]
+
+    def test_optional_and_datetime_columns(self) -> None:
+        schema: WireSchema = latest_schema(ConsolidatedPriceData)
+        batch: list[ConsolidatedPriceData] = [consolidated(None), consolidated(49.9)]
+        decoded: list[dict[str, Any]] = decode_columnar(
+            schema, encode_columnar(schema, batch)
+        )
+        assert [row["arbitrage_bps"] for row in decoded] == [None, 49.9]
+        assert decoded[0]["time"] == datetime(2025, 3, 28, 7, 37, 28, 467000)
+        assert decoded[0]["created_at"].microsecond == 1
+
+    def test_aware_datetimes_are_stored_as_utc(self) -> None:
+        schema: WireSchema = latest_schema(ConsolidatedPriceData)
+        record: ConsolidatedPriceData = consolidated(None).model_copy(
+            update={
+                "time": datetime(2025, 3, 28, 9, 0, tzinfo=timezone(timedelta(hours=2)))
+            }
+        )
+        [decoded] = decode_columnar(schema, encode_columnar(schema, [record]))
+        assert decoded["time"] == datetime(2025, 3, 28, 7, 0)
+
+    def test_is_smaller_than_json(self) -> None:
+        producer = AsyncRawKucoinProducer(
+            {"bootstrap.servers": "localhost:9092", "wire.format": "columnar"}
+        )
+        batch: list[KucoinRawData] = [
+            KucoinRawData(**ticker) for ticker in kucoin_tickers(500)
+        ]
+        payload, headers = producer.encode(batch)
+        assert headers == [("codec", b"columnar"), ("schema", b"KucoinRawData.v1")]
+        assert len(payload) < len(producer.serialize(batch).encode()) / 2
+
+    def test_schemas_are_frozen(self) -> None:
+        schema: WireSchema = latest_schema(BinanceRawData)
+        with pytest.raises(WireFormatError):
+            register_schema(schema._replace(columns=schema.columns[:-1]))
+
+    def test_model_drifting_from_its_pin_fails(self) -> None:
+        class Ticker(BaseModel):
+            symbol: str
+            price: float
+
+        pinned: str = WireSchema.from_model(Ticker, 1).fingerprint
+        assert pin_schema(Ticker, 1, pinned).schema_id == "Ticker.v1"
+
+        class Ticker(BaseModel):  # type: ignore[no-redef]
+            symbol: str
+            price: float
+            volume: Optional[float] = None
+
+        assert WireSchema.from_model(Ticker, 1).fingerprint != pinned
+        with pytest.raises(WireFormatError, match="pinned layout"):
+            pin_schema(Ticker, 1, pinned)
+
+
+class TestWireDetection:
+    def test_consumers_read_json_and_columnar_side_by_side(self) -> None:
+        json_producer = AsyncConsolidatedProducer(
+            {"bootstrap.servers": "localhost:9092"}
+        )
+        columnar_producer = AsyncConsolidatedProducer(
+            {"bootstrap.servers": "localhost:9092", "wire.format": "columnar"}
+        )
+        batch: list[ConsolidatedPriceData] = [consolidated(None)]
+        messages: list[Any] = [
+            FakeMessage(payload, headers=headers)
+            for payload, headers in (
+                json_producer.encode(batch),
+                columnar_producer.encode(batch),
+            )
+        ]
+        json_record, columnar_record = [
+            record
+            for message in messages
+            for record in decode_message(message.value(), message.headers())
+        ]
+        assert json_record["time"] == "2025-03-28T07:37:28.467000"
+        assert columnar_record["time"] == datetime(2025, 3, 28, 7, 37, 28, 467000)
+        assert ConsolidatedPriceData.model_validate(
+            json_record
+        ) == ConsolidatedPriceData.model_validate(columnar_record)
+
+    def test_unknown_codec_or_schema(self) -> None:
+        assert columnar_schema_of(None) is None
+        assert columnar_schema_of([("frame", b"delta")]) is None
+        with pytest.raises(WireFormatError):
+            columnar_schema_of([("codec", b"avro"), ("schema", b"KucoinRawData.v1")])
+        with pytest.raises(WireFormatError):
+            columnar_schema_of(
+                [("codec", b"columnar"), ("schema", b"KucoinRawData.v9")]
+            )
+
+    def test_unknown_wire_format(self) -> None:
+        with pytest.raises(ValueError):
+            AsyncConsolidatedProducer(
+                {"bootstrap.servers": "localhost:9092", "wire.format": "xml"}
+            )
@@ -0,0 +1,111 @@
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+from pydantic import BaseModel
+
+from src.services.batcher.async_batcher import AsyncBatcher
+from src.services.batcher.generic_batcher import GenericBatcher
+from src.utils.metrics import REGISTRY
+
+
+class Tick(BaseModel):
+    symbol: str
+
+
+class TestGenericBatcher:
+    def test_take_batch_hands_over_without_clearing(self) -> None:
+        batcher: GenericBatcher[Tick] = GenericBatcher(batch_size=2, batch_timeout_s=1)
+        batcher.extend([Tick(symbol="BTC-USDT"), Tick(symbol="ETH-USDT")])
+        batch = batcher.take_batch()
+        batcher.append(Tick(symbol="SOL-USDT"))
+        assert [tick.symbol for tick in batch] == ["BTC-USDT", "ETH-USDT"]
+        assert len(batcher) == 1
+
+
+class TestAsyncBatcher:
+    @pytest.fixture
+    def flushed(self) -> list[list[Tick]]:
+        return []
+
+    @pytest.fixture
+    async def batcher(
+        self, flushed: list[list[Tick]]
+    ) -> AsyncIterator[AsyncBatcher[Tick]]:
+        async def on_flush(batch: list[Tick]) -> None:
+            flushed.append(batch)
+
+        batcher: AsyncBatcher[Tick] = AsyncBatcher(
+            batch_size=3,
+            batch_timeout_s=0.05,
+            on_flush=on_flush,
+            max_batch_bytes=16,
+            size_of=lambda tick: len(tick.symbol),
+        )
+        yield batcher
+        await batcher.close()
+
+    async def test_flushes_on_count(
+        self, batcher: AsyncBatcher[Tick], flushed: list[list[Tick]]
+    ) -> None:
+        await batcher.put_many([Tick(symbol="A"), Tick(symbol="B"), Tick(symbol="C")])
+        assert [[tick.symbol for tick in batch] for batch in flushed] == [
+            ["A", "B", "C"]
+        ]
+
+    async def test_splits_put_many_larger_than_batch_size(
+        self, batcher: AsyncBatcher[Tick], flushed: list[list[Tick]]
+    ) -> None:
+        await batcher.put(Tick(symbol="A"))
+        await batcher.put_many([Tick(symbol=symbol) for symbol in "BCDEFGH"])
+        # Each batch is capped at batch_size, the remainder waits for the next batch
+        assert [[tick.symbol for tick in batch] for batch in flushed] == [
+            ["A", "B", "C"],
+            ["D", "E", "F"],
+        ]
+        assert 'batcher_pending_messages{batcher="batcher"} 2' in REGISTRY.render()
+        await batcher.close()
+        assert [tick.symbol for tick in flushed[-1]] == ["G", "H"]
+
+    async def test_flushes_on_bytes(
+        self, batcher: AsyncBatcher[Tick], flushed: list[list[Tick]]
+    ) -> None:
+        await batcher.put(Tick(symbol="BTC-USDT"))
+        await batcher.put(Tick(symbol="ETH-USDT"))
+        assert len(flushed) == 1
+
+    async def test_flushes_idle_stream_on_deadline(
+        self, batcher: AsyncBatcher[Tick], flushed: list[list[Tick]]
+    ) -> None:
+        await batcher.put(Tick(symbol="A"))
+        assert flushed == []
+        # No further messages arrive, the timer alone must flush the partial batch
+        await asyncio.sleep(0.1)
+        assert [[tick.symbol for tick in batch] for batch in flushed] == [["A"]]
+
+    async def test_close_flushes_remainder(
+        self, batcher: AsyncBatcher[Tick], flushed: list[list[Tick]]
+    ) -> None:
+        await batcher.put(Tick(symbol="A"))
+        await batcher.close()
+        assert len(flushed) == 1
+        await asyncio.sleep(0.1)
+        assert len(flushed) == 1
+
+    async def test_pending_gauge_has_a_single_owner(
+        self, batcher: AsyncBatcher[Tick]
+    ) -> None:
+        series: str = 'batcher_pending_messages{batcher="batcher"}'
+
+        async def on_flush(batch: list[Tick]) -> None:
+            pass
+
+        await batcher.put(Tick(symbol="A"))
+        assert f"{series} 1" in REGISTRY.render()
+        with pytest.raises(ValueError):
+            AsyncBatcher(batch_size=3, batch_timeout_s=1, on_flush=on_flush)
+
+        await batcher.close()
+        assert series not in REGISTRY.render()
+        # The name is free again once the owner is closed
+        await AsyncBatcher(batch_size=3, batch_timeout_s=1, on_flush=on_flush).close()
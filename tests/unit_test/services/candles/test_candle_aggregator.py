@@ -0,0 +1,143 @@
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+from src.models.candle_model import CandleData
+from src.services.candles.candle_aggregator import CandleAggregator
+from src.services.loaders.postgres.candle_loader import (
+    CANDLE_COLUMNS,
+    CandleLoader,
+    build_upsert_candles_query,
+)
+from tests.helpers.fakes import FakePool
+
+
+def tick(symbol: str, price: float, time_ms: int) -> dict[str, Any]:
+    return {
+        "symbol": symbol,
+        "price": price,
+        "time": datetime.utcfromtimestamp(time_ms / 1000).isoformat(),
+        "source": "binance",
+    }
+
+
+class TestCandleAggregator:
+    @pytest.fixture
+    def aggregator(self) -> CandleAggregator:
+        return CandleAggregator(intervals=("1s",), allowed_lateness_ms=500)
+
+    def test_bar_closes_once_the_watermark_passes(
+        self, aggregator: CandleAggregator
+    ) -> None:
+        assert (
+            aggregator.apply([tick("BTCUSDT", 100, 0), tick("BTCUSDT", 102, 300)]) == []
+        )
+        # The watermark is at 1000 - 500, the first bar ends at 1000
+        assert aggregator.apply([tick("BTCUSDT", 99, 1000)]) == []
+        [bar] = aggregator.apply([tick("BTCUSDT", 101, 1500)])
+        assert (bar.symbol, bar.source, bar.interval) == ("BTCUSDT", "binance", "1s")
+        assert bar.open_time == datetime(1970, 1, 1)
+        assert bar.close_time == datetime(1970, 1, 1, 0, 0, 1)
+        assert (bar.open, bar.high, bar.low, bar.close, bar.tick_count) == (
+            100,
+            102,
+            100,
+            102,
+            2,
+        )
+
+    def test_out_of_order_ticks_follow_event_time(
+        self, aggregator: CandleAggregator
+    ) -> None:
+        aggregator.apply(
+            [
+                tick("BTCUSDT", 101, 400),
+                tick("BTCUSDT", 100, 100),
+                tick("BTCUSDT", 103, 900),
+                tick("BTCUSDT", 98, 1200),
+                # Behind the newest tick but within the lateness
+                tick("BTCUSDT", 97, 800),
+            ]
+        )
+        [bar] = aggregator.apply([tick("BTCUSDT", 100, 1600)])
+        assert (bar.open, bar.high, bar.low, bar.close, bar.tick_count) == (
+            100,
+            103,
+            97,
+            103,
+            4,
+        )
+        assert aggregator.late_ticks == 0
+
+    def test_ticks_behind_the_watermark_are_dropped(
+        self, aggregator: CandleAggregator
+    ) -> None:
+        aggregator.apply([tick("BTCUSDT", 100, 100), tick("BTCUSDT", 100, 1600)])
+        assert aggregator.apply([tick("BTCUSDT", 50, 200)]) == []
+        assert aggregator.late_ticks == 1
+
+    def test_watermarks_are_per_source(self, aggregator: CandleAggregator) -> None:
+        kucoin_tick: dict[str, Any] = {**tick("BTC-USDT", 100, 100), "source": "kucoin"}
+        # Binance running ahead does not close the Kucoin bar
+        assert aggregator.apply([kucoin_tick, tick("BTCUSDT", 100, 5000)]) == []
+        assert aggregator.watermark("kucoin") == -400
+        [bar] = aggregator.apply([{**kucoin_tick, "time": tick("", 0, 1500)["time"]}])
+        assert (bar.source, bar.symbol) == ("kucoin", "BTC-USDT")
+
+    def test_every_interval_is_built(self) -> None:
+        aggregator = CandleAggregator(intervals=("1s", "1m"), allowed_lateness_ms=0)
+        [first_second] = aggregator.apply(
+            [tick("BTCUSDT", 100, 0), tick("BTCUSDT", 110, 30_000)]
+        )
+        assert first_second.interval == "1s"
+        closed: list[CandleData] = aggregator.apply([tick("BTCUSDT", 90, 60_000)])
+        assert sorted((bar.interval, bar.tick_count) for bar in closed) == [
+            ("1m", 2),
+            ("1s", 1),
+        ]
+
+    def test_open_bars_hold_the_batch_that_opened_them(self) -> None:
+        aggregator = CandleAggregator(intervals=("1s", "1m"), allowed_lateness_ms=0)
+        assert aggregator.oldest_held_batch("binance") is None
+        aggregator.apply([tick("BTCUSDT", 100, 0)], stream="binance")
+        aggregator.apply([tick("BTCUSDT", 101, 500)], stream="binance")
+        assert aggregator.oldest_held_batch("binance") == 0
+        # Closes the first 1s bar, the 1m bar opened by batch 0 is still open
+        aggregator.apply([tick("BTCUSDT", 102, 1000)], stream="binance")
+        assert aggregator.oldest_held_batch("binance") == 0
+        closed: list[CandleData] = aggregator.apply(
+            [tick("BTCUSDT", 103, 60_000)], stream="binance"
+        )
+        assert sorted(bar.interval for bar in closed) == ["1m", "1s"]
+        # Only the bars opened by the last batch are left
+        assert aggregator.oldest_held_batch("binance") == 3
+        assert aggregator.oldest_held_batch("kucoin") is None
+
+    def test_unknown_interval(self) -> None:
+        with pytest.raises(ValueError):
+            CandleAggregator(intervals=("2m",))
+
+
+class TestCandleLoader:
+    def test_upsert_query_keys_on_the_bar(self) -> None:
+        query: str = build_upsert_candles_query("candles")
+        assert "ON CONFLICT (source, symbol, interval, open_time)" in query
+        assert "$11::timestamp[]" in query
+        assert "open_time = EXCLUDED" not in query
+        # A replayed bar rebuilt from part of its ticks never overwrites the full one
+        assert "WHERE candles.tick_count <= EXCLUDED.tick_count" in query
+
+    async def test_writes_one_statement_per_batch(self) -> None:
+        aggregator = CandleAggregator(intervals=("1s",), allowed_lateness_ms=0)
+        aggregator.apply([tick("BTCUSDT", 100, 0), tick("ETHUSDT", 2, 0)])
+        candles: list[CandleData] = aggregator.apply([tick("BTCUSDT", 101, 1000)])
+        loader = CandleLoader("postgresql+asyncpg://localhost:5432/test")
+        pool = FakePool()
+        loader._pool = pool  # type: ignore[assignment]
+
+        assert await loader.write(candles) == 2
+        assert await loader.write([]) == 0
+        [(_, columns)] = pool.connection.executed
+        assert len(columns) == len(CANDLE_COLUMNS)
+        assert sorted(columns[CANDLE_COLUMNS.index("symbol")]) == ["BTCUSDT", "ETHUSDT"]
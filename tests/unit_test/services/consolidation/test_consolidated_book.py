@@ -0,0 +1,117 @@
+from typing import Any
+
+import pytest
+
+from src.services.consolidation.consolidated_book import ConsolidatedBook
+from src.utils.symbol_mapper import (
+    CanonicalSymbol,
+    SymbolMapper,
+    SymbolMapperConfig,
+)
+
+
+def kucoin_ticker(
+    subject: str, bid: str, ask: str, price: str, time: int
+) -> dict[str, Any]:
+    return {
+        "topic": "/market/ticker:all",
+        "type": "message",
+        "subject": subject,
+        "data": {"bestBid": bid, "bestAsk": ask, "price": price, "time": time},
+    }
+
+
+def binance_ticker(symbol: str, close: str, time: int) -> dict[str, Any]:
+    return {"e": "24hrTicker", "s": symbol, "c": close, "E": time}
+
+
+class TestSymbolMapper:
+    def test_maps_both_exchange_formats(self) -> None:
+        mapper = SymbolMapper(
+            SymbolMapperConfig(quotes=["USDT", "USDC", "BTC"], aliases={"XBT": "BTC"})
+        )
+        assert mapper("BTC-USDT") == CanonicalSymbol("BTC", "USDT")
+        assert mapper("BTCUSDT") == CanonicalSymbol("BTC", "USDT")
+        assert mapper("XBT-USDC") == CanonicalSymbol("BTC", "USDC")
+        assert mapper("ETHBTC") == CanonicalSymbol("ETH", "BTC")
+        assert mapper("BTCUSDT").symbol == "BTCUSDT"  # type: ignore[union-attr]
+        assert mapper("ETH-EUR") is None
+        assert mapper("USDT") is None
+
+
+class TestConsolidatedBook:
+    @pytest.fixture
+    def book(self) -> ConsolidatedBook:
+        return ConsolidatedBook(
+            mapper=SymbolMapper(SymbolMapperConfig(quotes=["USDT"])),
+            max_quote_age_ms=1000,
+        )
+
+    def test_single_source_is_not_emitted(self, book: ConsolidatedBook) -> None:
+        assert (
+            book.apply_kucoin([kucoin_ticker("BTC-USDT", "99", "101", "100", 0)]) == []
+        )
+
+    def test_best_quote_across_sources(self, book: ConsolidatedBook) -> None:
+        book.apply_kucoin([kucoin_ticker("BTC-USDT", "99", "101", "100", 0)])
+        [consolidated] = book.apply_binance([binance_ticker("BTCUSDT", "100.5", 10)])
+        assert consolidated.symbol == "BTCUSDT"
+        # Binance has no book, its last price never stands in for a bid or an ask
+        assert (consolidated.best_bid, consolidated.best_bid_source) == (99.0, "kucoin")
+        assert (consolidated.best_ask, consolidated.best_ask_source) == (
+            101.0,
+            "kucoin",
+        )
+        assert (consolidated.last, consolidated.last_source) == (100.5, "binance")
+        assert consolidated.sources == 2
+        assert consolidated.arbitrage_bps is None
+
+    def test_last_price_only_sources_never_report_arbitrage(
+        self, book: ConsolidatedBook
+    ) -> None:
+        book.apply_binance([binance_ticker("BTCUSDT", "98", 0)])
+        [consolidated] = book.apply_kucoin(
+            [kucoin_ticker("BTC-USDT", "99", "101", "99.5", 10)]
+        )
+        assert consolidated.spread == 2.0
+        assert consolidated.arbitrage_bps is None
+
+    def test_pair_without_a_book_is_not_emitted(self, book: ConsolidatedBook) -> None:
+        book.update("okx", "BTC-USDT", None, None, 100.0, 0)
+        assert book.apply_binance([binance_ticker("BTCUSDT", "100", 10)]) == []
+
+    def test_crossed_books_report_arbitrage(self, book: ConsolidatedBook) -> None:
+        book.update("okx", "BTC-USDT", 97.0, 98.0, 97.5, 0)
+        [consolidated] = book.apply_kucoin(
+            [kucoin_ticker("BTC-USDT", "99", "101", "99.5", 10)]
+        )
+        # Buy on okx at 98, sell on kucoin at 99
+        assert consolidated.spread == -1.0
+        assert (consolidated.best_bid_source, consolidated.best_ask_source) == (
+            "kucoin",
+            "okx",
+        )
+        assert consolidated.arbitrage_bps == pytest.approx(10_000 / 98)
+
+    def test_only_changes_are_emitted_once_per_batch(
+        self, book: ConsolidatedBook
+    ) -> None:
+        book.apply_binance([binance_ticker("BTCUSDT", "100", 0)])
+        emitted = book.apply_kucoin(
+            [
+                kucoin_ticker("BTC-USDT", "99", "101", "100", 1),
+                kucoin_ticker("BTC-USDT", "99", "102", "100", 2),
+            ]
+        )
+        assert len(emitted) == 1
+        # Same quotes, only the time moved
+        assert (
+            book.apply_kucoin([kucoin_ticker("BTC-USDT", "99", "102", "100", 3)]) == []
+        )
+
+    def test_stale_quotes_are_ignored(self, book: ConsolidatedBook) -> None:
+        book.apply_binance([binance_ticker("BTCUSDT", "100", 0)])
+        assert (
+            book.apply_kucoin([kucoin_ticker("BTC-USDT", "99", "101", "100", 5000)])
+            == []
+        )
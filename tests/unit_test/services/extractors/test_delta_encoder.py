@@ -0,0 +1,213 @@
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+import pytest
+
+from database.tables import binance_table
+from src.common.decoders import json_dumps
+from src.kafka.consumers import BinanceRawConsumer
+from src.models.binance_model import BinanceRawData, BinanceTransformedData
+from src.models.candle_model import CandleData
+from src.services.candles.candle_aggregator import CandleAggregator
+from src.services.loaders.postgres.partition_manager import PricePartitionManager
+from src.services.loaders.postgres.postgres_loader import PostgresLoader
+from src.services.transformers.pandas_transformer import PandasTransformer
+from src.services.extractors.delta_encoder import (
+    BinanceDeltaEncoder,
+    DeltaEncoderParams,
+    EncodedFrame,
+    SnapshotState,
+    ticker_values,
+)
+from tests.helpers.fakes import FakeMessage, FakePool
+
+
+def ticker(symbol: str, close: str, time: int) -> BinanceRawData:
+    return BinanceRawData(
+        e="24hrMiniTicker",
+        E=time,
+        s=symbol,
+        c=close,
+        o="1",
+        h="2",
+        l="0.5",
+        v="10",
+        q="10",
+    )
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now: float = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestBinanceDeltaEncoder:
+    @pytest.fixture
+    def clock(self) -> FakeClock:
+        return FakeClock()
+
+    @pytest.fixture
+    def encoder(self, clock: FakeClock) -> BinanceDeltaEncoder:
+        return BinanceDeltaEncoder(
+            DeltaEncoderParams(keyframe_interval_s=10), clock=clock
+        )
+
+    def test_first_frame_is_a_keyframe(self, encoder: BinanceDeltaEncoder) -> None:
+        frame = encoder.encode([ticker("BTCUSDT", "1", 0), ticker("ETHUSDT", "1", 0)])
+        assert frame is not None
+        assert (frame.kind, frame.sequence, len(frame.records)) == ("keyframe", 1, 2)
+        assert frame.headers == [("frame", b"keyframe"), ("sequence", b"1")]
+
+    def test_only_changed_tickers_are_forwarded(
+        self, encoder: BinanceDeltaEncoder, clock: FakeClock
+    ) -> None:
+        encoder.encode([ticker("BTCUSDT", "1", 0), ticker("ETHUSDT", "1", 0)])
+        clock.now = 1
+        frame = encoder.encode([ticker("BTCUSDT", "2", 1), ticker("ETHUSDT", "1", 1)])
+        assert frame is not None
+        assert frame.kind == "delta"
+        assert [record.s for record in frame.records] == ["BTCUSDT"]
+        # Only the event time moved, nothing to send and the sequence does not move
+        clock.now = 2
+        assert encoder.encode([ticker("BTCUSDT", "2", 2)]) is None
+        clock.now = 3
+        next_frame = encoder.encode([ticker("ETHUSDT", "3", 3)])
+        assert next_frame is not None and next_frame.sequence == 3
+        assert (encoder.records_in, encoder.records_out) == (6, 4)
+
+    def test_keyframe_carries_every_known_symbol(
+        self, encoder: BinanceDeltaEncoder, clock: FakeClock
+    ) -> None:
+        encoder.encode([ticker("BTCUSDT", "1", 0), ticker("ETHUSDT", "1", 0)])
+        clock.now = 10
+        frame = encoder.encode([ticker("BTCUSDT", "1", 10), ticker("SOLUSDT", "1", 10)])
+        assert frame is not None
+        assert frame.kind == "keyframe"
+        # Only the new ticker is a tick, the unchanged ones travel as a carryover
+        assert [record.s for record in frame.records] == ["SOLUSDT"]
+        assert sorted(record.s for record in frame.carried) == ["BTCUSDT", "ETHUSDT"]
+        assert frame.carried_headers == [("frame", b"carryover"), ("sequence", b"2")]
+
+    def test_replay_rebuilds_the_market(
+        self, encoder: BinanceDeltaEncoder, clock: FakeClock
+    ) -> None:
+        rng = random.Random(7)
+        symbols: list[str] = [f"S{index}USDT" for index in range(20)]
+        market: dict[str, BinanceRawData] = {}
+        state = SnapshotState()
+        late_joiner = SnapshotState()
+        for second in range(60):
+            clock.now = second
+            frame_records: list[BinanceRawData] = [
+                ticker(symbol, str(rng.choice([1, 1, 1, 2])), second)
+                for symbol in rng.sample(symbols, 15)
+            ]
+            market.update((record.s, record) for record in frame_records)
+            frame: Optional[EncodedFrame] = encoder.encode(frame_records)
+            if frame is None:
+                continue
+            for rebuilt, joined_at in ((state, 0), (late_joiner, 25)):
+                if second >= joined_at:
+                    if frame.carried:
+                        rebuilt.apply("carryover", list(frame.carried))
+                    rebuilt.apply(frame.kind, frame.records)
+            for rebuilt in (state, late_joiner):
+                if rebuilt.synced:
+                    assert {
+                        symbol: ticker_values(record)
+                        for symbol, record in rebuilt.snapshot().items()
+                    } == {
+                        symbol: ticker_values(record)
+                        for symbol, record in market.items()
+                    }
+        assert late_joiner.synced
+        assert encoder.records_out < encoder.records_in
+
+
+class TestKeyframeDownstream:
+    async def test_carried_tickers_are_not_ticks_again(self) -> None:
+        clock = FakeClock()
+        encoder = BinanceDeltaEncoder(
+            DeltaEncoderParams(keyframe_interval_s=30), clock=clock
+        )
+        start_ms: int = int(time.time() * 1000) // 1000 * 1000
+        messages: list[FakeMessage] = []
+        for second, frame_records in enumerate(
+            [
+                [ticker("BTCUSDT", "1", start_ms), ticker("ETHUSDT", "1", start_ms)],
+                [ticker("BTCUSDT", "2", start_ms + 1000)],
+                # Keyframe: ETHUSDT moved, BTCUSDT is carried over
+                [ticker("ETHUSDT", "2", start_ms + 30_000)],
+            ]
+        ):
+            clock.now = second * 15
+            frame: Optional[EncodedFrame] = encoder.encode(frame_records)
+            assert frame is not None
+            if frame.carried:
+                messages.append(
+                    FakeMessage(
+                        json_dumps([record.model_dump() for record in frame.carried]),
+                        len(messages),
+                        headers=frame.carried_headers,
+                    )
+                )
+            messages.append(
+                FakeMessage(
+                    json_dumps([record.model_dump() for record in frame.records]),
+                    len(messages),
+                    headers=frame.headers,
+                )
+            )
+        assert [message.headers()[0][1] for message in messages] == [
+            b"keyframe",
+            b"delta",
+            b"carryover",
+            b"keyframe",
+        ]
+
+        consumer = BinanceRawConsumer(
+            {"bootstrap.servers": "localhost:9092", "group.id": "test-delta-encoder"}
+        )
+        try:
+            raw_records: list[dict[str, Any]] = consumer.decode_records(
+                messages  # type: ignore[arg-type]
+            )
+        finally:
+            consumer.close()
+        transformed: list[BinanceTransformedData] = (
+            PandasTransformer().transform_binance(raw_records)
+        )
+        ticks: list[tuple[str, datetime]] = [
+            (record.symbol, record.time) for record in transformed
+        ]
+        assert len(ticks) == len(set(ticks)) == 4
+
+        pool = FakePool()
+        loader = PostgresLoader(
+            connection_string="postgresql://localhost:5432/crypto-prices-rt",
+            table=binance_table,
+            history=PricePartitionManager(retention_days=7),
+        )
+        loader._pool = pool  # type: ignore[assignment]
+        await loader.write_batch(transformed)
+        [(_, history_rows)] = pool.connection.copied
+        assert len(history_rows) == 4
+
+        aggregator = CandleAggregator(intervals=("1m",), allowed_lateness_ms=0)
+        bars: list[CandleData] = aggregator.apply(
+            [record.model_dump() for record in transformed]
+        )
+        bars += aggregator.apply(
+            [
+                {
+                    **transformed[0].model_dump(),
+                    "time": transformed[0].time + timedelta(minutes=2),
+                }
+            ]
+        )
+        assert sum(bar.tick_count for bar in bars) == 4
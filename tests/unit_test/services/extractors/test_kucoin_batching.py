@@ -0,0 +1,76 @@
+import asyncio
+import json
+from typing import AsyncIterator
+
+import pytest
+from aiohttp import WSMessage, WSMsgType
+
+from benchmarks.benchmark_utils.payloads import kucoin_tickers
+from src.common.decoders import build_decoder
+from src.models.kucoin_model import KucoinRawData
+from src.services.extractors.kucoin_extractor import KucoinExtractor
+
+
+class FakeWebSocket:
+    """
+    Stands in for aiohttp's ClientWebSocketResponse, frames are released by the test
+    """
+
+    def __init__(self) -> None:
+        self.frames: asyncio.Queue[WSMessage | None] = asyncio.Queue()
+
+    def send(self, *payloads: str) -> None:
+        for payload in payloads:
+            self.frames.put_nowait(WSMessage(WSMsgType.TEXT, payload, None))
+
+    def end(self) -> None:
+        self.frames.put_nowait(None)
+
+    def __aiter__(self) -> "FakeWebSocket":
+        return self
+
+    async def __anext__(self) -> WSMessage:
+        msg: WSMessage | None = await self.frames.get()
+        if msg is None:
+            raise StopAsyncIteration
+        return msg
+
+
+class TestKucoinBatching:
+    @pytest.fixture
+    def ws(self) -> FakeWebSocket:
+        return FakeWebSocket()
+
+    @pytest.fixture
+    def batches(self, ws: FakeWebSocket) -> AsyncIterator[list[KucoinRawData]]:
+        decoder = build_decoder(
+            KucoinRawData, "trusted", is_array=False, required_keys=("subject", "data")
+        )
+        return KucoinExtractor()._read_batches(ws, decoder, max_batch_size=3)  # type: ignore[arg-type]
+
+    async def test_frames_queued_meanwhile_join_one_batch(
+        self, ws: FakeWebSocket, batches: AsyncIterator[list[KucoinRawData]]
+    ) -> None:
+        ws.send(*[json.dumps(ticker) for ticker in kucoin_tickers(5)])
+        ws.end()
+        # Let the pump read everything before the first batch is taken
+        first: asyncio.Task[list[KucoinRawData]] = asyncio.create_task(
+            batches.__anext__()
+        )
+        await asyncio.sleep(0.01)
+        sizes: list[int] = [len(await first)] + [len(batch) async for batch in batches]
+        assert sizes == [3, 2]
+
+    async def test_waits_for_the_next_frame_then_ends_with_the_session(
+        self, ws: FakeWebSocket, batches: AsyncIterator[list[KucoinRawData]]
+    ) -> None:
+        next_batch: asyncio.Task[list[KucoinRawData]] = asyncio.create_task(
+            batches.__anext__()
+        )
+        await asyncio.sleep(0.01)
+        assert not next_batch.done()
+        ws.send(json.dumps(kucoin_tickers(1)[0]))
+        assert [ticker.subject for ticker in await next_batch] == ["SYM0-USDT"]
+        ws.end()
+        with pytest.raises(StopAsyncIteration):
+            await batches.__anext__()
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytest
+
+from src.services.loaders.s3.archive_writer import (
+    ARCHIVE_WRITERS,
+    get_archive_writer,
+    writer_for_key,
+)
+from src.utils.s3_key_builder import build_s3_key, parse_s3_key_time
+
+KUCOIN_RECORDS: list[dict] = [
+    {
+        "topic": "/market/ticker:all",
+        "type": "message",
+        "subject": "BTC-USDT",
+        "data": {"price": "85439.99", "time": 1743147198992},
+    },
+    {
+        "topic": "/market/ticker:all",
+        "type": "message",
+        "subject": "ETH-USDT",
+        "data": {"price": "1916.44", "time": 1743147198993},
+    },
+]
+
+
+class TestArchiveWriter:
+    @pytest.mark.parametrize("archive_format", list(ARCHIVE_WRITERS))
+    def test_round_trip(self, archive_format: str) -> None:
+        writer = get_archive_writer(archive_format)
+        key = build_s3_key(
+            "kucoin", datetime(2025, 5, 7, 15, 4, 59), "3f9a1c2e", 42, writer.extension
+        )
+        assert (
+            writer_for_key(key).decode(writer.encode(KUCOIN_RECORDS)) == KUCOIN_RECORDS
+        )
+
+
+class TestS3KeyBuilder:
+    def test_partitioned_key(self) -> None:
+        key = build_s3_key(
+            "binance", datetime(2025, 5, 7, 15, 4, 59), "3f9a1c2e", 42, ".ndjson.gz"
+        )
+        assert (
+            key == "binance/2025-05-07/15/2025-05-07T15-04-59_3f9a1c2e_000042.ndjson.gz"
+        )
+        assert parse_s3_key_time(key) == datetime(2025, 5, 7, 15, 4, 59)
+
+    def test_legacy_key(self) -> None:
+        assert parse_s3_key_time("binance/2025-05-07T15-04-59.json") == datetime(
+            2025, 5, 7, 15, 4, 59
+        )
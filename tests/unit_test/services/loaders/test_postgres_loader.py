@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from database.tables import binance_table
+from src.models.binance_model import BinanceTransformedData
+from src.services.loaders.postgres.partition_manager import PricePartitionManager
+from src.services.loaders.postgres.postgres_loader import (
+    PostgresLoader,
+    asyncpg_dsn,
+)
+from tests.helpers.fakes import FakeConnection, FakePool
+
+
+def make_record(symbol: str, price: float, second: int) -> BinanceTransformedData:
+    return BinanceTransformedData(
+        symbol=symbol,
+        price=price,
+        time=datetime(2025, 3, 28, 7, 0, second),
+        source="binance",
+        created_at=datetime(2025, 3, 28, 7, 1),
+    )
+
+
+class TestPostgresLoader:
+    @pytest.fixture
+    def pool(self) -> FakePool:
+        return FakePool()
+
+    @pytest.fixture
+    def loader(self, pool: FakePool) -> PostgresLoader:
+        loader = PostgresLoader(
+            connection_string="postgresql+asyncpg://localhost:5432/crypto-prices-rt",
+            table=binance_table,
+        )
+        loader._pool = pool  # type: ignore[assignment]
+        return loader
+
+    def test_asyncpg_dsn(self) -> None:
+        assert (
+            asyncpg_dsn("postgresql+asyncpg://user@localhost:5432/db")
+            == "postgresql://user@localhost:5432/db"
+        )
+        assert asyncpg_dsn("postgresql://localhost/db") == "postgresql://localhost/db"
+
+    async def test_upsert_is_one_statement_per_batch(
+        self, loader: PostgresLoader, pool: FakePool
+    ) -> None:
+        records = [
+            make_record("BTCUSDT", 85000.0, 1),
+            make_record("ETHUSDT", 1900.0, 1),
+            make_record("BTCUSDT", 85001.0, 2),
+        ]
+        assert await loader.upsert_latest(records) == 3
+        assert len(pool.connection.executed) == 1
+        query, args = pool.connection.executed[0]
+        assert "INSERT INTO binance_result" in query
+        assert "DISTINCT ON (symbol)" in query
+        assert "ON CONFLICT (symbol)" in query
+        assert args[0] == ["BTCUSDT", "ETHUSDT", "BTCUSDT"]
+        assert args[1] == [85000.0, 1900.0, 85001.0]
+        assert args[2][2] == datetime(2025, 3, 28, 7, 0, 2)
+
+    async def test_empty_batch_skips_the_database(
+        self, loader: PostgresLoader, pool: FakePool
+    ) -> None:
+        assert await loader.upsert_latest([]) == 0
+        assert pool.connection.executed == []
+
+
+class TestPricePartitionManager:
+    @pytest.fixture
+    def manager(self) -> PricePartitionManager:
+        return PricePartitionManager(premake_days=2, retention_days=7)
+
+    async def test_maintain_premakes_and_drops_expired(
+        self, manager: PricePartitionManager
+    ) -> None:
+        connection = FakeConnection()
+        connection.partitions = [
+            "price_history_p20250301",
+            "price_history_p20250325",
+            "price_history_default",
+        ]
+        await manager.maintain(connection, today=date(2025, 3, 28))  # type: ignore[arg-type]
+        statements: list[str] = [query for query, _ in connection.executed]
+        created: list[str] = [s for s in statements if s.startswith("CREATE TABLE")]
+        assert [s.split()[5] for s in created] == [
+            "price_history_p20250328",
+            "price_history_p20250329",
+            "price_history_p20250330",
+        ]
+        assert "FROM ('2025-03-30') TO ('2025-03-31')" in created[-1]
+        assert "DETACH PARTITION price_history_p20250301" in " ".join(statements)
+        assert "DROP TABLE IF EXISTS price_history_p20250301" in statements
+        assert not any("p20250325" in s or "default" in s for s in statements)
+
+    async def test_ensure_partitions_is_cached(
+        self, manager: PricePartitionManager
+    ) -> None:
+        connection = FakeConnection()
+        today: date = datetime.utcnow().date()
+        await manager.ensure_partitions(connection, [today, today - timedelta(days=30)])  # type: ignore[arg-type]
+        await manager.ensure_partitions(connection, [today])  # type: ignore[arg-type]
+        assert len(connection.executed) == 1
+        query, _ = connection.executed[0]
+        assert f"price_history_p{today:%Y%m%d} PARTITION OF price_history" in query
+        assert manager.missing_days([today]) == []
+
+
+class TestPostgresLoaderHistory:
+    async def test_write_batch_copies_history_and_upserts(self) -> None:
+        pool = FakePool()
+        loader = PostgresLoader(
+            connection_string="postgresql://localhost:5432/crypto-prices-rt",
+            table=binance_table,
+            history=PricePartitionManager(retention_days=7),
+        )
+        loader._pool = pool  # type: ignore[assignment]
+        now: datetime = datetime.utcnow().replace(microsecond=0)
+        records = [
+            make_record("BTCUSDT", 85000.0, 1).model_copy(update={"time": now}),
+            make_record("ETHUSDT", 1900.0, 1).model_copy(
+                update={"time": now - timedelta(days=30)}
+            ),
+        ]
+        assert await loader.write_batch(records) == 2
+        # The tick past retention is only upserted, never appended to history
+        assert pool.connection.copied == [
+            (
+                "price_history",
+                [("BTCUSDT", 85000.0, now, "binance", records[0].created_at)],
+            )
+        ]
+        statements: list[str] = [query for query, _ in pool.connection.executed]
+        assert statements[0].startswith("CREATE TABLE IF NOT EXISTS price_history_p")
+        assert "INSERT INTO binance_result" in statements[-1]
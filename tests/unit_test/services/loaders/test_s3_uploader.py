@@ -1,12 +1,226 @@
+import os
+from datetime import datetime
+from typing import Callable, Iterator
+
+import boto3
 import pytest
+from moto import mock_aws
 
+from src.services.loaders.s3.s3_explorer import S3Explorer
+from src.services.loaders.s3.s3_manifest import S3Manifest
+from src.services.loaders.s3.s3_object_cache import S3ObjectCache
+from src.services.loaders.s3.s3_uploader_pool import S3UploaderPool
 
-ENDPOINT_URL: str = "localhost:9001"
 ACCESS_KEY_ID: str = "my_dummy_access_key"
 SECRET_ACCESS_KEY_ID: str = "my_dummy_password"
 
 
-class TestS3UploaderThread:
+@pytest.fixture
+def bucket_name() -> str:
+    return "cryptopricesrt-test"
+
+
+@pytest.fixture
+def explorer(bucket_name: str, monkeypatch: pytest.MonkeyPatch) -> Iterator[S3Explorer]:
+    # moto only intercepts the default AWS endpoint, so no Minio endpoint here
+    monkeypatch.delenv("MINIO_ENDPOINT_URL", raising=False)
+    monkeypatch.setenv("MINIO_BUCKET", bucket_name)
+    monkeypatch.setenv("MINIO_ACCESS_KEY", ACCESS_KEY_ID)
+    monkeypatch.setenv("MINIO_SECRET_KEY", SECRET_ACCESS_KEY_ID)
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=bucket_name)
+        yield S3Explorer(
+            multipart_threshold_bytes=5 * 1024 * 1024,
+            multipart_chunk_bytes=5 * 1024 * 1024,
+        )
+
+
+class TestS3UploaderPool:
+    def test_uploads_every_source_in_parallel(self, explorer: S3Explorer) -> None:
+        pool = S3UploaderPool(
+            uploader=explorer, batch_size=2, batch_timeout_s=60, max_workers=4
+        )
+        pool.start()
+        # Every batch lands in the same second, keys must still not collide
+        timestamp = datetime(2025, 5, 23, 10, 0, 0)
+        for _ in range(4):
+            pool.submit(
+                "binance",
+                [
+                    {"s": "BTCUSDT", "E": 1748000000000},
+                    {"s": "ETHUSDT", "E": 1748000000001},
+                ],
+                timestamp,
+            )
+            pool.submit(
+                "kucoin",
+                [{"subject": "BTC-USDT", "data": {"time": 1748000000000}}],
+                timestamp,
+            )
+        pool.stop()
+        pool.join()
+
+        binance = explorer.download_batch(
+            "binance", datetime(2025, 5, 23), datetime(2025, 5, 24)
+        )
+        kucoin = explorer.download_batch(
+            "kucoin", datetime(2025, 5, 23), datetime(2025, 5, 24)
+        )
+        assert len(binance) == 8
+        assert len(kucoin) == 4
+
+    def test_large_batch_uses_multipart(self, explorer: S3Explorer) -> None:
+        # Incompressible padding so the gzipped object stays above the 5MB multipart threshold
+        records = [
+            {"s": "BTCUSDT", "E": 1748000000000, "padding": os.urandom(500).hex()}
+            for _ in range(12000)
+        ]
+        timestamp = datetime(2025, 5, 23, 11, 0, 0)
+        explorer.upload_batch("binance", records, timestamp)
+
+        key = next(
+            explorer.list_files_with_range(
+                "binance", datetime(2025, 5, 23, 11), datetime(2025, 5, 23, 12)
+            )
+        )
+        head = explorer.client.head_object(Bucket=explorer.bucket, Key=key)
+        # Multipart ETags carry a -<part count> suffix
+        assert "-" in head["ETag"]
+        assert head["Metadata"]["row-count"] == "12000"
+        records = explorer.download_batch(
+            "binance", datetime(2025, 5, 23, 11), datetime(2025, 5, 23, 12)
+        )
+        assert len(records) == 12000
+
+
+class TestS3ExplorerDownload:
     @pytest.fixture
-    def bucket_name(self) -> str:
-        pass
+    def uploaded(self, explorer: S3Explorer) -> list[int]:
+        """
+        Five objects of three records each, E encodes (object, record) to check ordering
+        """
+        for index in range(5):
+            explorer.upload_batch(
+                "binance",
+                [{"s": "BTCUSDT", "E": index * 10 + offset} for offset in range(3)],
+                datetime(2025, 5, 23, 10, index, 0),
+            )
+        return [index * 10 + offset for index in range(5) for offset in range(3)]
+
+    def test_ordered_stream_is_bounded_by_batch_size(
+        self, explorer: S3Explorer, uploaded: list[int]
+    ) -> None:
+        batches = list(
+            explorer.iter_batches(
+                "binance",
+                datetime(2025, 5, 23),
+                datetime(2025, 5, 24),
+                batch_size=2,
+                max_concurrency=3,
+                prefetch=2,
+            )
+        )
+        assert all(len(batch) <= 2 for batch in batches)
+        assert [record["E"] for batch in batches for record in batch] == uploaded
+
+    def test_unordered_stream_yields_every_record(
+        self, explorer: S3Explorer, uploaded: list[int]
+    ) -> None:
+        records = [
+            record
+            for batch in explorer.iter_batches(
+                "binance", datetime(2025, 5, 23), ordered=False
+            )
+            for record in batch
+        ]
+        assert sorted(record["E"] for record in records) == uploaded
+
+
+class TestS3ExplorerRangeLookup:
+    @pytest.fixture
+    def manifest(self, tmp_path) -> Iterator[S3Manifest]:
+        manifest = S3Manifest(str(tmp_path / "manifest.sqlite"))
+        yield manifest
+        manifest.close()
+
+    def test_lists_only_overlapping_prefixes(self, explorer: S3Explorer) -> None:
+        for hour in (9, 10, 11):
+            explorer.upload_batch(
+                "binance", [{"s": "BTCUSDT", "E": hour}], datetime(2025, 5, 23, hour)
+            )
+        # Written before partitioning, must still be found
+        explorer.client.put_object(
+            Bucket=explorer.bucket, Key="binance/2025-05-23T10-30-00.json", Body=b"[]"
+        )
+        keys = list(
+            explorer.list_files_with_range(
+                "binance", datetime(2025, 5, 23, 10), datetime(2025, 5, 23, 10, 59)
+            )
+        )
+        assert keys[0] == "binance/2025-05-23T10-30-00.json"
+        assert [key.split("/")[2] for key in keys[1:]] == ["10"]
+
+    def test_manifest_answers_range_lookups(
+        self, explorer: S3Explorer, manifest: S3Manifest
+    ) -> None:
+        explorer._manifest = manifest
+        key = explorer.upload_batch(
+            "kucoin",
+            [{"subject": "BTC-USDT", "data": {"time": 1748000000000}}],
+            datetime(2025, 5, 23, 10),
+        )
+        (entry,) = manifest.entries_in_range(
+            "kucoin", datetime(2025, 5, 23), datetime(2025, 5, 24)
+        )
+        assert entry.key == key
+        assert entry.row_count == 1
+        assert entry.etag is not None
+        # Deleted from the bucket behind the manifest's back, the lookup must not hit S3
+        explorer.client.delete_object(Bucket=explorer.bucket, Key=key)
+        assert list(
+            explorer.list_files_with_range(
+                "kucoin", datetime(2025, 5, 23), datetime(2025, 5, 24)
+            )
+        ) == [key]
+
+
+class TestS3ObjectCache:
+    def test_read_through_and_lru_eviction(self, tmp_path) -> None:
+        cache = S3ObjectCache(str(tmp_path), max_bytes=10)
+        loads: list[str] = []
+
+        def loader(body: bytes) -> Callable[[], bytes]:
+            def load() -> bytes:
+                loads.append(body.decode())
+                return body
+
+            return load
+
+        first = cache.fetch("binance/a", '"etag-a"', loader(b"aaaa"))
+        assert cache.fetch("binance/a", '"etag-a"', loader(b"aaaa")) == first
+        with cache.open(first) as body:
+            assert body[:] == b"aaaa"
+        # Same key with a new ETag is a different object
+        cache.fetch("binance/a", '"etag-b"', loader(b"bbbb"))
+        # Pushes the cache over 10 bytes, the least recently used object goes
+        cache.fetch("binance/c", '"etag-c"', loader(b"cccc"))
+        assert loads == ["aaaa", "bbbb", "cccc"]
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 3
+        assert cache.stats()["bytes"] <= 10
+
+    def test_explorer_serves_repeat_reads_from_cache(
+        self, explorer: S3Explorer, tmp_path
+    ) -> None:
+        explorer._cache = S3ObjectCache(str(tmp_path), max_bytes=1024**2)
+        explorer.upload_batch(
+            "binance", [{"s": "BTCUSDT", "E": 1}], datetime(2025, 5, 23, 10)
+        )
+        for _ in range(2):
+            records = explorer.download_batch(
+                "binance", datetime(2025, 5, 23), datetime(2025, 5, 24)
+            )
+            assert records == [{"s": "BTCUSDT", "E": 1}]
+        assert explorer.cache_stats()["hits"] == 1
+        assert explorer.cache_stats()["misses"] == 1
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Any, AsyncIterator
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.services.serving.latest_price_store import (
+    MERGED,
+    LatestPriceStore,
+    PriceTick,
+    epoch_ms,
+)
+from src.services.serving.price_server import build_app
+
+
+@pytest.fixture
+def store() -> LatestPriceStore:
+    store = LatestPriceStore()
+    store.update_many(
+        [
+            {
+                "symbol": "BTCUSDT",
+                "price": 85000.0,
+                "time": "2025-03-28T07:37:28.467000",
+                "source": "binance",
+            },
+            {
+                "symbol": "BTCUSDT",
+                "price": 85010.0,
+                "time": "2025-03-28T07:37:29",
+                "source": "kucoin",
+            },
+            {
+                "symbol": "ETHUSDT",
+                "price": 1900.0,
+                "time": datetime(2025, 3, 28, 7, 37, 27),
+                "source": "kucoin",
+            },
+        ]
+    )
+    return store
+
+
+class TestLatestPriceStore:
+    def test_epoch_ms(self) -> None:
+        assert epoch_ms("2025-03-28T07:37:28.467000") == 1743147448467
+        assert epoch_ms(datetime(2025, 3, 28, 7, 37, 28, 467000)) == 1743147448467
+
+    def test_views(self, store: LatestPriceStore) -> None:
+        assert store.get("BTCUSDT", "binance") == PriceTick(
+            "BTCUSDT", 85000.0, 1743147448467, "binance"
+        )
+        # Merged keeps the most recent tick across sources
+        assert store.get("BTCUSDT").source == "kucoin"  # type: ignore[union-attr]
+        assert store.get("ETHUSDT", "binance") is None
+        assert [tick.symbol for tick in store.get_many(["ETHUSDT", "XRPUSDT"])] == [
+            "ETHUSDT"
+        ]
+        assert sorted(store.sources) == ["binance", "kucoin"]
+        assert store.size() == 2 and store.size("binance") == 1
+
+    def test_older_tick_does_not_replace_merged(self, store: LatestPriceStore) -> None:
+        store.update("BTCUSDT", 1.0, 1743147448000, "binance")
+        assert store.get("BTCUSDT").price == 85010.0  # type: ignore[union-attr]
+        assert store.get("BTCUSDT", "binance").price == 1.0  # type: ignore[union-attr]
+
+    def test_snapshot_json_is_cached_per_version(self, store: LatestPriceStore) -> None:
+        first: bytes = store.snapshot_json()
+        assert store.snapshot_json() is first
+        store.update("XRPUSDT", 2.0, 1743147449000, "kucoin")
+        assert b"XRPUSDT" in store.snapshot_json()
+
+
+class TestPriceServer:
+    @pytest.fixture
+    async def client(self, store: LatestPriceStore) -> AsyncIterator[TestClient]:
+        client = TestClient(TestServer(build_app(store)))
+        await client.start_server()
+        yield client
+        await client.close()
+
+    async def test_single_symbol(self, client: TestClient) -> None:
+        response = await client.get("/prices/btcusdt", params={"source": "binance"})
+        assert response.status == 200
+        body: dict[str, Any] = await response.json()
+        assert body == {
+            "symbol": "BTCUSDT",
+            "price": 85000.0,
+            "time_ms": 1743147448467,
+            "source": "binance",
+        }
+        missing = await client.get("/prices/DOGEUSDT")
+        assert missing.status == 404
+
+    async def test_multi_symbol_and_full_market(self, client: TestClient) -> None:
+        response = await client.get("/prices", params={"symbols": "BTCUSDT,ETHUSDT"})
+        assert [tick["symbol"] for tick in await response.json()] == [
+            "BTCUSDT",
+            "ETHUSDT",
+        ]
+        full = await client.get("/prices", params={"source": "kucoin"})
+        assert len(await full.json()) == 2
+        health = await client.get("/health")
+        assert (await health.json())["symbols"][MERGED] == 2
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytest
+
+from benchmarks.benchmark_utils.payloads import (
+    BINANCE_RECORDED_TICKERS,
+    KUCOIN_RECORDED_TICKERS,
+)
+from src.services.transformers.pandas_transformer import PandasTransformer
+
+
+class TestPandasTransformer:
+    @pytest.fixture
+    def transformer(self) -> PandasTransformer:
+        return PandasTransformer()
+
+    def test_transform_kucoin(self, transformer: PandasTransformer) -> None:
+        records = [ticker for ticker in KUCOIN_RECORDED_TICKERS if "subject" in ticker]
+        records.append({"subject": "ETH-BTC", "data": {"price": "0.02", "time": 1}})
+        transformed = transformer.transform_kucoin(records)
+        assert [row.symbol for row in transformed] == ["CROUSDT", "ADAUSDC"]
+        assert transformed[0].price == pytest.approx(0.10604)
+        assert transformed[0].time == datetime(2025, 3, 28, 7, 33, 18, 992000)
+        assert transformed[0].source == "kucoin"
+
+    def test_transform_binance(self, transformer: PandasTransformer) -> None:
+        records = BINANCE_RECORDED_TICKERS + [{"s": "BNBBTC", "c": "0.0025", "E": 1}]
+        transformed = transformer.transform_binance(records)
+        assert [row.symbol for row in transformed] == ["BTCUSDT", "ETHUSDT"]
+        assert transformed[0].price == pytest.approx(85439.99)
+        assert transformed[0].time == datetime(2025, 3, 28, 7, 37, 28, 467000)
+
+    def test_empty_batch(self, transformer: PandasTransformer) -> None:
+        assert transformer.transform_binance([]) == []
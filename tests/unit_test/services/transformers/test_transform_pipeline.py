@@ -0,0 +1,328 @@
+import asyncio
+import functools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional
+
+import pytest
+from confluent_kafka import TopicPartition
+
+from benchmarks.benchmark_utils.payloads import BINANCE_RECORDED_TICKERS
+from src.kafka.consumers import BinanceRawConsumer, GenericConsumer
+from src.kafka.producers import AsyncCandleProducer, AsyncTransformedBinanceProducer
+from src.models.binance_model import BinanceRawData
+from src.services.candles.candle_aggregator import CandleAggregator
+from src.services.transformers.pandas_transformer import PandasTransformer
+from src.services.transformers.transform_pipeline import TransformPipeline
+from src.utils.latency_trace import LatencyTrace
+from tests.helpers.fakes import FakeMessage
+
+
+class FakeConsumer(GenericConsumer[BinanceRawData]):
+    """
+    Serves a fixed list of batches then stops the pipeline, records every commit
+    """
+
+    def __init__(self, batches: list[list[FakeMessage]]) -> None:
+        self._batches: Iterator[list[FakeMessage]] = iter(batches)
+        self.committed: list[list[int]] = []
+        self.on_exhausted: Optional[Callable[[], None]] = None
+
+    def poll_batch(self, num_messages: int = 500, timeout: float = 1.0) -> list[Any]:
+        batch: Optional[list[FakeMessage]] = next(self._batches, None)
+        if batch is None:
+            assert self.on_exhausted is not None
+            self.on_exhausted()
+            return []
+        return batch
+
+    def commit_messages(self, messages: list[Any]) -> None:
+        self.committed.append([message.offset() for message in messages])
+
+
+class FakeProducer:
+    def __init__(self) -> None:
+        self.pending: list[tuple[Callable[..., None], bytes]] = []
+        self.delivered: list[bytes] = []
+        self.headers: list[Optional[list[tuple[str, bytes]]]] = []
+        self.fail: bool = False
+
+    def produce(
+        self,
+        topic: str,
+        value: bytes,
+        on_delivery: Callable[..., None],
+        headers: Optional[list[tuple[str, bytes]]] = None,
+    ) -> None:
+        self.pending.append((on_delivery, value))
+        self.headers.append(headers)
+
+    def poll(self, timeout: float) -> int:
+        pending, self.pending = self.pending, []
+        for on_delivery, value in pending:
+            on_delivery("broker down" if self.fail else None, FakeMessage(value, 0))
+            if not self.fail:
+                self.delivered.append(value)
+        return len(pending)
+
+    def flush(self, timeout: float) -> int:
+        self.poll(timeout)
+        return 0
+
+
+def raw_message(offset: int, count: int = 2) -> FakeMessage:
+    return FakeMessage(json.dumps(BINANCE_RECORDED_TICKERS[:count]).encode(), offset)
+
+
+class TestTransformPipeline:
+    @pytest.fixture
+    def fake_producer(self) -> FakeProducer:
+        return FakeProducer()
+
+    @pytest.fixture
+    def producer(self, fake_producer: FakeProducer) -> AsyncTransformedBinanceProducer:
+        producer = AsyncTransformedBinanceProducer(
+            {"bootstrap.servers": "localhost:9092"}, poll_timeout_s=0.01
+        )
+        producer._producer = fake_producer  # type: ignore[assignment]
+        return producer
+
+    def build_pipeline(
+        self,
+        consumer: FakeConsumer,
+        producer: AsyncTransformedBinanceProducer,
+        sink: Optional[Callable[[list[Any]], Any]] = None,
+    ) -> TransformPipeline[Any]:
+        pipeline: TransformPipeline[Any] = TransformPipeline(
+            name="binance",
+            consumer=consumer,
+            producer=producer,
+            transform=PandasTransformer().transform_binance,
+            transform_executor=ThreadPoolExecutor(max_workers=1),
+            max_records_per_message=1,
+            sink=sink,
+        )
+        consumer.on_exhausted = pipeline.stop
+        return pipeline
+
+    async def test_commits_every_batch_after_delivery(
+        self, producer: AsyncTransformedBinanceProducer, fake_producer: FakeProducer
+    ) -> None:
+        consumer = FakeConsumer([[raw_message(0), raw_message(1)], [raw_message(2)]])
+        pipeline = self.build_pipeline(consumer, producer)
+        await asyncio.wait_for(pipeline.run(), timeout=5)
+        await producer.close()
+
+        assert consumer.committed == [[0, 1], [2]]
+        # 3 raw messages of 2 tickers, split into 1 record per transformed message
+        assert len(fake_producer.delivered) == 6
+        produced: list[dict[str, Any]] = json.loads(fake_producer.delivered[0])
+        assert produced[0]["symbol"] == "BTCUSDT"
+        assert produced[0]["time"] == "2025-03-28T07:37:28.467000"
+
+    async def test_failed_delivery_is_not_committed(
+        self, producer: AsyncTransformedBinanceProducer, fake_producer: FakeProducer
+    ) -> None:
+        fake_producer.fail = True
+        consumer = FakeConsumer([[raw_message(0)]])
+        pipeline = self.build_pipeline(consumer, producer)
+        with pytest.raises(Exception):
+            await asyncio.wait_for(pipeline.run(), timeout=5)
+        await producer.close()
+        assert consumer.committed == []
+
+    async def test_failed_sink_is_not_committed(
+        self, producer: AsyncTransformedBinanceProducer, fake_producer: FakeProducer
+    ) -> None:
+        sunk: list[int] = []
+
+        async def sink(records: list[Any]) -> None:
+            sunk.append(len(records))
+            if len(sunk) == 2:
+                raise ConnectionError("database down")
+
+        consumer = FakeConsumer([[raw_message(0)], [raw_message(1)]])
+        pipeline = self.build_pipeline(consumer, producer, sink=sink)
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(pipeline.run(), timeout=5)
+        await producer.close()
+        assert sunk == [2, 2]
+        assert consumer.committed == [[0]]
+
+    async def test_latency_trace_is_carried_to_the_output(
+        self, producer: AsyncTransformedBinanceProducer, fake_producer: FakeProducer
+    ) -> None:
+        older = LatencyTrace("binance", (("event", 1000), ("produce", 1500)))
+        newer = LatencyTrace("binance", (("event", 2000), ("produce", 2100)))
+        consumer = FakeConsumer(
+            [
+                [
+                    FakeMessage(raw_message(0).value(), 0, headers=newer.headers),
+                    FakeMessage(raw_message(1).value(), 1, headers=older.headers),
+                    raw_message(2),
+                ]
+            ]
+        )
+        pipeline = self.build_pipeline(consumer, producer)
+        await asyncio.wait_for(pipeline.run(), timeout=5)
+        await producer.close()
+
+        assert len(fake_producer.headers) == 6
+        traces = [
+            LatencyTrace.from_headers(headers) for headers in fake_producer.headers
+        ]
+        # One stamp for the whole batch, on top of the oldest input stamps
+        assert len(set(traces)) == 1
+        trace = traces[0]
+        assert trace is not None and trace.source == "binance"
+        assert [stage for stage, _ in trace.stamps] == ["event", "produce", "transform"]
+        assert trace.stamps[:2] == older.stamps
+
+
+class FakeKafkaConsumer:
+    """
+    Stands in for confluent_kafka.Consumer under a real GenericConsumer
+    """
+
+    def __init__(self, batches: list[list[FakeMessage]]) -> None:
+        self._batches: Iterator[list[FakeMessage]] = iter(batches)
+        self.committed: list[list[TopicPartition]] = []
+        self.on_exhausted: Optional[Callable[[], None]] = None
+
+    def consume(self, num_messages: int, timeout: float) -> list[FakeMessage]:
+        batch: Optional[list[FakeMessage]] = next(self._batches, None)
+        if batch is None:
+            assert self.on_exhausted is not None
+            self.on_exhausted()
+            return []
+        return batch
+
+    def commit(self, offsets: list[TopicPartition], asynchronous: bool) -> None:
+        self.committed.append(offsets)
+
+    def close(self) -> None:
+        pass
+
+
+class TestPoisonMessage:
+    async def test_undecodable_message_is_quarantined_and_committed(
+        self,
+    ) -> None:
+        consumer = BinanceRawConsumer(
+            {
+                "bootstrap.servers": "localhost:9092",
+                "group.id": "test-poison",
+                "dead.letter.topic": "binance_raw_data_dead_letter",
+            }
+        )
+        real_consumer = consumer._consumer
+        kafka_consumer = FakeKafkaConsumer(
+            [
+                [
+                    raw_message(0),
+                    FakeMessage(b"not json", 1),
+                    FakeMessage(b"[]", 2, headers=[("codec", b"avro")]),
+                    raw_message(3),
+                ]
+            ]
+        )
+        consumer._consumer = kafka_consumer  # type: ignore[assignment]
+        consumer._assigned.add(("raw_data", 0))
+        dead_letters = FakeProducer()
+        assert consumer._dead_letter is not None
+        consumer._dead_letter._producer = dead_letters  # type: ignore[assignment]
+        fake_producer = FakeProducer()
+        producer = AsyncTransformedBinanceProducer(
+            {"bootstrap.servers": "localhost:9092"}, poll_timeout_s=0.01
+        )
+        producer._producer = fake_producer  # type: ignore[assignment]
+        pipeline: TransformPipeline[Any] = TransformPipeline(
+            name="binance-poison",
+            consumer=consumer,
+            producer=producer,
+            transform=PandasTransformer().transform_binance,
+            transform_executor=ThreadPoolExecutor(max_workers=1),
+        )
+        kafka_consumer.on_exhausted = pipeline.stop
+        try:
+            await asyncio.wait_for(pipeline.run(), timeout=5)
+        finally:
+            await producer.close()
+            consumer._consumer = real_consumer
+            consumer.close()
+
+        assert dead_letters.delivered == [b"not json", b"[]"]
+        # The good messages went through and the commit moved past the poison ones
+        assert len(json.loads(fake_producer.delivered[0])) == 4
+        assert kafka_consumer.committed == [[TopicPartition("raw_data", 0, 4)]]
+
+
+def transformed_tick(offset: int, price: float, time_ms: int) -> FakeMessage:
+    tick: dict[str, Any] = {
+        "symbol": "BTCUSDT",
+        "price": price,
+        "time": f"1970-01-01T00:00:{time_ms // 1000:02d}.{time_ms % 1000:03d}",
+        "source": "binance",
+    }
+    return FakeMessage(json.dumps([tick]).encode(), offset)
+
+
+class TestStatefulTransformPipeline:
+    """
+    A candle pipeline restarted from its committed offsets, the log holds one tick per message
+    """
+
+    LOG: list[FakeMessage] = [
+        transformed_tick(0, 100, 0),
+        transformed_tick(1, 102, 300),
+        transformed_tick(2, 101, 1000),
+    ]
+
+    async def run_from(
+        self, offset: int, batches: list[list[int]]
+    ) -> tuple[FakeConsumer, list[dict[str, Any]]]:
+        """
+        Runs a fresh aggregator over the given batches of offsets, replayed from offset
+        """
+        assert all(position >= offset for batch in batches for position in batch)
+        consumer = FakeConsumer(
+            [[self.LOG[position] for position in batch] for batch in batches]
+        )
+        fake_producer = FakeProducer()
+        producer = AsyncCandleProducer(
+            {"bootstrap.servers": "localhost:9092"}, poll_timeout_s=0.01
+        )
+        producer._producer = fake_producer  # type: ignore[assignment]
+        aggregator = CandleAggregator(intervals=("1s",), allowed_lateness_ms=0)
+        pipeline: TransformPipeline[Any] = TransformPipeline(
+            name="binance-candles",
+            consumer=consumer,
+            producer=producer,
+            transform=functools.partial(aggregator.apply, stream="binance"),
+            transform_executor=ThreadPoolExecutor(max_workers=1),
+            held_since=functools.partial(aggregator.oldest_held_batch, "binance"),
+        )
+        consumer.on_exhausted = pipeline.stop
+        await asyncio.wait_for(pipeline.run(), timeout=5)
+        await producer.close()
+        bars: list[dict[str, Any]] = [
+            bar for value in fake_producer.delivered for bar in json.loads(value)
+        ]
+        return consumer, bars
+
+    async def test_open_bar_survives_a_restart(self) -> None:
+        # Stopped while the first bar is still open: nothing may be committed
+        consumer, bars = await self.run_from(0, [[0], [1]])
+        assert bars == []
+        assert consumer.committed == []
+
+        consumer, bars = await self.run_from(0, [[0, 1], [2]])
+        [bar] = bars
+        assert (bar["open"], bar["high"], bar["close"], bar["tick_count"]) == (
+            100,
+            102,
+            102,
+            2,
+        )
+        # The tick at offset 2 opened the next bar, the next restart starts from it
+        assert consumer.committed == [[1]]
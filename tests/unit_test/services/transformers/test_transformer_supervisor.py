@@ -0,0 +1,81 @@
+import multiprocessing
+import threading
+import time
+from multiprocessing.synchronize import Event
+from typing import Any
+
+import pytest
+
+from src.services.transformers.transformer_supervisor import (
+    TransformerSupervisor,
+    WorkerReport,
+)
+
+
+def crashing_worker(
+    worker_id: int,
+    config: dict[str, Any],
+    stats_queue: "multiprocessing.Queue[WorkerReport]",
+    stop_event: Event,
+) -> None:
+    """
+    Reports once then dies, as a worker hitting an unrecoverable error would
+    """
+    stats_queue.put(
+        (worker_id, 0, "binance", {"batches": 1, "records_in": 10, "records_out": 8})
+    )
+    raise SystemExit(1)
+
+
+def steady_worker(
+    worker_id: int,
+    config: dict[str, Any],
+    stats_queue: "multiprocessing.Queue[WorkerReport]",
+    stop_event: Event,
+) -> None:
+    while not stop_event.wait(0.05):
+        stats_queue.put(
+            (worker_id, 0, "kucoin", {"batches": 1, "records_in": 1, "records_out": 1})
+        )
+
+
+def run_for(supervisor: TransformerSupervisor, seconds: float) -> None:
+    runner = threading.Thread(target=supervisor.run)
+    runner.start()
+    time.sleep(seconds)
+    supervisor.stop()
+    runner.join(timeout=30)
+    assert not runner.is_alive()
+
+
+class TestTransformerSupervisor:
+    @pytest.fixture
+    def config(self) -> dict[str, Any]:
+        return {"transformer": {"pipeline": {"report_interval_s": 1}}}
+
+    def test_restarts_crashed_workers(self, config: dict[str, Any]) -> None:
+        supervisor = TransformerSupervisor(
+            config=config,
+            workers=2,
+            restart_backoff_s=0.05,
+            max_restart_backoff_s=0.1,
+            check_interval_s=0.05,
+            worker_target=crashing_worker,
+        )
+        run_for(supervisor, 3)
+        health = supervisor.health()
+        assert all(worker["restarts"] >= 1 for worker in health["workers"])
+        assert health["totals"]["binance"]["records_in"] >= 20
+
+    def test_aggregates_healthy_workers(self, config: dict[str, Any]) -> None:
+        supervisor = TransformerSupervisor(
+            config=config,
+            workers=2,
+            check_interval_s=0.05,
+            worker_target=steady_worker,
+        )
+        run_for(supervisor, 2)
+        health = supervisor.health()
+        # Workers exited cleanly on stop and were not restarted
+        assert [worker["restarts"] for worker in health["workers"]] == [0, 0]
+        assert health["totals"]["kucoin"]["batches"] > 2
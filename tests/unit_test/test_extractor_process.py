@@ -0,0 +1,24 @@
+import asyncio
+
+from confluent_kafka import KafkaException
+
+from src.extractor_process import track_delivery
+from src.utils.metrics import REGISTRY
+
+
+class TestTrackDelivery:
+    async def test_archives_only_delivered_batches(self) -> None:
+        archived: list[str] = []
+        delivered: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        failed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        track_delivery(delivered, "kucoin", lambda: archived.append("delivered"))
+        track_delivery(failed, "kucoin", lambda: archived.append("failed"))
+
+        delivered.set_result(None)
+        failed.set_exception(KafkaException("broker down"))
+        await asyncio.sleep(0)
+
+        assert archived == ["delivered"]
+        assert (
+            'extractor_delivery_failures_total{source="kucoin"} 1' in REGISTRY.render()
+        )
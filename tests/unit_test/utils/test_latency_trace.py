@@ -0,0 +1,66 @@
+from typing import Optional
+
+import pytest
+
+from src.utils.latency_trace import (
+    FRESHNESS,
+    HOP_LATENCY,
+    LatencyTrace,
+    batch_trace,
+)
+from tests.helpers.fakes import FakeMessage
+
+
+class TestLatencyTrace:
+    def test_headers_round_trip(self) -> None:
+        trace = LatencyTrace("kucoin", (("event", 1_000), ("receive", 1_250)))
+        headers = [("frame", b"delta")] + trace.headers
+        assert LatencyTrace.from_headers(headers) == trace
+
+    @pytest.mark.parametrize(
+        "headers",
+        [
+            None,
+            [],
+            [("frame", b"delta")],
+            [("trace.event", b"1000")],
+            [("trace.source", b"kucoin"), ("trace.event", b"soon")],
+        ],
+    )
+    def test_untraced_or_malformed_headers(
+        self, headers: Optional[list[tuple[str, bytes]]]
+    ) -> None:
+        assert LatencyTrace.from_headers(headers) is None
+
+    def test_stamp_records_hop_and_freshness(self) -> None:
+        trace = LatencyTrace("test-stamp", (("event", 1_000), ("produce", 1_200)))
+
+        stamped = trace.stamp("transform", at_ms=1_700)
+
+        assert stamped.stamps[-1] == ("transform", 1_700)
+        assert trace.stamps == (("event", 1_000), ("produce", 1_200))
+        hop = HOP_LATENCY.labels("test-stamp", "produce_to_transform")
+        freshness = FRESHNESS.labels("test-stamp", "transform")
+        assert (hop.count, hop.sum) == (1, pytest.approx(0.5))
+        assert (freshness.count, freshness.sum) == (1, pytest.approx(0.7))
+
+    def test_clock_skew_is_recorded_as_zero(self) -> None:
+        hop = HOP_LATENCY.labels("test-skew", "event_to_receive")
+        LatencyTrace.start("test-skew", event_ms=2_000, receive_ms=1_990)
+        assert hop.count == 1
+        assert hop.sum == 0
+
+    def test_merge_keeps_the_earliest_stamp_per_stage(self) -> None:
+        first = LatencyTrace("binance", (("event", 2_000), ("produce", 2_300)))
+        second = LatencyTrace("binance", (("event", 1_000), ("produce", 2_500)))
+
+        merged = batch_trace(
+            [
+                FakeMessage(headers=first.headers),
+                FakeMessage(),
+                FakeMessage(headers=second.headers),
+            ]
+        )
+
+        assert merged == LatencyTrace("binance", (("event", 1_000), ("produce", 2_300)))
+        assert batch_trace([FakeMessage()]) is None
@@ -0,0 +1,141 @@
+import asyncio
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.utils.metrics import (
+    EventLoopMonitor,
+    MetricsParams,
+    MetricsRegistry,
+    MetricsServer,
+    ProcessMetrics,
+)
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+class TestMetricsRegistry:
+    def test_counters_and_gauges_render_as_prometheus_text(
+        self, registry: MetricsRegistry
+    ) -> None:
+        records = registry.counter("records_total", "Records seen", ("source",))
+        records.labels("binance").inc(3)
+        records.labels("kucoin").inc()
+        depth = registry.gauge("queue_depth", "Queued items")
+        depth.labels().set(7)
+
+        lines: list[str] = registry.render().splitlines()
+
+        assert lines == [
+            "# HELP records_total Records seen",
+            "# TYPE records_total counter",
+            'records_total{source="binance"} 3',
+            'records_total{source="kucoin"} 1',
+            "# HELP queue_depth Queued items",
+            "# TYPE queue_depth gauge",
+            "queue_depth 7",
+        ]
+
+    def test_histogram_buckets_are_cumulative(self, registry: MetricsRegistry) -> None:
+        latency = registry.histogram(
+            "latency_seconds", "Latency", buckets=(0.1, 1.0)
+        ).labels()
+        for value in (0.05, 0.1, 0.5, 2.0):
+            latency.observe(value)
+
+        rendered: str = registry.render()
+
+        assert 'latency_seconds_bucket{le="0.1"} 2' in rendered
+        assert 'latency_seconds_bucket{le="1"} 3' in rendered
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in rendered
+        assert "latency_seconds_sum 2.65" in rendered
+        assert "latency_seconds_count 4" in rendered
+
+    def test_registering_twice_returns_the_same_family(
+        self, registry: MetricsRegistry
+    ) -> None:
+        first = registry.counter("errors_total", "Errors", ("topic",))
+        assert registry.counter("errors_total", "Errors", ("topic",)) is first
+        with pytest.raises(ValueError):
+            registry.gauge("errors_total", "Errors", ("topic",))
+        with pytest.raises(ValueError):
+            registry.counter("errors_total", "Errors", ("source",))
+
+    def test_label_values_are_checked_and_escaped(
+        self, registry: MetricsRegistry
+    ) -> None:
+        family = registry.counter("odd_total", "Odd labels", ("name",))
+        with pytest.raises(ValueError):
+            family.labels()
+        family.labels('a "quoted"\nname').inc()
+        assert 'odd_total{name="a \\"quoted\\"\\nname"} 1' in registry.render()
+
+    def test_claimed_labels_have_a_single_owner(
+        self, registry: MetricsRegistry
+    ) -> None:
+        depth = registry.gauge("queue_depth", "Queued items", ("queue",))
+        depth.claim("binance").set(3)
+        with pytest.raises(ValueError):
+            depth.claim("binance")
+        assert 'queue_depth{queue="binance"} 3' in registry.render()
+
+        depth.release("binance")
+        assert "binance" not in registry.render()
+        assert depth.claim("binance").value == 0
+
+
+class TestMetricsServer:
+    def test_serves_the_registry(self, registry: MetricsRegistry) -> None:
+        registry.counter("scraped_total", "Scrapes").labels().inc()
+        server = MetricsServer(registry, port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{server.port}/metrics", timeout=5
+            ) as response:
+                body: str = response.read().decode()
+                assert response.headers["Content-Type"].startswith("text/plain")
+            assert "scraped_total 1" in body
+            with pytest.raises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{server.port}/", timeout=5)
+        finally:
+            server.stop()
+
+
+class TestEventLoopMonitor:
+    async def test_blocking_callback_is_counted_once(
+        self, registry: MetricsRegistry
+    ) -> None:
+        monitor = EventLoopMonitor(
+            "test", interval_s=0.02, slow_callback_s=0.1, registry=registry
+        )
+        monitor.start()
+        await asyncio.sleep(0.1)
+        # Blocks the loop, the watchdog has to notice while this is still running
+        time.sleep(0.4)
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+        rendered: str = registry.render()
+        assert 'event_loop_stalls_total{loop="test"} 1' in rendered
+        lag_count: str = next(
+            line
+            for line in rendered.splitlines()
+            if line.startswith('event_loop_lag_seconds_count{loop="test"}')
+        )
+        assert int(lag_count.split()[-1]) > 1
+
+    async def test_disabled_process_metrics_monitor_nothing(
+        self, registry: MetricsRegistry
+    ) -> None:
+        metrics = ProcessMetrics(
+            MetricsParams(enabled=False, ports={"test": 0}), "test", registry=registry
+        )
+        metrics.start()
+        await metrics.stop()
+        assert "event_loop" not in registry.render()